@@ -0,0 +1,60 @@
+"""Add composite indexes for alert query patterns
+
+Revision ID: b4c5d6e7f8a9
+Revises: a2b3c4d5e6f7
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b4c5d6e7f8a9'
+down_revision: Union[str, Sequence[str], None] = 'a2b3c4d5e6f7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+INDEXES = (
+    ("ix_alerts_device_id_timestamp", ["device_id", sa.text("timestamp DESC")]),
+    ("ix_alerts_timestamp_alert_type", ["timestamp", "alert_type"]),
+    ("ix_alerts_location", ["location_lat", "location_lon"]),
+)
+
+
+def upgrade() -> None:
+    """Create the alert indexes.
+
+    On PostgreSQL they are built with CREATE INDEX CONCURRENTLY, which cannot
+    run inside a transaction, so they go through an autocommit block and do
+    not hold a write lock on `alerts` while building.
+    """
+    if op.get_bind().dialect.name == "postgresql":
+        with op.get_context().autocommit_block():
+            for name, columns in INDEXES:
+                op.create_index(
+                    name, "alerts", columns,
+                    postgresql_concurrently=True,
+                    if_not_exists=True,
+                )
+    else:
+        for name, columns in INDEXES:
+            op.create_index(name, "alerts", columns, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Drop the alert indexes."""
+    if op.get_bind().dialect.name == "postgresql":
+        with op.get_context().autocommit_block():
+            for name, _ in reversed(INDEXES):
+                op.drop_index(
+                    name, table_name="alerts",
+                    postgresql_concurrently=True,
+                    if_exists=True,
+                )
+    else:
+        for name, _ in reversed(INDEXES):
+            op.drop_index(name, table_name="alerts", if_exists=True)
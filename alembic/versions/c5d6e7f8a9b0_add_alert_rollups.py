@@ -0,0 +1,61 @@
+"""Add alert_rollups table
+
+Revision ID: c5d6e7f8a9b0
+Revises: b4c5d6e7f8a9
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5d6e7f8a9b0'
+down_revision: Union[str, Sequence[str], None] = 'b4c5d6e7f8a9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Hour bucket expressions matching what the application writes: timestamps
+# converted to naive UTC and truncated to the hour (SQLite stores them as text).
+HOUR_EXPRESSIONS = {
+    "postgresql": "date_trunc('hour', timestamp AT TIME ZONE 'UTC')",
+    "sqlite": "strftime('%Y-%m-%d %H:00:00.000000', timestamp)",
+}
+
+FILL_ROLLUPS = """
+INSERT INTO alert_rollups (bucket_hour, alert_type, device_id, alert_count)
+SELECT {hour}, alert_type, device_id, count(*)
+FROM alerts
+GROUP BY 1, 2, 3
+"""
+
+
+def upgrade() -> None:
+    """Create alert_rollups and fill it from the existing alerts.
+
+    Filling it here keeps the analytics that read it complete as soon as
+    the migration has run; `scripts/backfill_alert_rollups.py` remains for
+    re-syncing later.
+    """
+    op.create_table('alert_rollups',
+    sa.Column('bucket_hour', sa.DateTime(), nullable=False),
+    sa.Column('alert_type', sa.String(), nullable=False),
+    sa.Column('device_id', sa.String(), nullable=False),
+    sa.Column('alert_count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('bucket_hour', 'alert_type', 'device_id')
+    )
+    op.create_index('ix_alert_rollups_device_id_alert_type', 'alert_rollups', ['device_id', 'alert_type'])
+    dialect = op.get_bind().dialect.name
+    hour = HOUR_EXPRESSIONS.get(dialect)
+    if hour is None:
+        raise NotImplementedError(f"alert_rollups cannot be filled on {dialect}")
+    op.execute(FILL_ROLLUPS.format(hour=hour))
+
+
+def downgrade() -> None:
+    """Drop alert_rollups."""
+    op.drop_index('ix_alert_rollups_device_id_alert_type', table_name='alert_rollups')
+    op.drop_table('alert_rollups')
@@ -0,0 +1,80 @@
+"""Add model_log_rollups table and model_logs summary index
+
+Revision ID: d6e7f8a9b0c1
+Revises: c5d6e7f8a9b0
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd6e7f8a9b0c1'
+down_revision: Union[str, Sequence[str], None] = 'c5d6e7f8a9b0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+INDEX_NAME = "ix_model_logs_timestamp_model_name_log_level"
+INDEX_COLUMNS = ["timestamp", "model_name", "log_level"]
+
+# Hour bucket expressions matching what the application writes: naive
+# timestamps truncated to the hour (SQLite stores them as text).
+HOUR_EXPRESSIONS = {
+    "postgresql": "date_trunc('hour', timestamp)",
+    "sqlite": "strftime('%Y-%m-%d %H:00:00.000000', timestamp)",
+}
+
+
+def upgrade() -> None:
+    """Create model_log_rollups and the model_logs summary index.
+
+    The rollups are filled from the existing logs in the same migration, so
+    summaries are complete as soon as it has run. The index is built
+    concurrently on PostgreSQL, as for the alert indexes.
+    """
+    op.create_table('model_log_rollups',
+    sa.Column('bucket_hour', sa.DateTime(), nullable=False),
+    sa.Column('model_name', sa.String(), nullable=False),
+    sa.Column('log_level', sa.String(), nullable=False),
+    sa.Column('log_count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('bucket_hour', 'model_name', 'log_level')
+    )
+    dialect = op.get_bind().dialect.name
+    hour = HOUR_EXPRESSIONS.get(dialect)
+    if hour is None:
+        raise NotImplementedError(f"model_log_rollups cannot be filled on {dialect}")
+    op.execute(
+        f"""
+        INSERT INTO model_log_rollups (bucket_hour, model_name, log_level, log_count)
+        SELECT {hour}, model_name, log_level, count(*)
+        FROM model_logs
+        GROUP BY 1, 2, 3
+        """
+    )
+    if dialect == "postgresql":
+        with op.get_context().autocommit_block():
+            op.create_index(
+                INDEX_NAME, "model_logs", INDEX_COLUMNS,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+    else:
+        op.create_index(INDEX_NAME, "model_logs", INDEX_COLUMNS, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Drop the model_logs summary index and model_log_rollups."""
+    if op.get_bind().dialect.name == "postgresql":
+        with op.get_context().autocommit_block():
+            op.drop_index(
+                INDEX_NAME, table_name="model_logs",
+                postgresql_concurrently=True,
+                if_exists=True,
+            )
+    else:
+        op.drop_index(INDEX_NAME, table_name="model_logs", if_exists=True)
+    op.drop_table('model_log_rollups')
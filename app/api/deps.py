@@ -1,28 +1,78 @@
 """Common FastAPI dependencies (authentication)."""
-from fastapi import Depends, HTTPException
+import hmac
+import ipaddress
+from functools import lru_cache
+from typing import Optional, Tuple, Union
+
+from fastapi import Depends, Header, HTTPException, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 
-from app.services.jwt_service import decode_token
-from app.db.session import AsyncSessionLocal
-from app.models.user import User
-from sqlalchemy import select
+from app.core.settings import settings
+from app.services.principal_cache import Principal, get_principal, verify_token
+from app.services.token_revocation import revocation_list
 
 security = HTTPBearer()
 
+Networks = Tuple[Union[ipaddress.IPv4Network, ipaddress.IPv6Network], ...]
+
 
-async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> User:
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> Principal:
     token = credentials.credentials
-    payload = decode_token(token)
+    payload = verify_token(token)
     if not payload:
         raise HTTPException(status_code=401, detail="Invalid token")
-    user_id = payload.get("sub")
-    if not user_id:
+    if await revocation_list.is_revoked(payload.get("jti")):
+        raise HTTPException(status_code=401, detail="Token revoked")
+    subject = payload.get("sub")
+    if not subject:
         raise HTTPException(status_code=401, detail="Invalid token payload")
-    async with AsyncSessionLocal() as session:
-        result = await session.execute(
-            select(User).where(User.id == int(user_id))
-        )
-        user = result.scalar_one_or_none()
-        if not user:
-            raise HTTPException(status_code=401, detail="User not found")
-        return user
+    principal = await get_principal(str(subject))
+    if principal is None:
+        raise HTTPException(status_code=401, detail="User not found")
+    if principal.is_locked():
+        raise HTTPException(status_code=401, detail="Account locked")
+    return principal
+
+
+async def require_admin(x_admin_token: Optional[str] = Header(default=None)) -> None:
+    """Allow the request only with the configured X-Admin-Token.
+
+    Admin endpoints answer 404 while ADMIN_TOKEN is unset.
+    """
+    if not settings.admin_token:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token, settings.admin_token):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+@lru_cache(maxsize=8)
+def _parse_networks(value: str) -> Networks:
+    return tuple(
+        ipaddress.ip_network(item.strip(), strict=False) for item in value.split(",") if item.strip()
+    )
+
+
+def _is_trusted(address: str, networks: Networks) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in networks)
+
+
+def client_ip(request: Request) -> str:
+    """The client's address, looking through proxies listed in TRUSTED_PROXIES.
+
+    X-Forwarded-For is only read when the direct peer is a trusted proxy,
+    and is walked from the right past further trusted proxies, so a client
+    cannot choose its address by sending the header itself.
+    """
+    peer = request.client.host if request.client else "unknown"
+    networks = _parse_networks(settings.trusted_proxies)
+    if not networks or not _is_trusted(peer, networks):
+        return peer
+    forwarded = [item.strip() for item in request.headers.get("x-forwarded-for", "").split(",") if item.strip()]
+    for address in reversed(forwarded):
+        if not _is_trusted(address, networks):
+            return address
+    return forwarded[0] if forwarded else peer
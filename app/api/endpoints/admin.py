@@ -0,0 +1,47 @@
+"""Admin-only diagnostics endpoints."""
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+
+from app.api.deps import require_admin
+from app.core.profiling import profile_store
+from app.core.query_stats import query_stats
+
+router = APIRouter(
+    prefix="/api/admin",
+    tags=["Admin"],
+    dependencies=[Depends(require_admin)],
+)
+
+
+@router.get("/queries", summary="Slowest SQL Fingerprints")
+async def get_query_stats(limit: int = Query(20, ge=1, le=500)):
+    """SQL statement fingerprints ordered by total time spent in them."""
+    return {
+        "slow_query_ms": query_stats.slow_query_seconds * 1000.0,
+        "queries": query_stats.top(limit),
+    }
+
+
+@router.delete("/queries", status_code=204, summary="Reset SQL Statistics")
+async def reset_query_stats():
+    """Forget all recorded query timings."""
+    query_stats.reset()
+
+
+@router.get("/profiles", summary="Recent Request Profiles")
+async def list_profiles():
+    """The stored request profiles, newest first."""
+    return profile_store.list()
+
+
+@router.get("/profiles/{profile_id}", summary="Download Request Profile")
+async def download_profile(profile_id: int):
+    """One profile as collapsed stacks, for flamegraph.pl or speedscope."""
+    profile = profile_store.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return PlainTextResponse(
+        profile.collapsed(),
+        headers={"Content-Disposition": f'attachment; filename="profile-{profile_id}.folded"'},
+    )
@@ -1,15 +1,20 @@
 """Alert endpoint handlers."""
 
-from typing import List
+import json
+from datetime import datetime
+from typing import List, Literal, Optional
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.future import select
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import JSONResponse, StreamingResponse
 
-from app.models import Alert
 from app.schemas.alerts import AlertCreate, Alert as AlertSchema
+from app.services.alert_pipeline import alert_pipeline
 from app.services.alert_processor import process_and_save_alert
-from app.db.session import get_db_session
+from app.services.alert_query import ALERT_FIELDS, AlertQueryService, decode_cursor
+from app.services.mqtt_client import mqtt_service
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
 
 router = APIRouter(
     prefix="/api/alerts",
@@ -49,16 +54,96 @@ async def receive_alert(alert_data: AlertCreate):
 
 @router.get(
     "",
-    response_model=List[AlertSchema],
-    summary="Get all alerts",
-    description="Retrieve all security alerts from the database, ordered by timestamp (newest first)."
+    # Returned directly: pages may hold only the requested fields, or be streamed.
+    response_model=None,
+    responses={
+        200: {
+            "model": List[AlertSchema],
+            "description": "A page of alerts. With `fields`, each alert has only those keys. "
+            "With `format=ndjson`, one alert per line.",
+            "content": {"application/x-ndjson": {"schema": {"type": "string"}}},
+            "headers": {
+                "X-Next-Cursor": {
+                    "description": "Cursor for the next page; absent on the last page",
+                    "schema": {"type": "string"},
+                }
+            },
+        }
+    },
+    summary="List alerts",
+    description="""Retrieve security alerts ordered by timestamp (newest first), one page at a time.
+
+    The cursor for the next page is returned in the `X-Next-Cursor` response header; it is
+    absent on the last page. Use `fields` to return only some columns and `format=ndjson`
+    to stream every matching alert as newline-delimited JSON."""
 )
-async def get_all_alerts(db: AsyncSession = Depends(get_db_session)):
+async def get_all_alerts(
+    limit: Optional[int] = Query(
+        None,
+        ge=1,
+        le=MAX_PAGE_SIZE,
+        description=f"Page size (default {DEFAULT_PAGE_SIZE}); unlimited when streaming",
+    ),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from a previous X-Next-Cursor header"),
+    fields: Optional[str] = Query(None, description="Comma-separated list of fields to return"),
+    device_id: Optional[str] = Query(None, description="Filter by device ID"),
+    alert_type: Optional[str] = Query(None, description="Filter by alert type"),
+    start_time: Optional[datetime] = Query(None, description="Only alerts at or after this time (ISO format)"),
+    end_time: Optional[datetime] = Query(None, description="Only alerts at or before this time (ISO format)"),
+    format: Literal["json", "ndjson"] = Query("json", description="json for a page, ndjson to stream"),
+):
     """
-    Retrieve a list of all alerts from the database.
-    
+    Retrieve alerts from the database using keyset pagination on (timestamp, id).
+
     The alerts are sorted by timestamp in descending order (newest first).
     For real-time notifications, connect to the WebSocket endpoint: `/ws/alerts`
     """
-    result = await db.execute(select(Alert).order_by(Alert.timestamp.desc()))
-    return result.scalars().all()
\ No newline at end of file
+    selected = tuple(f.strip() for f in fields.split(",") if f.strip()) if fields else ALERT_FIELDS
+    unknown = set(selected) - set(ALERT_FIELDS)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+    if start_time and end_time and end_time < start_time:
+        raise HTTPException(status_code=400, detail="end_time must be greater than or equal to start_time")
+    if cursor:
+        try:
+            decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    filters = dict(
+        cursor=cursor,
+        fields=selected,
+        device_id=device_id,
+        alert_type=alert_type,
+        start_time=start_time,
+        end_time=end_time,
+    )
+
+    if format == "ndjson":
+        async def ndjson_lines():
+            async for alert in AlertQueryService.stream_alerts(limit=limit, **filters):
+                yield json.dumps(alert) + "\n"
+
+        return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
+
+    alerts, next_cursor = await AlertQueryService.list_alerts(limit=limit or DEFAULT_PAGE_SIZE, **filters)
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else None
+    return JSONResponse(content=alerts, headers=headers)
+
+
+@router.get(
+    "/ingest/stats",
+    summary="Alert ingestion queue statistics",
+    description="Queue depths, overflow counters and batch commit latency for alert ingestion."
+)
+async def get_ingest_stats():
+    """
+    Report saturation of the alert ingestion path.
+
+    - **mqtt**: depth of the MQTT hand-off queue and its drop/spill counters
+    - **pipeline**: depth of the write-behind queue and per-batch commit latency
+    """
+    return {
+        "mqtt": mqtt_service.ingest_stats(),
+        "pipeline": alert_pipeline.stats(),
+    }
@@ -1,11 +1,14 @@
 """Alert analytics endpoints."""
 
-from datetime import datetime
+from datetime import datetime, timedelta
 from typing import Optional
 
-from fastapi import APIRouter, Query
+from fastapi import APIRouter, HTTPException, Query
 
+from app.core.settings import REDIS_CONFIG
 import app.services.cache as cache_module
+from app.services.cache_invalidation import alert_tags
+from app.services import timeframe_cache
 from app.services.alert_query import AlertQueryService
 
 router = APIRouter(
@@ -25,21 +28,17 @@ async def get_alerts_by_timeframe(
     alert_type: Optional[str] = Query(None, description="Filter by alert type"),
     device_id: Optional[str] = Query(None, description="Filter by device ID")
 ):
-    """Get alerts within a specific timeframe with optional filtering."""
-    cache_key = cache_module.cache.get_key(
-        "timeframe",
-        start_time.isoformat(),
-        end_time.isoformat(),
-        str(alert_type),
-        str(device_id)
-    )
-    
-    return await cache_module.cache.get_or_set(
-        cache_key,
-        lambda: AlertQueryService.get_alerts_by_timeframe(
+    """Get alerts within a specific timeframe with optional filtering.
+
+    Closed hours are cached per hour and shared by every window covering
+    them; only the window edges and the current hour are queried live.
+    """
+    try:
+        return await timeframe_cache.get_alerts_by_timeframe(
             start_time, end_time, alert_type, device_id
         )
-    )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
 @router.get(
@@ -62,7 +61,8 @@ async def get_alerts_by_location(
     
     return await cache_module.cache.get_or_set(
         cache_key,
-        lambda: AlertQueryService.get_alerts_by_location(lat, lon, radius_km)
+        lambda: AlertQueryService.get_alerts_by_location(lat, lon, radius_km),
+        tags=alert_tags()
     )
 
 
@@ -84,7 +84,8 @@ async def get_alert_counts(
     
     return await cache_module.cache.get_or_set(
         cache_key,
-        lambda: AlertQueryService.get_alert_counts_by_type(start_time, end_time)
+        lambda: AlertQueryService.get_alert_counts_by_type(start_time, end_time),
+        tags=alert_tags(start_time=start_time, end_time=end_time)
     )
 
 
@@ -99,10 +100,15 @@ async def get_alert_trends(
 ):
     """Get alert trends over time."""
     cache_key = cache_module.cache.get_key("trends", str(days), str(interval_hours))
+    now = datetime.utcnow()
     
+    # The window slides with the clock, so serve slightly stale trends while
+    # a single background task refreshes them.
     return await cache_module.cache.get_or_set(
         cache_key,
-        lambda: AlertQueryService.get_alert_trends(days, interval_hours)
+        lambda: AlertQueryService.get_alert_trends(days, interval_hours),
+        soft_ttl=REDIS_CONFIG["SOFT_TIMEOUT"],
+        tags=alert_tags(start_time=now - timedelta(days=days), end_time=now)
     )
 
 
@@ -118,5 +124,6 @@ async def get_device_statistics(device_id: str):
     return await cache_module.cache.get_or_set(
         cache_key,
         lambda: AlertQueryService.get_device_statistics(device_id),
-        expire=300  # Short cache time for device stats
+        expire=300,  # Short cache time for device stats
+        tags=alert_tags(device_id)
     )
\ No newline at end of file
@@ -1,6 +1,15 @@
-from fastapi import APIRouter, HTTPException, Depends, status
+import logging
+
+from fastapi import APIRouter, HTTPException, Depends, Request, status
+from fastapi.security import HTTPAuthorizationCredentials
 from app.schemas.auth import UserSignup, UserLogin, Token
 from app.services import auth_service, jwt_service
+from app.api.deps import client_ip, get_current_user, security
+from app.services.login_throttle import login_throttle
+from app.services.principal_cache import forget_token, verify_token
+from app.services.token_revocation import revocation_list
+
+LOG = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/auth", tags=["Authentication"])
 
@@ -20,7 +29,18 @@ async def signup(payload: UserSignup):
         raise HTTPException(status_code=500, detail="Failed to create user")
 
 @router.post("/login", response_model=Token)
-async def login(payload: UserLogin):
+async def login(payload: UserLogin, request: Request):
+    try:
+        allowed = await login_throttle.allow_attempt(client_ip(request))
+    except Exception as e:
+        LOG.warning("Login rate limit unavailable: %s", e)
+        allowed = True
+    if not allowed:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many login attempts, try again later",
+        )
+
     user = await auth_service.authenticate(
         email=payload.email, 
         password=payload.password
@@ -33,4 +53,18 @@ async def login(payload: UserLogin):
         )
         
     access_token = jwt_service.create_access_token(subject=str(user.email))
-    return {"access_token": access_token, "token_type": "bearer"}
\ No newline at end of file
+    return {"access_token": access_token, "token_type": "bearer"}
+
+@router.post("/logout", dependencies=[Depends(get_current_user)])
+async def logout(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    """Revoke the bearer token used for this request."""
+    payload = verify_token(credentials.credentials)
+    jti = payload.get("jti") if payload else None
+    if not jti:
+        raise HTTPException(status_code=400, detail="Token cannot be revoked")
+    try:
+        await revocation_list.revoke(jti, payload["exp"])
+    except Exception:
+        raise HTTPException(status_code=503, detail="Token revocation unavailable")
+    forget_token(credentials.credentials)
+    return {"message": "Logged out"}
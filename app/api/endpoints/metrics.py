@@ -0,0 +1,56 @@
+"""Prometheus metrics endpoint."""
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.config.database import engine
+from app.core.metrics import registry
+from app.services.alert_pipeline import alert_pipeline
+from app.services.mail_queue import mail_queue
+from app.services.mqtt_client import mqtt_service
+from app.services.password_hasher import password_hasher
+from app.services.websocket import manager
+
+router = APIRouter(
+    tags=["Monitoring"]
+)
+
+# Queue depths and pool usage are read from their owners at scrape time.
+registry.gauge(
+    "obex_ws_connections", "Open WebSocket connections",
+    function=lambda: len(manager.active_connections),
+)
+registry.gauge(
+    "obex_ws_queued_messages", "Messages waiting in WebSocket client queues",
+    function=lambda: manager.stats()["queued_messages"],
+)
+registry.gauge(
+    "obex_ws_max_queue_depth", "Deepest WebSocket client queue",
+    function=lambda: manager.stats()["max_queue_depth"],
+)
+registry.gauge(
+    "obex_mqtt_handoff_queue_depth", "Validated MQTT alerts waiting for the dispatcher",
+    function=lambda: mqtt_service.ingest_stats()["queue_depth"],
+)
+registry.gauge(
+    "obex_alert_pipeline_queue_depth", "Alerts waiting to be written in a batch",
+    function=lambda: alert_pipeline.stats()["queue_depth"],
+)
+registry.gauge(
+    "obex_mail_queue_depth", "Emails waiting to be sent",
+    function=lambda: mail_queue.stats()["queued"],
+)
+registry.gauge(
+    "obex_password_hash_pending", "Password hash/verify jobs queued or running",
+    function=lambda: password_hasher.pending,
+)
+registry.gauge(
+    "obex_db_pool_checked_out", "Database connections currently checked out",
+    function=lambda: engine.pool.checkedout(),
+)
+
+
+@router.get("/metrics", summary="Prometheus Metrics", include_in_schema=False)
+async def get_metrics():
+    """Expose all metrics in the Prometheus text format."""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -1,11 +1,27 @@
 """
 API endpoints for model log ingestion and dashboard summary.
 """
-from fastapi import APIRouter, HTTPException
-from typing import List
-from app.schemas.model_log import ModelLogCreate, ModelLogOut, ModelLogSummary
+import json
+import zlib
+from fastapi import APIRouter, HTTPException, Request
+from pydantic import ValidationError
+from typing import Any, List
+from app.core.settings import settings
+from app.schemas.model_log import (
+    ModelLogBatchError,
+    ModelLogBatchResult,
+    ModelLogCreate,
+    ModelLogOut,
+    ModelLogSummary,
+)
 from app.services.model_log_service import ModelLogService
 
+NDJSON_CONTENT_TYPES = ("application/x-ndjson", "application/jsonl", "application/json-seq")
+# Only the first few rejected entries are described in the response.
+MAX_REPORTED_ERRORS = 100
+
+_MALFORMED = object()
+
 router = APIRouter(
     prefix="/api/model-logs",
     tags=["Model Logs"]
@@ -19,6 +35,111 @@ async def ingest_model_log(log: ModelLogCreate):
         return result
     raise HTTPException(status_code=500, detail="Failed to store model log.")
 
+def _too_large() -> HTTPException:
+    return HTTPException(status_code=413, detail="Batch is too large.")
+
+
+async def _read_body(request: Request, limit: int) -> bytes:
+    """Read the request body, gunzipping it if needed, without holding more than `limit` bytes.
+
+    Rejects early on Content-Length, then counts raw and decoded bytes as the
+    body streams in and stops at the first chunk past the limit.
+    """
+    declared = request.headers.get("content-length", "")
+    if declared.isdigit() and int(declared) > limit:
+        raise _too_large()
+
+    decoder = None
+    if "gzip" in request.headers.get("content-encoding", "").lower():
+        decoder = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    chunks: List[bytes] = []
+    received = 0
+    size = 0
+    async for chunk in request.stream():
+        received += len(chunk)
+        if received > limit:
+            raise _too_large()
+        if decoder is not None:
+            try:
+                chunk = decoder.decompress(chunk, limit + 1 - size)
+            except zlib.error:
+                raise HTTPException(status_code=400, detail="Body is not valid gzip.")
+            if decoder.unconsumed_tail:
+                raise _too_large()
+        size += len(chunk)
+        if size > limit:
+            raise _too_large()
+        chunks.append(chunk)
+
+    if decoder is not None and received and not decoder.eof:
+        raise HTTPException(status_code=400, detail="Body is not valid gzip.")
+    return b"".join(chunks)
+
+
+def _parse_ndjson(body: bytes) -> List[Any]:
+    """One entry per non-blank line; a malformed line becomes _MALFORMED."""
+    entries: List[Any] = []
+    for line in body.splitlines():
+        if not line.strip():
+            continue
+        try:
+            entries.append(json.loads(line))
+        except ValueError:
+            entries.append(_MALFORMED)
+    return entries
+
+
+def _parse_entries(body: bytes, ndjson: bool) -> List[Any]:
+    if ndjson:
+        return _parse_ndjson(body)
+    try:
+        entries = json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Body is not valid JSON.")
+    if not isinstance(entries, list):
+        raise HTTPException(status_code=400, detail="Expected a JSON array of log entries.")
+    return entries
+
+
+@router.post("/batch", response_model=ModelLogBatchResult)
+async def ingest_model_log_batch(request: Request):
+    """Ingest many log entries from a JSON array or NDJSON body, optionally gzip-encoded.
+
+    Valid entries are written together; invalid ones are counted as rejected
+    and reported by their position in the batch.
+    """
+    body = await _read_body(request, settings.model_log_batch_max_bytes)
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    entries = _parse_entries(body, content_type in NDJSON_CONTENT_TYPES)
+    if len(entries) > settings.model_log_batch_max_items:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batches are limited to {settings.model_log_batch_max_items} entries.",
+        )
+
+    valid: List[ModelLogCreate] = []
+    errors: List[ModelLogBatchError] = []
+    rejected = 0
+    for index, entry in enumerate(entries):
+        if entry is _MALFORMED:
+            message = "Line is not valid JSON"
+        else:
+            try:
+                valid.append(ModelLogCreate.model_validate(entry))
+                continue
+            except ValidationError as e:
+                first = e.errors()[0]
+                message = f"{'.'.join(str(part) for part in first['loc'])}: {first['msg']}".lstrip(": ")
+        rejected += 1
+        if len(errors) < MAX_REPORTED_ERRORS:
+            errors.append(ModelLogBatchError(index=index, error=message))
+
+    try:
+        accepted = await ModelLogService.store_logs(valid)
+    except Exception:
+        raise HTTPException(status_code=500, detail="Failed to store model logs.")
+    return ModelLogBatchResult(accepted=accepted, rejected=rejected, errors=errors)
+
 @router.get("/recent", response_model=List[ModelLogOut])
 async def get_recent_model_logs(limit: int = 20):
     """Get recent model logs."""
@@ -1,6 +1,11 @@
+import logging
+
 from fastapi import APIRouter, HTTPException, status
 from app.schemas.otp import OTPGenerateRequest, OTPVerifyRequest, OTPResponse
 from app.services import otp_service
+from app.services.mail_queue import MailQueueFull
+
+LOG = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/otp", tags=["OTP"])
 
@@ -10,8 +15,14 @@ async def generate_otp_endpoint(payload: OTPGenerateRequest):
     try:
         await otp_service.generate_otp(payload.email)
         return {"message": "OTP sent successfully to your email"}
+    except MailQueueFull as e:
+        LOG.warning("Refusing OTP request: %s", e)
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many emails are waiting to be sent. Please try again shortly.",
+        )
     except Exception as e:
-        print(f"Error sending OTP: {e}") 
+        LOG.error("Error sending OTP: %s", e)
         raise HTTPException(status_code=500, detail="Failed to send OTP. Please check email configuration.")
 
 @router.post("/verify", response_model=OTPResponse)
@@ -1,8 +1,12 @@
 """WebSocket endpoint handlers."""
 
+import logging
+
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
 from app.services.websocket import manager
 
+LOG = logging.getLogger(__name__)
+
 router = APIRouter(
     tags=["WebSocket"]
 )
@@ -15,7 +19,6 @@ async def websocket_endpoint(websocket: WebSocket):
     Handles client connections, disconnections, and keep-alive messages.
     """
     await manager.connect(websocket)
-    print(f"New WebSocket connection established. Active connections: {len(manager.active_connections)}")
     
     try:
         await manager.send_connection_message(websocket)
@@ -26,11 +29,9 @@ async def websocket_endpoint(websocket: WebSocket):
             
     except WebSocketDisconnect:
         manager.disconnect(websocket)
-        print(f"WebSocket disconnected. Remaining connections: {len(manager.active_connections)}")
     except Exception as e:
-        print(f"WebSocket error: {e}")
+        LOG.warning("WebSocket error: %s", e)
         manager.disconnect(websocket)
-        print(f"Connection terminated. Remaining connections: {len(manager.active_connections)}")
 
 
 @router.get("/websocket-info", summary="WebSocket Connection Details")
@@ -42,6 +43,7 @@ async def get_websocket_info():
     - WebSocket endpoint details
     - Current number of active connections
     - Connection URL for clients
+    - Outbound queue depths and slow consumer counters
     - Connection status
     """
     return {
@@ -49,6 +51,7 @@ async def get_websocket_info():
         "active_connections": len(manager.active_connections),
         "connection_url": "ws://localhost:8000/ws/alerts",
         "status": "operational",
+        "outbound_queues": manager.stats(),
         "supported_events": {
             "incoming": ["ping", "message"],
             "outgoing": ["pong", "alert_notification"]
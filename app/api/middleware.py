@@ -0,0 +1,87 @@
+"""ASGI middleware shared by all routes."""
+
+import asyncio
+import hmac
+import random
+from typing import Any, Callable, Dict
+
+from app.core.profiling import RequestSampler, profile_store
+from app.core.query_stats import current_request_queries, finish_request, track_request
+from app.core.settings import settings
+
+Scope = Dict[str, Any]
+Receive = Callable[..., Any]
+Send = Callable[..., Any]
+
+
+class QueryCountMiddleware:
+    """Counts SQL statements per HTTP request.
+
+    The count is reported in the X-DB-Query-Count response header and the
+    obex_db_queries_per_request histogram.
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        token = track_request()
+        queries = current_request_queries()
+
+        async def send_with_count(message: Dict[str, Any]) -> None:
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"x-db-query-count", str(queries.count).encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_count)
+        finally:
+            finish_request(token)
+
+
+class ProfilingMiddleware:
+    """Profiles sampled requests, or requests sent with X-Profile and a valid X-Admin-Token.
+
+    Only installed when PROFILING_ENABLED is set. Profiled responses carry an
+    X-Profile-Id header naming the stored profile.
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+        self.sample_rate = settings.profile_sample_rate
+
+    def _requested(self, scope: Scope) -> bool:
+        if self.sample_rate and random.random() < self.sample_rate:
+            return True
+        headers = dict(scope["headers"])
+        if b"x-profile" not in headers or not settings.admin_token:
+            return False
+        token = headers.get(b"x-admin-token", b"").decode("latin-1")
+        return hmac.compare_digest(token, settings.admin_token)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self._requested(scope):
+            await self.app(scope, receive, send)
+            return
+
+        profile = profile_store.new_profile(scope["method"], scope["path"])
+        sampler = RequestSampler(asyncio.current_task(), profile)
+
+        async def send_with_id(message: Dict[str, Any]) -> None:
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"x-profile-id", str(profile.id).encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            profile_store.add(sampler.stop())
@@ -1,19 +1,27 @@
 """Database configuration (Clean & Stable)."""
 
+import logging
 import os
 import ssl
+import time
 from typing import Any, Dict
 
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
+from app.core.metrics import DB_POOL_CHECKOUT_SECONDS
+from app.core.query_stats import query_stats
 from app.core.settings import settings
 
+LOG = logging.getLogger(__name__)
+
 raw_url = os.getenv("DIRECT_DATABASE_URL") or settings.database_url or "sqlite+aiosqlite:///./obex.db"
 
 # Force session-mode port 5432 when the pooler provides 6543
 if ":6543" in raw_url:
-    print("DEBUG: Switching to Session Mode (Port 5432)...")
+    LOG.warning("Switching database connection to session mode (port 5432)")
     raw_url = raw_url.replace(":6543", ":5432")
 
 # Ensure correct driver
@@ -24,10 +32,6 @@ if "postgres" in raw_url and "+asyncpg" not in raw_url:
 if "?" in raw_url:
     raw_url = raw_url.split("?")[0]
 
-print("----------------------------------------------------------------")
-print(f"DEBUG: Connection URL: {raw_url.split('@')[-1]}") 
-print("----------------------------------------------------------------")
-
 connect_args: Dict[str, Any] = {}
 
 if "asyncpg" in raw_url:
@@ -43,11 +47,23 @@ if "asyncpg" in raw_url:
     # C. Cache Settings (Safety for Supabase)
     connect_args["statement_cache_size"] = 0
 
+class InstrumentedAsyncPool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long each checkout waited for a connection."""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_CHECKOUT_SECONDS.observe(time.perf_counter() - started)
+
+
 engine = create_async_engine(
     raw_url,
     echo=False,
     future=True,
     connect_args=connect_args,
+    poolclass=InstrumentedAsyncPool,
     # Connection health options to prevent dropped sessions
     pool_pre_ping=True,  # Automatically detects and discards dead connections
     pool_recycle=300,    # Refreshes connections every 5 minutes
@@ -55,6 +71,25 @@ engine = create_async_engine(
     max_overflow=20,
 )
 
+@event.listens_for(engine.sync_engine, "before_cursor_execute")
+def _start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+@event.listens_for(engine.sync_engine, "after_cursor_execute")
+def _record_query_time(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["query_started"].pop()
+    query_stats.record(statement, time.perf_counter() - started, parameters, executemany)
+
+
+@event.listens_for(engine.sync_engine, "handle_error")
+def _drop_query_timer(exception_context):
+    # after_cursor_execute does not run for a failed statement.
+    connection = exception_context.connection
+    if connection is not None and connection.info.get("query_started"):
+        connection.info["query_started"].pop()
+
+
 AsyncSessionLocal = async_sessionmaker(
     engine,
     class_=AsyncSession,
@@ -64,6 +99,7 @@ AsyncSessionLocal = async_sessionmaker(
 Base = declarative_base()
 
 async def connect_db() -> None:
+    LOG.info("Connecting to database at %s", raw_url.split("@")[-1])
     if "sqlite" in raw_url: 
         async with engine.begin() as conn:
             await conn.run_sync(Base.metadata.create_all)
@@ -0,0 +1,121 @@
+"""Application logging: a background writer, structured output and sampling.
+
+Log calls only put the record on an in-memory queue; a QueueListener thread
+formats and writes it, so the event loop and the MQTT network thread never
+block on stdout. Records are queued unformatted (messages use %-style
+arguments), so a record's text is built on the writer thread and a disabled
+level costs only the level check. Arguments must not be mutated after the
+call that logs them.
+"""
+
+import itertools
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+from datetime import datetime, timezone
+from typing import Any, Dict, FrozenSet, Optional
+
+from app.core.settings import settings
+
+# Attributes every LogRecord has; anything else was passed through `extra`.
+_RECORD_FIELDS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+TEXT_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_handler: Optional[logging.Handler] = None
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line with the record's `extra` fields included."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_FIELDS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that leaves formatting to the listener thread."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+class Sampler:
+    """Lets through one call in `every`, for per-message debug logs.
+
+    `every` <= 1 lets everything through.
+    """
+
+    def __init__(self, every: int) -> None:
+        self.every = max(1, every)
+        self._calls = itertools.count()
+
+    def __call__(self) -> bool:
+        return next(self._calls) % self.every == 0
+
+
+def _parse_list(value: str) -> FrozenSet[str]:
+    return frozenset(item.strip() for item in value.split(",") if item.strip())
+
+
+_payload_devices = _parse_list(settings.log_payload_devices)
+_payload_topics = _parse_list(settings.log_payload_topics)
+
+
+def payload_logging_enabled(device_id: Optional[str] = None, topic: Optional[str] = None) -> bool:
+    """Whether full payloads should be logged for this device or topic.
+
+    Opt in with LOG_PAYLOAD_DEVICES / LOG_PAYLOAD_TOPICS (comma-separated, or
+    "*" for everything).
+    """
+    if _payload_devices and ("*" in _payload_devices or device_id in _payload_devices):
+        return True
+    return bool(_payload_topics) and ("*" in _payload_topics or topic in _payload_topics)
+
+
+def setup_logging(level: Optional[str] = None, fmt: Optional[str] = None) -> None:
+    """Route the root logger through a queue to a background stdout writer.
+
+    Safe to call more than once; later calls only change the level.
+    """
+    global _listener, _handler
+    root = logging.getLogger()
+    root.setLevel((level or settings.log_level).upper())
+    if _listener is not None:
+        return
+
+    stream = logging.StreamHandler(sys.stdout)
+    if (fmt or settings.log_format) == "json":
+        stream.setFormatter(JSONFormatter())
+    else:
+        stream.setFormatter(logging.Formatter(TEXT_FORMAT))
+
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    _handler = _DeferredQueueHandler(log_queue)
+    root.addHandler(_handler)
+    _listener = logging.handlers.QueueListener(log_queue, stream, respect_handler_level=True)
+    _listener.start()
+
+
+def shutdown_logging() -> None:
+    """Detach the queue handler, flush queued records and stop the writer thread."""
+    global _listener, _handler
+    if _handler is not None:
+        logging.getLogger().removeHandler(_handler)
+        _handler = None
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
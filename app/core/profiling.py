@@ -0,0 +1,193 @@
+"""Wall-clock sampling profiler for individual requests.
+
+While a request is profiled, a background thread samples the request task's
+stack every few milliseconds. The stack is rebuilt from the task's chain of
+awaiting coroutines, so time spent waiting on the database or Redis shows up
+under the code that awaited it, and is extended with the event loop thread's
+current frames when the task itself is running. Samples are aggregated into
+collapsed stacks ("outer;inner count" lines), the input format of
+flamegraph.pl, speedscope and similar viewers.
+"""
+
+import asyncio
+import itertools
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from functools import lru_cache
+from types import FrameType
+from typing import Any, Deque, Dict, List, Optional
+
+from app.core.settings import settings
+
+# Coroutine chains deeper than this are cut off (guards against cycles).
+MAX_DEPTH = 256
+
+_ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@lru_cache(maxsize=4096)
+def _short_path(filename: str) -> str:
+    if filename.startswith(_ROOT_DIR):
+        return os.path.relpath(filename, _ROOT_DIR)
+    marker = "site-packages" + os.sep
+    index = filename.rfind(marker)
+    if index != -1:
+        return filename[index + len(marker):]
+    return os.path.basename(filename)
+
+
+def _label(frame: FrameType) -> str:
+    code = frame.f_code
+    name = getattr(code, "co_qualname", code.co_name)
+    return f"{name} ({_short_path(code.co_filename)}:{code.co_firstlineno})".replace(";", ",")
+
+
+def _task_frames(task: "asyncio.Task[Any]") -> List[Any]:
+    """Frames of a task's coroutine chain, outermost first.
+
+    Ends with the name of whatever non-coroutine awaitable the chain is
+    blocked on, such as a Future.
+    """
+    frames: List[Any] = []
+    awaitable: Any = task.get_coro()
+    while awaitable is not None and len(frames) < MAX_DEPTH:
+        if isinstance(awaitable, asyncio.Task):
+            awaitable = awaitable.get_coro()
+            continue
+        frame = (
+            getattr(awaitable, "cr_frame", None)
+            or getattr(awaitable, "gi_frame", None)
+            or getattr(awaitable, "ag_frame", None)
+        )
+        if frame is None:
+            if not hasattr(awaitable, "cr_frame") and not hasattr(awaitable, "gi_frame"):
+                name = type(awaitable).__name__
+                # The C Future's __await__ iterator; the Future itself is not reachable.
+                frames.append("<Future>" if name == "FutureIter" else f"<{name}>")
+            break
+        frames.append(frame)
+        awaitable = (
+            getattr(awaitable, "cr_await", None)
+            or getattr(awaitable, "gi_yieldfrom", None)
+            or getattr(awaitable, "ag_await", None)
+        )
+    return frames
+
+
+def _thread_frames(thread_id: int) -> List[FrameType]:
+    frame = sys._current_frames().get(thread_id)
+    frames: List[FrameType] = []
+    while frame is not None:
+        frames.append(frame)
+        frame = frame.f_back
+    frames.reverse()
+    return frames
+
+
+@dataclass
+class Profile:
+    """Aggregated samples for one request."""
+
+    id: int
+    method: str
+    path: str
+    started_at: datetime
+    interval_ms: float
+    duration_ms: float = 0.0
+    stacks: Counter = field(default_factory=Counter)
+
+    @property
+    def samples(self) -> int:
+        return sum(self.stacks.values())
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "started_at": self.started_at.isoformat(),
+            "duration_ms": round(self.duration_ms, 3),
+            "interval_ms": self.interval_ms,
+            "samples": self.samples,
+        }
+
+    def collapsed(self) -> str:
+        """The profile in collapsed-stack format, heaviest stacks first."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class RequestSampler:
+    """Samples one task's stack on a background thread until stopped."""
+
+    def __init__(self, task: "asyncio.Task[Any]", profile: Profile) -> None:
+        self.task = task
+        self.profile = profile
+        self.interval = profile.interval_ms / 1000.0
+        self._loop_thread = threading.get_ident()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+        self._started = 0.0
+
+    def start(self) -> None:
+        self._started = time.perf_counter()
+        self._thread.start()
+
+    def stop(self) -> Profile:
+        self._stopped.set()
+        self._thread.join()
+        self.profile.duration_ms = (time.perf_counter() - self._started) * 1000.0
+        return self.profile
+
+    def _sample(self) -> Optional[str]:
+        frames = _task_frames(self.task)
+        if not frames:
+            return None
+        innermost = frames[-1]
+        if not isinstance(innermost, str):
+            # The task is running: add what it is executing right now.
+            running = _thread_frames(self._loop_thread)
+            for index, frame in enumerate(running):
+                if frame is innermost:
+                    frames.extend(running[index + 1:])
+                    break
+        return ";".join(frame if isinstance(frame, str) else _label(frame) for frame in frames)
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            stack = self._sample()
+            if stack:
+                self.profile.stacks[stack] += 1
+
+
+class ProfileStore:
+    """The most recent profiles, oldest dropped first."""
+
+    def __init__(self, max_profiles: Optional[int] = None) -> None:
+        self._profiles: Deque[Profile] = deque(maxlen=max_profiles or settings.profile_keep)
+        self._ids = itertools.count(1)
+
+    def new_profile(self, method: str, path: str) -> Profile:
+        return Profile(
+            id=next(self._ids),
+            method=method,
+            path=path,
+            started_at=datetime.utcnow(),
+            interval_ms=settings.profile_interval_ms,
+        )
+
+    def add(self, profile: Profile) -> None:
+        self._profiles.append(profile)
+
+    def list(self) -> List[Dict[str, Any]]:
+        return [profile.summary() for profile in reversed(self._profiles)]
+
+    def get(self, profile_id: int) -> Optional[Profile]:
+        return next((profile for profile in self._profiles if profile.id == profile_id), None)
+
+
+profile_store = ProfileStore()
@@ -0,0 +1,148 @@
+"""Per-statement SQL timings grouped by fingerprint, and per-request query counts.
+
+The engine's cursor hooks call `query_stats.record` for every statement. Statements
+are reduced to a fingerprint (literals and IN/VALUES lists collapsed) so the
+same query with different arguments is counted together. Requests opt in to
+counting through `track_request`, which puts a counter in a contextvar that
+the hooks update; queries run by background tasks are not attributed to any
+request.
+"""
+
+import logging
+import re
+import threading
+from contextvars import ContextVar, Token
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+from app.core.metrics import registry
+from app.core.settings import settings
+
+LOG = logging.getLogger(__name__)
+
+# Distinct fingerprints kept; beyond this, new fingerprints share one slot.
+MAX_FINGERPRINTS = 2000
+OVERFLOW_FINGERPRINT = "<other>"
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_POSITIONAL_PARAM = re.compile(r"\$\d+|%\(\w+\)s|%s|(?<![:\w]):[A-Za-z_]\w*|\?")
+_PARAM_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_VALUES_ROWS = re.compile(r"(VALUES\s*\(\?\))(?:\s*,\s*\(\?\))+", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+
+QUERIES_PER_REQUEST = registry.histogram(
+    "obex_db_queries_per_request",
+    "SQL statements executed while handling one HTTP request",
+    buckets=(1, 2, 5, 10, 20, 50, 100, 250),
+)
+
+
+@lru_cache(maxsize=4096)
+def fingerprint(statement: str) -> str:
+    """Normalise a SQL statement so calls differing only in values match."""
+    text = _STRING_LITERAL.sub("?", statement)
+    text = _POSITIONAL_PARAM.sub("?", text)
+    text = _NUMBER_LITERAL.sub("?", text)
+    text = _WHITESPACE.sub(" ", text).strip()
+    text = _PARAM_LIST.sub("(?)", text)
+    return _VALUES_ROWS.sub(r"\1", text)
+
+
+def parameter_shape(parameters: Any, executemany: bool = False) -> str:
+    """Describe bind parameters by type only, so values never reach the log."""
+    if executemany and isinstance(parameters, (list, tuple)):
+        first = parameter_shape(parameters[0]) if parameters else "-"
+        return f"{len(parameters)} x {first}"
+    if isinstance(parameters, dict):
+        return "{" + ", ".join(f"{key}: {type(value).__name__}" for key, value in parameters.items()) + "}"
+    if isinstance(parameters, (list, tuple)):
+        return "(" + ", ".join(type(value).__name__ for value in parameters) + ")"
+    return type(parameters).__name__
+
+
+@dataclass
+class RequestQueries:
+    """Statements run while handling one request."""
+
+    count: int = 0
+    seconds: float = 0.0
+
+
+_current_request: ContextVar[Optional[RequestQueries]] = ContextVar("current_request_queries", default=None)
+
+
+class QueryStats:
+    """Running count, total and max time per statement fingerprint."""
+
+    def __init__(self, slow_query_ms: Optional[float] = None) -> None:
+        self.slow_query_seconds = (
+            slow_query_ms if slow_query_ms is not None else settings.sql_slow_query_ms
+        ) / 1000.0
+        self._stats: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, statement: str, seconds: float, parameters: Any = None, executemany: bool = False) -> None:
+        key = fingerprint(statement)
+        with self._lock:
+            entry = self._stats.get(key)
+            if entry is None:
+                if len(self._stats) >= MAX_FINGERPRINTS:
+                    key = OVERFLOW_FINGERPRINT
+                entry = self._stats.setdefault(key, [0, 0.0, 0.0])
+            entry[0] += 1
+            entry[1] += seconds
+            if seconds > entry[2]:
+                entry[2] = seconds
+
+        current = _current_request.get()
+        if current is not None:
+            current.count += 1
+            current.seconds += seconds
+
+        if seconds >= self.slow_query_seconds:
+            LOG.warning(
+                "Slow query (%.1f ms): %s params=%s",
+                seconds * 1000.0, key, parameter_shape(parameters, executemany),
+            )
+
+    def top(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """Fingerprints with the most total time, slowest first."""
+        with self._lock:
+            items = [(key, list(entry)) for key, entry in self._stats.items()]
+        items.sort(key=lambda item: item[1][1], reverse=True)
+        return [
+            {
+                "fingerprint": key,
+                "calls": int(calls),
+                "total_ms": round(total * 1000.0, 3),
+                "mean_ms": round(total * 1000.0 / calls, 3),
+                "max_ms": round(slowest * 1000.0, 3),
+            }
+            for key, (calls, total, slowest) in items[:limit]
+        ]
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats.clear()
+
+
+def track_request() -> Token:
+    """Start counting queries for the current request context."""
+    return _current_request.set(RequestQueries())
+
+
+def finish_request(token: Token) -> RequestQueries:
+    """Stop counting, record the request's query count and return it."""
+    current = _current_request.get() or RequestQueries()
+    _current_request.reset(token)
+    QUERIES_PER_REQUEST.observe(current.count)
+    return current
+
+
+def current_request_queries() -> Optional[RequestQueries]:
+    return _current_request.get()
+
+
+query_stats = QueryStats()
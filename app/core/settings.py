@@ -21,6 +21,52 @@ class Settings(BaseSettings):
         description="Test database URL",
     )
 
+    log_level: str = Field(default="INFO", alias="LOG_LEVEL")
+    log_format: str = Field(
+        default="text",
+        alias="LOG_FORMAT",
+        description="Log line format: text or json",
+    )
+    log_debug_sample_every: int = Field(
+        default=100,
+        alias="LOG_DEBUG_SAMPLE_EVERY",
+        description="Per-message debug logs are written for one message in this many",
+    )
+    log_payload_devices: str = Field(
+        default="",
+        alias="LOG_PAYLOAD_DEVICES",
+        description="Comma-separated device ids whose full alert payloads are logged, or *",
+    )
+    log_payload_topics: str = Field(
+        default="",
+        alias="LOG_PAYLOAD_TOPICS",
+        description="Comma-separated MQTT topics whose full payloads are logged, or *",
+    )
+
+    sql_slow_query_ms: float = Field(
+        default=200.0,
+        alias="SQL_SLOW_QUERY_MS",
+        description="Statements slower than this are logged with their parameter shape",
+    )
+    admin_token: Optional[str] = Field(
+        default=None,
+        alias="ADMIN_TOKEN",
+        description="Token expected in X-Admin-Token for admin endpoints; unset disables them",
+    )
+
+    profiling_enabled: bool = Field(
+        default=False,
+        alias="PROFILING_ENABLED",
+        description="Install the request profiling middleware",
+    )
+    profile_sample_rate: float = Field(
+        default=0.0,
+        alias="PROFILE_SAMPLE_RATE",
+        description="Fraction of requests profiled without being asked to",
+    )
+    profile_interval_ms: float = Field(default=5.0, alias="PROFILE_INTERVAL_MS")
+    profile_keep: int = Field(default=20, alias="PROFILE_KEEP")
+
     redis_host: str = Field(default="localhost", alias="REDIS_HOST")
     redis_port: int = Field(default=6379, alias="REDIS_PORT")
     redis_db: int = Field(default=0, alias="REDIS_DB")
@@ -30,10 +76,95 @@ class Settings(BaseSettings):
     )
     cache_prefix: str = Field(default="obex", alias="CACHE_PREFIX")
     cache_ttl: int = Field(default=3600, alias="CACHE_TTL")
+    cache_soft_ttl: int = Field(
+        default=60,
+        alias="CACHE_SOFT_TTL",
+        description="Seconds a stale-while-revalidate entry is served without triggering a refresh",
+    )
+    cache_lock_ttl: int = Field(default=30, alias="CACHE_LOCK_TTL")
+    cache_lock_wait: float = Field(default=5.0, alias="CACHE_LOCK_WAIT")
+    cache_l1_enabled: bool = Field(default=True, alias="CACHE_L1_ENABLED")
+    cache_l1_max_bytes: int = Field(default=32 * 1024 * 1024, alias="CACHE_L1_MAX_BYTES")
+    cache_l1_max_entries: int = Field(default=2048, alias="CACHE_L1_MAX_ENTRIES")
+    cache_l1_ttl: float = Field(
+        default=5.0,
+        alias="CACHE_L1_TTL",
+        description="Seconds an entry lives in the in-process cache before Redis is read again",
+    )
+    cache_sealed_bucket_ttl: int = Field(
+        default=7 * 24 * 3600,
+        alias="CACHE_SEALED_BUCKET_TTL",
+        description="TTL of closed hourly timeframe buckets; late alerts invalidate them explicitly",
+    )
+    cache_serializer: str = Field(
+        default="orjson",
+        alias="CACHE_SERIALIZER",
+        description="Cache value encoding: json, orjson or msgpack (falls back to json if not installed)",
+    )
+    cache_compression: str = Field(
+        default="zlib",
+        alias="CACHE_COMPRESSION",
+        description="Compression for large cache values: none, zlib or zstd",
+    )
+    cache_compress_min_bytes: int = Field(default=4096, alias="CACHE_COMPRESS_MIN_BYTES")
+    cache_invalidation_channel: str = Field(
+        default="obex:cache:invalidate",
+        alias="CACHE_INVALIDATION_CHANNEL",
+    )
+    cache_invalidation_timeout: float = Field(
+        default=2.0,
+        alias="CACHE_INVALIDATION_TIMEOUT",
+        description="Seconds alert ingestion waits for cache invalidation before moving on",
+    )
 
     jwt_secret: str = Field(default="change-me-in-prod", alias="JWT_SECRET")
     jwt_algorithm: str = Field(default="HS256", alias="JWT_ALGORITHM")
     jwt_exp_minutes: int = Field(default=60, alias="JWT_EXP_MINUTES")
+    auth_token_cache_size: int = Field(
+        default=10000,
+        alias="AUTH_TOKEN_CACHE_SIZE",
+        description="Verified bearer tokens remembered per process",
+    )
+    auth_token_cache_ttl: float = Field(default=300.0, alias="AUTH_TOKEN_CACHE_TTL")
+    auth_principal_ttl: int = Field(default=300, alias="AUTH_PRINCIPAL_TTL")
+    revocation_channel: str = Field(default="obex:auth:revoked", alias="REVOCATION_CHANNEL")
+    revocation_bloom_capacity: int = Field(default=100000, alias="REVOCATION_BLOOM_CAPACITY")
+    revocation_bloom_error_rate: float = Field(default=0.001, alias="REVOCATION_BLOOM_ERROR_RATE")
+    revocation_bloom_rebuild_seconds: float = Field(
+        default=3600.0,
+        alias="REVOCATION_BLOOM_REBUILD_SECONDS",
+        description="How often the Bloom filter is rebuilt to shed expired revocations",
+    )
+    login_max_failures: int = Field(default=5, alias="LOGIN_MAX_FAILURES")
+    login_failure_window_seconds: int = Field(default=900, alias="LOGIN_FAILURE_WINDOW_SECONDS")
+    login_lock_minutes: int = Field(default=15, alias="LOGIN_LOCK_MINUTES")
+    login_ip_max_attempts: int = Field(
+        default=20,
+        alias="LOGIN_IP_MAX_ATTEMPTS",
+        description="Login attempts allowed per client address per window",
+    )
+    login_ip_window_seconds: int = Field(default=60, alias="LOGIN_IP_WINDOW_SECONDS")
+    trusted_proxies: str = Field(
+        default="",
+        alias="TRUSTED_PROXIES",
+        description="Comma-separated proxy addresses or networks whose X-Forwarded-For is trusted",
+    )
+    last_login_flush_seconds: float = Field(default=30.0, alias="LAST_LOGIN_FLUSH_SECONDS")
+
+    # Argon2 cost parameters; run scripts/calibrate_argon2.py to pick them.
+    password_hash_time_cost: int = Field(default=3, alias="PASSWORD_HASH_TIME_COST")
+    password_hash_memory_cost: int = Field(
+        default=65536,
+        alias="PASSWORD_HASH_MEMORY_COST",
+        description="Argon2 memory cost in KiB",
+    )
+    password_hash_parallelism: int = Field(default=4, alias="PASSWORD_HASH_PARALLELISM")
+    password_hash_workers: Optional[int] = Field(
+        default=None,
+        alias="PASSWORD_HASH_WORKERS",
+        description="Threads dedicated to password hashing (default: min(4, CPU count))",
+    )
+    password_hash_max_pending: int = Field(default=64, alias="PASSWORD_HASH_MAX_PENDING")
 
     mqtt_broker_host: str = Field(
         default="test.mosquitto.org",
@@ -44,6 +175,56 @@ class Settings(BaseSettings):
     mqtt_username: Optional[str] = Field(default=None, alias="MQTT_USERNAME")
     mqtt_password: Optional[str] = Field(default=None, alias="MQTT_PASSWORD")
     mqtt_use_tls: bool = Field(default=False, alias="MQTT_USE_TLS")
+    mqtt_ingest_queue_size: int = Field(default=1000, alias="MQTT_INGEST_QUEUE_SIZE")
+    mqtt_overflow_policy: str = Field(
+        default="block",
+        alias="MQTT_OVERFLOW_POLICY",
+        description="What to do when the ingest queue is full: block, drop_oldest or spill",
+    )
+    mqtt_spill_path: str = Field(default="./mqtt_spill.jsonl", alias="MQTT_SPILL_PATH")
+
+    alert_batch_size: int = Field(default=500, alias="ALERT_BATCH_SIZE")
+    alert_batch_max_delay_ms: int = Field(default=20, alias="ALERT_BATCH_MAX_DELAY_MS")
+    alert_queue_size: int = Field(default=10000, alias="ALERT_QUEUE_SIZE")
+    alert_commit_max_retries: int = Field(
+        default=2,
+        alias="ALERT_COMMIT_MAX_RETRIES",
+        description="Retries of a failed batch commit before alerts are written one by one",
+    )
+    alert_commit_retry_backoff: float = Field(default=0.1, alias="ALERT_COMMIT_RETRY_BACKOFF")
+    alert_commit_retry_budget: float = Field(
+        default=1.0,
+        alias="ALERT_COMMIT_RETRY_BUDGET",
+        description="Seconds one failing batch may spend on retries before it is written one by one",
+    )
+
+    model_log_batch_max_items: int = Field(default=10000, alias="MODEL_LOG_BATCH_MAX_ITEMS")
+    model_log_batch_max_bytes: int = Field(
+        default=16 * 1024 * 1024,
+        alias="MODEL_LOG_BATCH_MAX_BYTES",
+        description="Largest batch body accepted, measured after gzip decompression",
+    )
+
+    ws_client_queue_size: int = Field(default=256, alias="WS_CLIENT_QUEUE_SIZE")
+    ws_client_high_water: int = Field(default=192, alias="WS_CLIENT_HIGH_WATER")
+    ws_slow_consumer_policy: str = Field(
+        default="disconnect",
+        alias="WS_SLOW_CONSUMER_POLICY",
+        description="What to do with a client past the high-water mark: disconnect or drop_oldest",
+    )
+    ws_broadcast_backend: str = Field(
+        default="local",
+        alias="WS_BROADCAST_BACKEND",
+        description="How alerts reach other workers' WebSocket clients: local or redis",
+    )
+    ws_broadcast_channel: str = Field(default="obex:ws:alerts", alias="WS_BROADCAST_CHANNEL")
+
+    otp_backend: str = Field(
+        default="sql",
+        alias="OTP_BACKEND",
+        description="Where one-time passwords are kept: sql or redis",
+    )
+    otp_max_attempts: int = Field(default=5, alias="OTP_MAX_ATTEMPTS")
 
     mail_username: str = Field(default="", alias="MAIL_USERNAME")
     mail_password: str = Field(default="", alias="MAIL_PASSWORD")
@@ -55,6 +236,32 @@ class Settings(BaseSettings):
     mail_ssl_tls: bool = Field(default=False, alias="MAIL_SSL_TLS")
     use_credentials: bool = Field(default=True, alias="USE_CREDENTIALS")
     validate_certs: bool = Field(default=True, alias="VALIDATE_CERTS")
+    mail_pool_size: int = Field(
+        default=2,
+        alias="MAIL_POOL_SIZE",
+        description="Persistent SMTP connections (one delivery worker each)",
+    )
+    mail_queue_size: int = Field(
+        default=1000,
+        alias="MAIL_QUEUE_SIZE",
+        description="Emails the Redis mail stream may hold before new ones are refused",
+    )
+    mail_max_retries: int = Field(default=3, alias="MAIL_MAX_RETRIES")
+    mail_retry_backoff: float = Field(
+        default=1.0,
+        alias="MAIL_RETRY_BACKOFF",
+        description="Seconds before the first retry; doubles on each further attempt",
+    )
+    mail_drain_timeout: float = Field(
+        default=10.0,
+        alias="MAIL_DRAIN_TIMEOUT",
+        description="Seconds shutdown waits for emails being sent; queued ones stay in Redis",
+    )
+    mail_claim_idle_seconds: float = Field(
+        default=300.0,
+        alias="MAIL_CLAIM_IDLE_SECONDS",
+        description="Seconds an unacknowledged email waits before another worker retries it",
+    )
 
     class Config:
         env_file = ".env"
@@ -79,6 +286,9 @@ MQTT_CONFIG = {
     "USERNAME": settings.mqtt_username or "",
     "PASSWORD": settings.mqtt_password or "",
     "USE_TLS": bool(settings.mqtt_use_tls),
+    "INGEST_QUEUE_SIZE": settings.mqtt_ingest_queue_size,
+    "OVERFLOW_POLICY": settings.mqtt_overflow_policy,
+    "SPILL_PATH": settings.mqtt_spill_path,
 }
 
 
@@ -89,6 +299,19 @@ REDIS_CONFIG = {
     "PASSWORD": settings.redis_password,
     "PREFIX": settings.cache_prefix,
     "DEFAULT_TIMEOUT": settings.cache_ttl,
+    "SOFT_TIMEOUT": settings.cache_soft_ttl,
+    "LOCK_TIMEOUT": settings.cache_lock_ttl,
+    "LOCK_WAIT": settings.cache_lock_wait,
+    "L1_ENABLED": settings.cache_l1_enabled,
+    "L1_MAX_BYTES": settings.cache_l1_max_bytes,
+    "L1_MAX_ENTRIES": settings.cache_l1_max_entries,
+    "L1_TTL": settings.cache_l1_ttl,
+    "INVALIDATION_CHANNEL": settings.cache_invalidation_channel,
+    "INVALIDATION_TIMEOUT": settings.cache_invalidation_timeout,
+    "SEALED_BUCKET_TIMEOUT": settings.cache_sealed_bucket_ttl,
+    "SERIALIZER": settings.cache_serializer,
+    "COMPRESSION": settings.cache_compression,
+    "COMPRESS_MIN_BYTES": settings.cache_compress_min_bytes,
 }
 
 
@@ -0,0 +1,25 @@
+"""Dialect-aware upsert helpers."""
+
+from typing import Any, Dict, List, Sequence
+
+from sqlalchemy import Table
+
+
+def counter_upsert(dialect_name: str, table: Table, rows: List[Dict[str, Any]], count_columns: Sequence[str]):
+    """Build an INSERT that adds to the given counters when the key already exists.
+
+    The conflict target is the table's primary key. Supported on PostgreSQL
+    and SQLite, both of which provide INSERT ... ON CONFLICT DO UPDATE.
+    """
+    if dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect_name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise NotImplementedError(f"Counter upserts are not supported on {dialect_name}")
+
+    stmt = insert(table).values(rows)
+    return stmt.on_conflict_do_update(
+        index_elements=[column.name for column in table.primary_key.columns],
+        set_={name: table.c[name] + stmt.excluded[name] for name in count_columns},
+    )
@@ -1,36 +1,65 @@
 """Main application factory and initialization."""
 
+import logging
 import threading
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from app.core.settings import API_CONFIG
+from app.core.logging import setup_logging, shutdown_logging
+from app.core.settings import API_CONFIG, settings
 from app.config.database import connect_db, close_db
+import app.services.cache as cache_module
+from app.services.alert_pipeline import alert_pipeline
+from app.services.login_throttle import last_login_recorder
+from app.services.mail_queue import mail_queue
 from app.services.mqtt_client import mqtt_service
+from app.services.password_hasher import password_hasher
+from app.services.token_revocation import revocation_list
+from app.services.websocket import manager
 
-from app.api.endpoints import alerts, analytics, devices, websocket, home, cameras, otp
+from app.api.endpoints import admin, alerts, analytics, devices, websocket, home, cameras, otp, metrics
+from app.api.middleware import ProfilingMiddleware, QueryCountMiddleware
+
+LOG = logging.getLogger(__name__)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """
     Manages application startup and shutdown events.
     """
-    print("--- App Startup ---")
+    setup_logging()
+    LOG.info("App startup")
     await connect_db()
-    
-    print("Starting MQTT client thread...")
+    await cache_module.cache.start()
+    await manager.start()
+    await last_login_recorder.start()
+    await revocation_list.start()
+    await mail_queue.start()
+    await alert_pipeline.start()
+    await mqtt_service.start_dispatcher()
+
+    LOG.info("Starting MQTT client thread")
     mqtt_thread = threading.Thread(target=mqtt_service.start, daemon=True)
     mqtt_thread.start()
     
     yield
     
-    print("--- App Shutdown ---")
+    LOG.info("App shutdown")
     mqtt_service.stop()
-    
+    await mqtt_service.stop_dispatcher()
+    await alert_pipeline.stop()
+    await manager.stop()
+    await revocation_list.stop()
+    await mail_queue.stop()
+    await last_login_recorder.stop()
+    await cache_module.cache.stop()
+    password_hasher.shutdown()
+
     await close_db()
-    print("--- Shutdown complete ---")
+    LOG.info("Shutdown complete")
+    shutdown_logging()
 
 
 def create_app() -> FastAPI:
@@ -51,6 +80,9 @@ def create_app() -> FastAPI:
         allow_methods=["*"],
         allow_headers=["*"],
     )
+    app.add_middleware(QueryCountMiddleware)
+    if settings.profiling_enabled:
+        app.add_middleware(ProfilingMiddleware)
 
     app.include_router(home.router)
     
@@ -69,6 +101,9 @@ def create_app() -> FastAPI:
     from app.api.endpoints import model_logs
     app.include_router(model_logs.router)
 
+    app.include_router(metrics.router)
+    app.include_router(admin.router)
+
     return app
 
 app = create_app()
\ No newline at end of file
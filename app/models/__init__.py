@@ -1,9 +1,12 @@
 """Initialize database models."""
 
 from app.models.alert import Alert
+from app.models.alert_rollup import AlertRollup
 from app.models.device import Device
-from app.models.model_log import ModelLog
+from app.models.model_log import ModelLog, ModelLogRollup
 from app.models.user import User
 
 __all__ = ["Alert", "Device", "User"]
-__all__.append("ModelLog")
\ No newline at end of file
+__all__.append("ModelLog")
+__all__.append("AlertRollup")
+__all__.append("ModelLogRollup")
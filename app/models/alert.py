@@ -1,6 +1,6 @@
 """Alert models for the database."""
 
-from sqlalchemy import Column, String, Float, TIMESTAMP
+from sqlalchemy import Column, String, Float, TIMESTAMP, Index
 import os
 from sqlalchemy.dialects.postgresql import JSON
 import json
@@ -31,7 +31,16 @@ class Alert(Base):
     location_lat = Column(Float)
     location_lon = Column(Float)
     payload = Column(JSON)
-    
+
+    # Shaped around the predicates in AlertQueryService and the alert listing:
+    # per-device history/statistics, time-range scans with a type filter or
+    # group-by, and the lat/lon bounding box used by location search.
+    __table_args__ = (
+        Index("ix_alerts_device_id_timestamp", device_id, timestamp.desc()),
+        Index("ix_alerts_timestamp_alert_type", timestamp, alert_type),
+        Index("ix_alerts_location", location_lat, location_lon),
+    )
+
     def __init__(self, **kwargs):
         # Ensure payload is a string if it's a dict
         if 'payload' in kwargs and isinstance(kwargs['payload'], dict):
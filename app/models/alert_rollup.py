@@ -0,0 +1,103 @@
+"""Hourly alert rollups maintained alongside the alerts table."""
+
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlalchemy import Column, String, DateTime, Integer, Index, event, inspect
+from sqlalchemy.orm import Session
+
+from app.config.database import Base
+from app.db.upsert import counter_upsert
+from app.models.alert import Alert
+
+
+class AlertRollup(Base):
+    """
+    Alert counts per (hour, alert type, device).
+    Rows are upserted in the same transaction that inserts or deletes alerts,
+    so aggregate queries can read buckets instead of scanning raw alerts.
+    """
+    __tablename__ = "alert_rollups"
+
+    bucket_hour = Column(DateTime, primary_key=True)  # naive UTC, truncated to the hour
+    alert_type = Column(String, primary_key=True)
+    device_id = Column(String, primary_key=True)
+    alert_count = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        Index("ix_alert_rollups_device_id_alert_type", device_id, alert_type),
+    )
+
+
+def to_utc_naive(value: datetime) -> datetime:
+    """Normalise a datetime to naive UTC (naive values are assumed to be UTC)."""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def bucket_hour(value: datetime) -> datetime:
+    """Return the naive-UTC hour bucket a timestamp falls into."""
+    return to_utc_naive(value).replace(minute=0, second=0, microsecond=0)
+
+
+def _alert_key(alert: Alert) -> Optional[tuple]:
+    if alert.timestamp is None:
+        return None
+    return bucket_hour(alert.timestamp), alert.alert_type, alert.device_id
+
+
+def _previous_alert_key(alert: Alert) -> Optional[tuple]:
+    """The rollup key an updated alert had before this flush, if it changed."""
+    state = inspect(alert)
+    values = {}
+    for name in ("timestamp", "alert_type", "device_id"):
+        deleted = state.attrs[name].history.deleted
+        values[name] = deleted[0] if deleted else getattr(alert, name)
+    if values["timestamp"] is None:
+        return None
+    return bucket_hour(values["timestamp"]), values["alert_type"], values["device_id"]
+
+
+@event.listens_for(Session, "after_flush")
+def _maintain_alert_rollups(session: Session, flush_context) -> None:
+    """Fold alerts inserted, updated or deleted by this flush into the rollup table.
+
+    An update that moves an alert to another hour, type or device moves its
+    count with it. Rows are written in primary-key order so concurrent
+    transactions lock shared rollup rows in the same order and cannot
+    deadlock each other.
+    """
+    deltas: Counter = Counter()
+    for obj in session.new:
+        if isinstance(obj, Alert):
+            key = _alert_key(obj)
+            if key is not None:
+                deltas[key] += 1
+    for obj in session.dirty:
+        if isinstance(obj, Alert):
+            previous, current = _previous_alert_key(obj), _alert_key(obj)
+            if previous != current:
+                if previous is not None:
+                    deltas[previous] -= 1
+                if current is not None:
+                    deltas[current] += 1
+    for obj in session.deleted:
+        if isinstance(obj, Alert):
+            key = _alert_key(obj)
+            if key is not None:
+                deltas[key] -= 1
+
+    rows = [
+        {"bucket_hour": hour, "alert_type": alert_type, "device_id": device_id, "alert_count": count}
+        for (hour, alert_type, device_id), count in sorted(deltas.items())
+        if count
+    ]
+    if not rows:
+        return
+
+    connection = session.connection()
+    connection.execute(
+        counter_upsert(connection.dialect.name, AlertRollup.__table__, rows, ["alert_count"])
+    )
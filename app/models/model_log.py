@@ -1,7 +1,7 @@
 """
 ModelLog: Stores logs generated by ML models for cloud integration and dashboard summary.
 """
-from sqlalchemy import Column, String, DateTime, JSON, Integer
+from sqlalchemy import Column, String, DateTime, JSON, Integer, Index
 from datetime import datetime
 from app.config.database import Base
 
@@ -14,3 +14,21 @@ class ModelLog(Base):
     log_level = Column(String, nullable=False)
     message = Column(String, nullable=False)
     extra = Column(JSON, nullable=True)
+
+    __table_args__ = (
+        Index("ix_model_logs_timestamp_model_name_log_level", timestamp, model_name, log_level),
+    )
+
+
+class ModelLogRollup(Base):
+    """
+    Log counts per (hour, model, level).
+    Rows are upserted by ModelLogService in the same transaction that inserts
+    the logs, so long-range summaries read buckets instead of raw logs.
+    """
+    __tablename__ = "model_log_rollups"
+
+    bucket_hour = Column(DateTime, primary_key=True)  # naive UTC, truncated to the hour
+    model_name = Column(String, primary_key=True)
+    log_level = Column(String, primary_key=True)
+    log_count = Column(Integer, nullable=False, default=0)
@@ -2,7 +2,7 @@
 Pydantic schemas for model log ingestion and summary responses.
 """
 from datetime import datetime
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 from pydantic import BaseModel
 
 class ModelLogCreate(BaseModel):
@@ -24,3 +24,14 @@ class ModelLogSummary(BaseModel):
     total_logs: int
     error_logs: int
     model_counts: Dict[str, int]
+    level_counts: Dict[str, int] = {}
+    model_level_counts: Dict[str, Dict[str, int]] = {}
+
+class ModelLogBatchError(BaseModel):
+    index: int
+    error: str
+
+class ModelLogBatchResult(BaseModel):
+    accepted: int
+    rejected: int
+    errors: List[ModelLogBatchError] = []
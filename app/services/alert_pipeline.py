@@ -0,0 +1,315 @@
+"""Write-behind batching stage for alert ingestion.
+
+Validated alerts are buffered in a bounded asyncio queue and flushed to the
+database as multi-row inserts whenever the batch fills up or the oldest
+buffered alert has waited longer than the configured delay. A batch whose
+commit keeps failing is retried with backoff, within a per-batch time budget
+so an outage does not stall the flush task, and then written one alert at a
+time, so a transient error or one bad row does not lose the whole batch.
+"""
+
+import asyncio
+import json
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import uuid4
+
+from app.core.metrics import ALERT_STAGE_SECONDS, ALERTS_INGESTED, ALERTS_REJECTED
+from app.core.settings import settings
+from app.db.session import AsyncSessionLocal
+from app.models import Alert
+from app.schemas.alerts import AlertCreate, Alert as AlertSchema
+from app.services.cache_invalidation import AlertChange, publish_alert_changes
+from app.services.websocket import manager
+
+LOG = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+@dataclass
+class PendingAlert:
+    """A validated alert waiting to be written."""
+
+    data: AlertCreate
+    source: str
+    future: Optional[asyncio.Future] = None
+    enqueued_at: float = field(default_factory=time.perf_counter)
+
+
+class AlertIngestPipeline:
+    """Buffers alerts and writes them in batches on size/time thresholds."""
+
+    def __init__(
+        self,
+        *,
+        max_batch_size: Optional[int] = None,
+        max_batch_delay_ms: Optional[int] = None,
+        max_queue_size: Optional[int] = None,
+        max_retries: Optional[int] = None,
+        retry_backoff: Optional[float] = None,
+        retry_budget: Optional[float] = None,
+    ) -> None:
+        self.max_batch_size = max_batch_size or settings.alert_batch_size
+        delay_ms = (
+            max_batch_delay_ms
+            if max_batch_delay_ms is not None
+            else settings.alert_batch_max_delay_ms
+        )
+        self.max_batch_delay = delay_ms / 1000.0
+        self.max_queue_size = max_queue_size or settings.alert_queue_size
+        self.max_retries = max_retries if max_retries is not None else settings.alert_commit_max_retries
+        self.retry_backoff = (
+            retry_backoff if retry_backoff is not None else settings.alert_commit_retry_backoff
+        )
+        self.retry_budget = (
+            retry_budget if retry_budget is not None else settings.alert_commit_retry_budget
+        )
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+        self.batches_committed = 0
+        self.alerts_committed = 0
+        # Batches whose commit failed and that were written one by one.
+        self.batches_failed = 0
+        self.alerts_failed = 0
+        self.last_batch_size = 0
+        self.last_commit_latency_ms = 0.0
+        self.max_commit_latency_ms = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self) -> None:
+        """Start the background flush task on the running event loop."""
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Flush everything still buffered and stop the background task."""
+        if not self.running:
+            return
+        await self._queue.put(_STOP)
+        await self._task
+        self._task = None
+        self._queue = None
+
+    async def submit(self, alert_data: AlertCreate, source: str) -> AlertSchema:
+        """Queue an alert and wait until the batch containing it is committed."""
+        future = asyncio.get_running_loop().create_future()
+        item = PendingAlert(alert_data, source, future)
+        if self.running:
+            await self._queue.put(item)
+        else:
+            await self._flush([item])
+        return await future
+
+    async def enqueue(self, alert_data: AlertCreate, source: str) -> None:
+        """Queue an alert without waiting for it to be committed.
+
+        Waits for free space when the queue is full, so callers feel the
+        backpressure instead of piling up work.
+        """
+        item = PendingAlert(alert_data, source)
+        if self.running:
+            await self._queue.put(item)
+        else:
+            await self._flush([item])
+
+    def stats(self) -> Dict[str, Any]:
+        """Return queue depth and batch commit statistics."""
+        return {
+            "running": self.running,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "queue_capacity": self.max_queue_size,
+            "max_batch_size": self.max_batch_size,
+            "max_batch_delay_ms": self.max_batch_delay * 1000.0,
+            "batches_committed": self.batches_committed,
+            "alerts_committed": self.alerts_committed,
+            "batches_failed": self.batches_failed,
+            "alerts_failed": self.alerts_failed,
+            "last_batch_size": self.last_batch_size,
+            "last_commit_latency_ms": round(self.last_commit_latency_ms, 3),
+            "max_commit_latency_ms": round(self.max_commit_latency_ms, 3),
+        }
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            item = await self._queue.get()
+            if item is _STOP:
+                break
+
+            batch: List[PendingAlert] = [item]
+            deadline = loop.time() + self.max_batch_delay
+            while len(batch) < self.max_batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(self._queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            await self._flush(batch)
+
+    async def _flush(self, batch: List[PendingAlert]) -> None:
+        """Write a batch, invalidate the cached analytics it affects, then
+        resolve futures and broadcast.
+
+        Never raises an ordinary exception: whatever goes wrong, every
+        submitter waiting on the batch gets a result or an error.
+        """
+        try:
+            await self._write_batch(batch)
+        except Exception as error:
+            LOG.exception("Unexpected error while flushing a batch of %d alerts", len(batch))
+            _fail_pending(batch, error)
+        finally:
+            # Covers cancellation mid-flush as well.
+            _fail_pending(batch, RuntimeError("Alert batch was not written"))
+
+    async def _write_batch(self, batch: List[PendingAlert]) -> None:
+        rows = [dict(item.data.model_dump(), id=uuid4()) for item in batch]
+
+        started = time.perf_counter()
+        for item in batch:
+            ALERT_STAGE_SECONDS.observe(started - item.enqueued_at, "queue_wait")
+        alerts = await self._commit_with_retries(rows)
+        if alerts is not None:
+            written = list(zip(batch, alerts))
+            self.batches_committed += 1
+        else:
+            self.batches_failed += 1
+            LOG.error("Writing a failed batch of %d alerts one by one", len(batch))
+            written = await self._commit_one_by_one(batch, rows)
+            self.alerts_failed += len(batch) - len(written)
+
+        committed = time.perf_counter()
+        ALERT_STAGE_SECONDS.observe(committed - started, "db_commit")
+        latency_ms = (committed - started) * 1000.0
+        self.alerts_committed += len(written)
+        self.last_batch_size = len(batch)
+        self.last_commit_latency_ms = latency_ms
+        self.max_commit_latency_ms = max(self.max_commit_latency_ms, latency_ms)
+        LOG.debug("Committed batch of %d alerts in %.2f ms", len(written), latency_ms)
+
+        # Invalidate before acknowledging, so a client that reads right after
+        # its write never gets a cached result that predates it.
+        await publish_alert_changes(AlertChange.from_alert(alert) for _, alert in written)
+
+        for item, alert in written:
+            try:
+                alert_response = AlertSchema.model_validate(alert)
+            except Exception as schema_error:
+                LOG.error("Schema conversion error: %s", schema_error)
+                if item.future is not None and not item.future.done():
+                    item.future.set_exception(schema_error)
+                continue
+
+            if item.future is not None and not item.future.done():
+                item.future.set_result(alert_response)
+            ALERTS_INGESTED.inc(alert.alert_type, item.source)
+
+            broadcast_started = time.perf_counter()
+            try:
+                await manager.broadcast(_broadcast_message(alert_response))
+            except Exception as broadcast_error:
+                LOG.error("WebSocket broadcast error: %s", broadcast_error)
+            ALERT_STAGE_SECONDS.observe(time.perf_counter() - broadcast_started, "broadcast")
+
+    @staticmethod
+    async def _commit(rows: List[Dict[str, Any]]) -> List[Alert]:
+        """Insert rows in one transaction; fresh objects each call, so a
+        rolled-back attempt leaves nothing behind."""
+        alerts = [Alert(**row) for row in rows]
+        async with AsyncSessionLocal() as session:
+            session.add_all(alerts)
+            try:
+                await session.commit()
+            except Exception:
+                await session.rollback()
+                raise
+        return alerts
+
+    async def _commit_with_retries(self, rows: List[Dict[str, Any]]) -> Optional[List[Alert]]:
+        """Commit the batch, retrying with exponential backoff; None if every attempt failed.
+
+        Stops retrying once the next attempt would start more than
+        `retry_budget` seconds after the first, since every later batch waits
+        behind this one.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.retry_budget
+        for attempt in range(self.max_retries + 1):
+            try:
+                return await self._commit(rows)
+            except Exception as db_error:
+                LOG.warning(
+                    "Commit of %d alerts failed (attempt %d of %d): %s",
+                    len(rows), attempt + 1, self.max_retries + 1, db_error,
+                )
+            delay = self.retry_backoff * (2 ** attempt)
+            if attempt == self.max_retries or loop.time() + delay > deadline:
+                break
+            await asyncio.sleep(delay)
+        return None
+
+    async def _commit_one_by_one(
+        self, batch: List[PendingAlert], rows: List[Dict[str, Any]]
+    ) -> List[Tuple[PendingAlert, Alert]]:
+        """Commit each alert on its own; only the alerts that still fail are lost."""
+        written: List[Tuple[PendingAlert, Alert]] = []
+        for item, row in zip(batch, rows):
+            try:
+                (alert,) = await self._commit([row])
+            except Exception as db_error:
+                ALERTS_REJECTED.inc(item.source, "db_error")
+                LOG.error(
+                    "Failed to commit alert from %s for device %s: %s",
+                    item.source, row["device_id"], db_error,
+                )
+                if item.future is not None and not item.future.done():
+                    item.future.set_exception(db_error)
+                continue
+            written.append((item, alert))
+        return written
+
+
+def _fail_pending(batch: List[PendingAlert], error: BaseException) -> None:
+    for item in batch:
+        if item.future is not None and not item.future.done():
+            item.future.set_exception(error)
+
+
+def _broadcast_message(alert_response: AlertSchema) -> str:
+    alert_dict = alert_response.model_dump(mode="json")
+    return json.dumps({
+        "type": "new_alert",
+        "alert": {
+            "id": alert_dict["id"],
+            "device_id": alert_dict["device_id"],
+            "timestamp": alert_dict["timestamp"],
+            "alert_type": alert_dict["alert_type"],
+            "location_lat": alert_dict["location_lat"],
+            "location_lon": alert_dict["location_lon"],
+            "payload": alert_dict["payload"]
+        }
+    })
+
+
+alert_pipeline = AlertIngestPipeline()
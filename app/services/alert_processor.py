@@ -1,88 +1,39 @@
 """Core alert processing and storage functionality."""
 
-import json
-from uuid import uuid4
+import logging
+
 from fastapi import HTTPException
 
-from app.db.session import AsyncSessionLocal
-from app.models import Alert
-from app.schemas.alerts import AlertCreate, Alert as AlertSchema
-from app.services.websocket import manager
+from app.schemas.alerts import AlertCreate
+from app.services.alert_pipeline import alert_pipeline
+
+LOG = logging.getLogger(__name__)
 
 
 async def process_and_save_alert(alert_data: AlertCreate, source: str):
     """
     Saves a validated alert to the DB and broadcasts it.
     This is the single source of truth for creating alerts.
-    
+
+    The alert is handed to the write-behind pipeline, which commits it as
+    part of a multi-row batch; this coroutine resolves once that batch has
+    been committed.
+
     Args:
         alert_data: Validated alert data
         source: Origin of the alert ("MQTT" or "HTTP")
-        
+
     Returns:
         AlertSchema: The processed and saved alert
-        
+
     Raises:
         HTTPException: If there's an error processing the alert
     """
-    async with AsyncSessionLocal() as session:
-        try:
-            print(alert_data)
-            alert_dict = alert_data.model_dump()
-            print(f"Processing alert data from {source}: {alert_dict}")
-            
-            alert_id = uuid4()
-            
-            new_alert = Alert(
-                **alert_dict,
-                id=alert_id
-            )
-            
-            session.add(new_alert)
-            try:
-                await session.commit()
-                await session.refresh(new_alert)
-            except Exception as db_error:
-                print(f"Database error: {db_error}")
-                await session.rollback()
-                raise db_error
-            
-            print(f"Alert from {source} saved successfully: {new_alert.alert_type}")
-
-            try:
-                alert_response = AlertSchema.from_orm(new_alert)
-            except Exception as schema_error:
-                print(f"Schema conversion error: {schema_error}")
-                raise schema_error
-            
-            try:
-                alert_dict = alert_response.model_dump(mode="json")
-                broadcast_message = json.dumps({
-                    "type": "new_alert",
-                    "alert": {
-                        "id": alert_dict["id"],
-                        "device_id": alert_dict["device_id"],
-                        "timestamp": alert_dict["timestamp"],
-                        "alert_type": alert_dict["alert_type"],
-                        "location_lat": alert_dict["location_lat"],
-                        "location_lon": alert_dict["location_lon"],
-                        "payload": alert_dict["payload"]
-                    }
-                })
-                print("Broadcasting alert to connected clients")
-                await manager.broadcast(broadcast_message)
-            except Exception as broadcast_error:
-                print(f"WebSocket broadcast error: {broadcast_error}")
-            
-            return alert_response
-
-        except Exception as e:
-            await session.rollback()
-            print(f"Error saving alert from {source}: {str(e)}")
-            import traceback
-            print("Stack trace:")
-            print(traceback.format_exc())
-            raise HTTPException(
-                status_code=500, 
-                detail=f"Error processing alert: {str(e)}"
-            )
\ No newline at end of file
+    try:
+        return await alert_pipeline.submit(alert_data, source)
+    except Exception as e:
+        LOG.exception("Error saving alert from %s", source)
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error processing alert: {str(e)}"
+        )
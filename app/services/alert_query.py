@@ -1,34 +1,220 @@
 """Enhanced alert queries and utilities."""
 
-from datetime import datetime, timedelta
+import base64
+import binascii
+import json
+from collections import Counter
+from datetime import datetime, timedelta, timezone
 import math
-from typing import Any, Dict, List, Optional
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
 
 from sqlalchemy import func, select
-from sqlalchemy.sql import and_
+from sqlalchemy.sql import and_, or_
 
-from app.models import Alert
+from app.models import Alert, AlertRollup
+from app.models.alert_rollup import bucket_hour, to_utc_naive
 from app.db.session import AsyncSessionLocal
 
+ALERT_FIELDS = (
+    "id",
+    "device_id",
+    "timestamp",
+    "alert_type",
+    "location_lat",
+    "location_lon",
+    "payload",
+)
+
+# Rows fetched per round trip when streaming from a server-side cursor.
+STREAM_CHUNK_SIZE = 1000
+
+
+def encode_cursor(timestamp: datetime, alert_id: Any) -> str:
+    """Encode a keyset position as an opaque URL-safe token."""
+    raw = json.dumps([timestamp.isoformat(), str(alert_id)]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, Any]:
+    """Decode a token produced by `encode_cursor`. Raises ValueError if malformed."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        timestamp, alert_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(timestamp), Alert.id.type.python_type(alert_id)
+    except (binascii.Error, TypeError, ValueError) as exc:
+        raise ValueError("Invalid cursor") from exc
+
+
+def _serialize_alert_row(row: Any, fields: Sequence[str]) -> Dict[str, Any]:
+    data: Dict[str, Any] = {}
+    for field in fields:
+        value = getattr(row, field)
+        if field == "id" and value is not None:
+            value = str(value)
+        elif field == "timestamp" and value is not None:
+            value = value.isoformat()
+        elif field == "payload" and isinstance(value, str):
+            value = json.loads(value)
+        data[field] = value
+    return data
+
+
+def _split_on_hours(
+    start_time: datetime,
+    end_time: datetime,
+) -> Tuple[List[Tuple[datetime, datetime, bool]], Optional[Tuple[datetime, datetime]]]:
+    """Split [start_time, end_time] into whole rollup hours and raw edges.
+
+    Returns the partial edges as (lower, upper, upper_inclusive) tuples in the
+    caller's timezone style, and the whole hours as a naive-UTC [first, last)
+    range, or None when the range does not cover a whole hour.
+    """
+    aware = start_time.tzinfo is not None
+    start_utc, end_utc = to_utc_naive(start_time), to_utc_naive(end_time)
+    first_hour = bucket_hour(start_utc)
+    if first_hour < start_utc:
+        first_hour += timedelta(hours=1)
+    last_hour = bucket_hour(end_utc)
+    if first_hour >= last_hour:
+        return [(start_time, end_time, True)], None
+
+    def restore(value: datetime) -> datetime:
+        return value.replace(tzinfo=timezone.utc) if aware else value
+
+    edges = []
+    if start_utc < first_hour:
+        edges.append((start_time, restore(first_hour), False))
+    edges.append((restore(last_hour), end_time, True))
+    return edges, (first_hour, last_hour)
+
+
+def _raw_edge(lower: datetime, upper: datetime, upper_inclusive: bool):
+    upper_clause = Alert.timestamp <= upper if upper_inclusive else Alert.timestamp < upper
+    return and_(Alert.timestamp >= lower, upper_clause)
+
+
+def _bucket_label(bucket_value: Any) -> str:
+    if hasattr(bucket_value, "isoformat"):
+        if bucket_value.tzinfo is None:
+            bucket_value = bucket_value.replace(tzinfo=timezone.utc)
+        return bucket_value.astimezone(timezone.utc).isoformat()
+    return str(bucket_value)
+
 
 class AlertQueryService:
     """Service for complex alert queries and aggregations."""
 
+    @staticmethod
+    def _listing_query(
+        fields: Sequence[str],
+        cursor: Optional[str] = None,
+        device_id: Optional[str] = None,
+        alert_type: Optional[str] = None,
+        start_time: Optional[datetime] = None,
+        end_time: Optional[datetime] = None,
+    ):
+        """Build the keyset-ordered, projected query behind alert listings."""
+        unknown = set(fields) - set(ALERT_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown alert fields: {', '.join(sorted(unknown))}")
+        if start_time and end_time and end_time < start_time:
+            raise ValueError("end_time must be greater than or equal to start_time")
+
+        # The keyset columns are always selected so the next cursor can be built.
+        columns = [getattr(Alert, name) for name in dict.fromkeys([*fields, "timestamp", "id"])]
+        query = select(*columns)
+
+        if device_id:
+            query = query.where(Alert.device_id == device_id)
+        if alert_type:
+            query = query.where(Alert.alert_type == alert_type)
+        if start_time:
+            query = query.where(Alert.timestamp >= start_time)
+        if end_time:
+            query = query.where(Alert.timestamp <= end_time)
+        if cursor:
+            cursor_ts, cursor_id = decode_cursor(cursor)
+            query = query.where(
+                or_(
+                    Alert.timestamp < cursor_ts,
+                    and_(Alert.timestamp == cursor_ts, Alert.id < cursor_id),
+                )
+            )
+
+        return query.order_by(Alert.timestamp.desc(), Alert.id.desc())
+
+    @staticmethod
+    async def list_alerts(
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        fields: Sequence[str] = ALERT_FIELDS,
+        device_id: Optional[str] = None,
+        alert_type: Optional[str] = None,
+        start_time: Optional[datetime] = None,
+        end_time: Optional[datetime] = None,
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Return one page of alerts (newest first) and the cursor for the next page."""
+        query = AlertQueryService._listing_query(
+            fields, cursor, device_id, alert_type, start_time, end_time
+        )
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(query.limit(limit + 1))
+            rows = result.all()
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            next_cursor = encode_cursor(last.timestamp, last.id)
+        return [_serialize_alert_row(row, fields) for row in rows], next_cursor
+
+    @staticmethod
+    async def stream_alerts(
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+        fields: Sequence[str] = ALERT_FIELDS,
+        device_id: Optional[str] = None,
+        alert_type: Optional[str] = None,
+        start_time: Optional[datetime] = None,
+        end_time: Optional[datetime] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Yield alerts (newest first) from a server-side cursor.
+
+        Rows are fetched in chunks of STREAM_CHUNK_SIZE, so memory use does
+        not depend on how many alerts match.
+        """
+        query = AlertQueryService._listing_query(
+            fields, cursor, device_id, alert_type, start_time, end_time
+        )
+        if limit is not None:
+            query = query.limit(limit)
+        query = query.execution_options(yield_per=STREAM_CHUNK_SIZE)
+
+        async with AsyncSessionLocal() as session:
+            result = await session.stream(query)
+            async for row in result:
+                yield _serialize_alert_row(row, fields)
+
     @staticmethod
     async def get_alerts_by_timeframe(
         start_time: datetime,
         end_time: datetime,
         alert_type: Optional[str] = None,
-        device_id: Optional[str] = None
+        device_id: Optional[str] = None,
+        upper_inclusive: bool = True
     ) -> List[Alert]:
-        """Get alerts within a specific timeframe with optional filtering."""
+        """Get alerts within a specific timeframe with optional filtering.
+
+        Alerts are ordered by timestamp; pass `upper_inclusive=False` to
+        query the half-open range [start_time, end_time).
+        """
         if end_time < start_time:
             raise ValueError("end_time must be greater than or equal to start_time")
 
         async with AsyncSessionLocal() as session:
             query = select(Alert).where(
-                and_(Alert.timestamp >= start_time, Alert.timestamp <= end_time)
-            )
+                _raw_edge(start_time, end_time, upper_inclusive)
+            ).order_by(Alert.timestamp, Alert.id)
             
             if alert_type:
                 query = query.where(Alert.alert_type == alert_type)
@@ -70,69 +256,106 @@ class AlertQueryService:
         start_time: Optional[datetime] = None,
         end_time: Optional[datetime] = None
     ) -> Dict[str, int]:
-        """Get aggregated counts of alerts by type."""
+        """Get aggregated counts of alerts by type.
+
+        Whole hours are summed from the alert_rollups table; only the partial
+        hours at either edge of the range are counted from raw alerts.
+        """
+        counts: Counter = Counter()
         async with AsyncSessionLocal() as session:
-            query = select(
-                Alert.alert_type,
-                func.count(Alert.id).label('count')
-            )
-            
-            if start_time and end_time:
-                query = query.where(
+            if not (start_time and end_time):
+                query = select(
+                    AlertRollup.alert_type,
+                    func.sum(AlertRollup.alert_count)
+                ).group_by(AlertRollup.alert_type)
+                for alert_type, count in await session.execute(query):
+                    counts[alert_type] += int(count or 0)
+                return {k: v for k, v in counts.items() if v}
+
+            edges, hours = _split_on_hours(start_time, end_time)
+            if hours:
+                query = select(
+                    AlertRollup.alert_type,
+                    func.sum(AlertRollup.alert_count)
+                ).where(
                     and_(
-                        Alert.timestamp >= start_time,
-                        Alert.timestamp <= end_time
+                        AlertRollup.bucket_hour >= hours[0],
+                        AlertRollup.bucket_hour < hours[1],
                     )
-                )
-                
-            query = query.group_by(Alert.alert_type)
-            result = await session.execute(query)
-            return {r[0]: r[1] for r in result}
+                ).group_by(AlertRollup.alert_type)
+                for alert_type, count in await session.execute(query):
+                    counts[alert_type] += int(count or 0)
+
+            for edge in edges:
+                query = select(
+                    Alert.alert_type,
+                    func.count(Alert.id).label('count')
+                ).where(_raw_edge(*edge)).group_by(Alert.alert_type)
+                for alert_type, count in await session.execute(query):
+                    counts[alert_type] += count
+
+            return {k: v for k, v in counts.items() if v}
 
     @staticmethod
     async def get_alert_trends(
         days: int = 7,
         interval_hours: int = 24
     ) -> Dict[str, List[Dict[str, Any]]]:
-        """Get alert trends over time."""
+        """Get alert trends over time.
+
+        Whole hours come from the alert_rollups table; only the partial hours
+        at either edge of the window are read from raw alerts.
+        """
         end_time = datetime.utcnow()
         start_time = end_time - timedelta(days=days)
-        
+
         async with AsyncSessionLocal() as session:
             bucket_size = "hour" if interval_hours < 24 else "day"
             bind = session.get_bind()
             dialect_name = getattr(getattr(bind, "dialect", None), "name", "")
             is_sqlite = dialect_name == "sqlite"
 
-            if is_sqlite:
-                date_format = "%Y-%m-%d %H:00:00" if bucket_size == "hour" else "%Y-%m-%d"
-                bucket_expression = func.strftime(date_format, Alert.timestamp).label("bucket")
-            else:
-                bucket_expression = func.date_trunc(bucket_size, Alert.timestamp).label("bucket")
+            def bucket_expression(column, aware: bool):
+                if is_sqlite:
+                    date_format = "%Y-%m-%d %H:00:00" if bucket_size == "hour" else "%Y-%m-%d"
+                    return func.strftime(date_format, column).label("bucket")
+                if aware:
+                    # Truncate in UTC, like the naive-UTC rollup buckets,
+                    # rather than in the session time zone.
+                    column = func.timezone("UTC", column)
+                return func.date_trunc(bucket_size, column).label("bucket")
 
-            query = (
-                select(
-                    Alert.alert_type,
-                    bucket_expression,
-                    func.count(Alert.id).label("count"),
-                )
-                .where(
-                    and_(Alert.timestamp >= start_time, Alert.timestamp <= end_time)
+            counts: Counter = Counter()
+            edges, hours = _split_on_hours(start_time, end_time)
+            if hours:
+                bucket = bucket_expression(AlertRollup.bucket_hour, aware=False)
+                query = (
+                    select(AlertRollup.alert_type, bucket, func.sum(AlertRollup.alert_count))
+                    .where(
+                        and_(
+                            AlertRollup.bucket_hour >= hours[0],
+                            AlertRollup.bucket_hour < hours[1],
+                        )
+                    )
+                    .group_by(AlertRollup.alert_type, bucket)
                 )
-                .group_by(Alert.alert_type, bucket_expression)
-                .order_by(bucket_expression)
-            )
+                for alert_type, bucket_value, count in await session.execute(query):
+                    counts[(alert_type, _bucket_label(bucket_value))] += int(count or 0)
 
-            result = await session.execute(query)
+            for edge in edges:
+                bucket = bucket_expression(Alert.timestamp, aware=True)
+                query = (
+                    select(Alert.alert_type, bucket, func.count(Alert.id).label("count"))
+                    .where(_raw_edge(*edge))
+                    .group_by(Alert.alert_type, bucket)
+                )
+                for alert_type, bucket_value, count in await session.execute(query):
+                    counts[(alert_type, _bucket_label(bucket_value))] += count
 
             trends: Dict[str, List[Dict[str, Any]]] = {}
-            for alert_type, bucket_value, count in result:
-                bucket_str = (
-                    bucket_value.isoformat()
-                    if hasattr(bucket_value, "isoformat")
-                    else str(bucket_value)
-                )
-                trends.setdefault(alert_type, []).append({"date": bucket_str, "count": count})
+            for (alert_type, bucket_str), count in sorted(counts.items(), key=lambda item: item[0][1]):
+                if count:
+                    trends.setdefault(alert_type, []).append({"date": bucket_str, "count": count})
 
             return trends
 
@@ -140,29 +363,26 @@ class AlertQueryService:
     async def get_device_statistics(device_id: str) -> Dict[str, Any]:
         """Get comprehensive statistics for a specific device."""
         async with AsyncSessionLocal() as session:
-            # Get total alerts
-            total_query = select(func.count(Alert.id)).where(Alert.device_id == device_id)
-            total_result = await session.execute(total_query)
-            total_alerts = total_result.scalar()
-            
+            # Totals come from the rollups; only the latest alert touches raw rows.
             type_query = select(
-                Alert.alert_type,
-                func.count(Alert.id).label('count')
+                AlertRollup.alert_type,
+                func.sum(AlertRollup.alert_count)
             ).where(
-                Alert.device_id == device_id
-            ).group_by(Alert.alert_type)
+                AlertRollup.device_id == device_id
+            ).group_by(AlertRollup.alert_type)
             type_result = await session.execute(type_query)
-            alerts_by_type = {r[0]: r[1] for r in type_result}
-            
+            alerts_by_type = {r[0]: int(r[1]) for r in type_result if r[1]}
+            total_alerts = sum(alerts_by_type.values())
+
             latest_query = select(Alert).where(
                 Alert.device_id == device_id
             ).order_by(Alert.timestamp.desc()).limit(1)
             latest_result = await session.execute(latest_query)
             latest_alert = latest_result.scalar()
-            
+
             return {
                 'total_alerts': total_alerts,
                 'alerts_by_type': alerts_by_type,
                 'latest_alert': latest_alert,
                 'last_seen': latest_alert.timestamp if latest_alert else None
-            }
\ No newline at end of file
+            }
@@ -0,0 +1,59 @@
+"""Maintenance helpers for the alert_rollups table."""
+
+from datetime import datetime
+from typing import Any, Dict, List
+
+from sqlalchemy import delete, func, insert, select
+
+from app.db.session import AsyncSessionLocal
+from app.models import Alert, AlertRollup
+
+INSERT_CHUNK_SIZE = 1000
+
+
+async def backfill_alert_rollups() -> int:
+    """Rebuild alert_rollups from the raw alerts table.
+
+    The rebuild runs in a single transaction, so readers see either the old or
+    the new rollups. Alerts committed while it runs may be missed; run it with
+    ingestion paused, or run it again afterwards. Returns the number of rollup
+    rows written.
+    """
+    async with AsyncSessionLocal() as session:
+        dialect_name = session.get_bind().dialect.name
+        if dialect_name == "sqlite":
+            hour = func.strftime("%Y-%m-%d %H:00:00", Alert.timestamp)
+        else:
+            hour = func.date_trunc("hour", func.timezone("UTC", Alert.timestamp))
+
+        query = select(
+            hour.label("bucket_hour"),
+            Alert.alert_type,
+            Alert.device_id,
+            func.count(Alert.id),
+        ).group_by(hour, Alert.alert_type, Alert.device_id)
+        groups = (await session.execute(query)).all()
+
+        await session.execute(delete(AlertRollup))
+
+        written = 0
+        batch: List[Dict[str, Any]] = []
+        for bucket_value, alert_type, device_id, count in groups:
+            if isinstance(bucket_value, str):
+                bucket_value = datetime.strptime(bucket_value, "%Y-%m-%d %H:00:00")
+            batch.append({
+                "bucket_hour": bucket_value,
+                "alert_type": alert_type,
+                "device_id": device_id,
+                "alert_count": count,
+            })
+            if len(batch) >= INSERT_CHUNK_SIZE:
+                await session.execute(insert(AlertRollup), batch)
+                written += len(batch)
+                batch = []
+        if batch:
+            await session.execute(insert(AlertRollup), batch)
+            written += len(batch)
+
+        await session.commit()
+        return written
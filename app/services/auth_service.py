@@ -4,16 +4,19 @@ import secrets
 from typing import Optional
 from datetime import datetime, timedelta
 
-from passlib.hash import argon2
 from sqlalchemy import select, update
 
 from app.models.user import User
 from app.config.database import AsyncSessionLocal
+from app.core.settings import settings
+from app.services.login_throttle import last_login_recorder, login_throttle
+from app.services.password_hasher import password_hasher
+from app.services.principal_cache import invalidate_principal
 
 LOG = logging.getLogger(__name__)
 
-MAX_FAILED_ATTEMPTS = 5
-LOCK_MINUTES = 15
+MAX_FAILED_ATTEMPTS = settings.login_max_failures
+LOCK_MINUTES = settings.login_lock_minutes
 
 async def create_user(
     username: str, 
@@ -22,7 +25,7 @@ async def create_user(
     password: str
 ) -> User:
     """Create a new user. Raises ValueError if email exists."""
-    password_hash = argon2.hash(password)
+    password_hash = await password_hasher.hash(password)
     password_salt = secrets.token_hex(16)
 
     async with AsyncSessionLocal() as session:
@@ -46,8 +49,32 @@ async def create_user(
         await session.refresh(user)
         return user
 
+async def set_password(user_id: int, password: str) -> None:
+    """Replace a user's password and drop their cached principal."""
+    password_hash = await password_hasher.hash(password)
+    async with AsyncSessionLocal() as session:
+        await session.execute(
+            update(User)
+            .where(User.id == user_id)
+            .values(password_hash=password_hash, failed_attempts=0, locked_until=None)
+        )
+        await session.commit()
+    await invalidate_principal(user_id)
+
 async def authenticate(email: str, password: str) -> Optional[User]:
-    """Authenticate by EMAIL."""
+    """Authenticate by EMAIL.
+
+    Failed attempts are counted in Redis and only a resulting lock is written
+    to SQL; if Redis is unavailable the counters fall back to the users table.
+    """
+    try:
+        if await login_throttle.is_locked(email):
+            return None
+        use_redis = True
+    except Exception as e:
+        LOG.warning("Login throttle unavailable, counting failures in SQL: %s", e)
+        use_redis = False
+
     async with AsyncSessionLocal() as session:
         q = select(User).where(User.email == email)
         result = await session.execute(q)
@@ -61,34 +88,64 @@ async def authenticate(email: str, password: str) -> Optional[User]:
         if locked_until is not None and locked_until > now:
             return None
 
-        try:
-            verified = argon2.verify(password, user.password_hash)
-        except Exception:
-            verified = False
+        verified = await password_hasher.verify(password, user.password_hash)
 
         if verified:
-            await session.execute(
-                update(User)
-                .where(User.id == user.id)
-                .values(failed_attempts=0, locked_until=None, last_login_at=now)
-            )
-            await session.commit()
+            values = {}
+            if user.failed_attempts or user.locked_until is not None:
+                values.update(failed_attempts=0, locked_until=None)
+            # Upgrade hashes made before the cost parameters were last changed.
+            if password_hasher.needs_rehash(user.password_hash):
+                values["password_hash"] = await password_hasher.hash(password)
+            if values:
+                await session.execute(
+                    update(User)
+                    .where(User.id == user.id)
+                    .values(**values)
+                )
+                await session.commit()
+            if use_redis:
+                try:
+                    await login_throttle.reset(email)
+                except Exception as e:
+                    LOG.warning("Failed to reset login throttle for user %s: %s", user.id, e)
+            last_login_recorder.record(user.id, now)
             return user
 
+        if use_redis:
+            try:
+                locked_now = await login_throttle.record_failure(email)
+            except Exception as e:
+                LOG.warning("Login throttle unavailable, counting failures in SQL: %s", e)
+            else:
+                if locked_now:
+                    await _persist_lock(session, user.id, MAX_FAILED_ATTEMPTS, now)
+                return None
+
         failed_val = getattr(user, "failed_attempts", None)
         try:
             failed_int = int(failed_val or 0)
         except (TypeError, ValueError):
             failed_int = 0
         new_failed = failed_int + 1
-        locked_until = None
         if new_failed >= MAX_FAILED_ATTEMPTS:
-            locked_until = now + timedelta(minutes=LOCK_MINUTES)
+            await _persist_lock(session, user.id, new_failed, now)
+            return None
 
         await session.execute(
             update(User)
             .where(User.id == user.id)
-            .values(failed_attempts=new_failed, locked_until=locked_until)
+            .values(failed_attempts=new_failed)
         )
         await session.commit()
-        return None
\ No newline at end of file
+        return None
+
+async def _persist_lock(session, user_id: int, failed_attempts: int, now: datetime) -> None:
+    """Record a lockout durably and drop the user's cached principal."""
+    await session.execute(
+        update(User)
+        .where(User.id == user_id)
+        .values(failed_attempts=failed_attempts, locked_until=now + timedelta(minutes=LOCK_MINUTES))
+    )
+    await session.commit()
+    await invalidate_principal(user_id)
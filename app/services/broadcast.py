@@ -0,0 +1,121 @@
+"""Broadcast backends that carry WebSocket messages between workers.
+
+Each uvicorn worker (or pod) owns its own WebSocket connections. A backend
+takes a message published by any worker and hands it to the local fan-out of
+every worker, so an alert ingested in one process reaches all clients.
+"""
+
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+from typing import Awaitable, Callable, Optional
+
+from app.core.settings import settings
+from app.services.redis_client import get_redis
+
+LOG = logging.getLogger(__name__)
+
+Deliver = Callable[[str], Awaitable[None]]
+
+# Delay before re-subscribing after the Redis connection drops.
+RESUBSCRIBE_DELAY_SECONDS = 1.0
+
+
+class BroadcastBackend(ABC):
+    """Interface shared by broadcast backends."""
+
+    def __init__(self) -> None:
+        self._deliver: Optional[Deliver] = None
+
+    def attach(self, deliver: Deliver) -> None:
+        """Register the coroutine that fans a message out to local clients."""
+        self._deliver = deliver
+
+    async def start(self) -> None:
+        """Begin receiving messages published by other workers."""
+
+    async def stop(self) -> None:
+        """Stop receiving messages."""
+
+    @abstractmethod
+    async def publish(self, message: str) -> None:
+        """Publish a message once for delivery by every worker."""
+
+    async def _deliver_locally(self, message: str) -> None:
+        if self._deliver is not None:
+            await self._deliver(message)
+
+
+class LocalBroadcastBackend(BroadcastBackend):
+    """In-process backend: every message goes straight to this worker's clients."""
+
+    async def publish(self, message: str) -> None:
+        await self._deliver_locally(message)
+
+
+class RedisBroadcastBackend(BroadcastBackend):
+    """Redis pub/sub backend: messages are published to a channel that every
+    worker subscribes to, and each worker fans them out to its own clients."""
+
+    def __init__(self, channel: Optional[str] = None, redis_client=None) -> None:
+        super().__init__()
+        self.channel = channel or settings.ws_broadcast_channel
+        self._redis = redis_client
+        self._listener: Optional[asyncio.Task] = None
+
+    async def _client(self):
+        return self._redis if self._redis is not None else await get_redis()
+
+    async def start(self) -> None:
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+    async def publish(self, message: str) -> None:
+        try:
+            redis = await self._client()
+            await redis.publish(self.channel, message)
+        except Exception as e:
+            # Keep this worker's clients informed even if Redis is unreachable.
+            LOG.error("Redis broadcast publish failed, delivering locally: %s", e)
+            await self._deliver_locally(message)
+
+    async def _listen(self) -> None:
+        while True:
+            pubsub = None
+            try:
+                redis = await self._client()
+                pubsub = redis.pubsub(ignore_subscribe_messages=True)
+                await pubsub.subscribe(self.channel)
+                async for message in pubsub.listen():
+                    if message.get("type") == "message":
+                        await self._deliver_locally(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                LOG.error("Redis broadcast subscription failed: %s", e)
+                await asyncio.sleep(RESUBSCRIBE_DELAY_SECONDS)
+            finally:
+                if pubsub is not None:
+                    try:
+                        await pubsub.aclose()
+                    except Exception:
+                        pass
+
+
+def create_broadcast_backend(name: Optional[str] = None) -> BroadcastBackend:
+    """Build the backend selected by WS_BROADCAST_BACKEND."""
+    name = name or settings.ws_broadcast_backend
+    if name == "local":
+        return LocalBroadcastBackend()
+    if name == "redis":
+        return RedisBroadcastBackend()
+    raise ValueError(f"Unknown WebSocket broadcast backend {name!r}; expected local or redis")
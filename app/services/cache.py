@@ -2,15 +2,68 @@
 
 import asyncio
 import json
-from typing import Any, Callable, Optional
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+from uuid import uuid4
 
 from redis import asyncio as redis_asyncio
 
+from app.core.metrics import CACHE_REQUESTS
 from app.core.settings import REDIS_CONFIG
+from app.services.cache_codec import CacheCodec, to_cacheable
+from app.services.memory_cache import MemoryLRU, estimate_size
+
+LOG = logging.getLogger(__name__)
+
+# Marks values written by the stale-while-revalidate mode of get_or_set.
+SWR_MARKER = "__swr__"
+
+# How often a worker waiting on another worker's recompute re-checks the cache.
+LOCK_POLL_SECONDS = 0.05
+
+# Deletes the lock only if it still holds our token, so an expired lock that
+# was re-acquired by another worker is never released by us.
+RELEASE_LOCK_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+# Keys deleted per pipelined round trip when invalidating a tag or pattern.
+INVALIDATE_BATCH_SIZE = 500
+
+# COUNT hint for SCAN when invalidating by pattern.
+SCAN_COUNT = 1000
+
+# Delay before re-subscribing to the invalidation channel after a failure.
+RESUBSCRIBE_DELAY_SECONDS = 1.0
+
+
+class _LeaderCancelled(Exception):
+    """The caller computing a single-flight value was cancelled."""
+
+
+def _unwrap(value: Any) -> Tuple[Any, bool]:
+    """Split a stored value into (value, is_stale)."""
+    if isinstance(value, dict) and SWR_MARKER in value:
+        return value["value"], value[SWR_MARKER] <= time.time()
+    return value, False
+
+
+def _as_str(value: Any) -> str:
+    return value.decode("utf-8") if isinstance(value, bytes) else value
 
 
 class RedisCache:
-    """Redis cache manager for alert-related data."""
+    """Redis cache manager for alert-related data.
+
+    Reads are served from a small in-process LRU (L1) when possible and fall
+    back to Redis (L2). Writes and deletes are announced on a Redis pub/sub
+    channel so other workers drop their L1 copies; the short L1 TTL bounds
+    staleness if that channel is briefly unavailable.
+    """
 
     def __init__(
         self,
@@ -18,17 +71,36 @@ class RedisCache:
         url: Optional[str] = None,
         prefix: Optional[str] = None,
         redis_client: Optional[redis_asyncio.Redis] = None,
+        codec: Optional[CacheCodec] = None,
+        lock_timeout: Optional[int] = None,
+        lock_wait: Optional[float] = None,
+        l1_enabled: Optional[bool] = None,
     ) -> None:
         self._prefix = prefix or REDIS_CONFIG["PREFIX"]
         if redis_client is not None:
             self.redis = redis_client
         else:
             redis_url = url or self._build_url()
-            self.redis = redis_asyncio.from_url(
-                redis_url,
-                encoding="utf-8",
-                decode_responses=True,
+            # Values are codec bytes, so responses are not decoded to str.
+            self.redis = redis_asyncio.from_url(redis_url)
+        self.codec = codec or CacheCodec()
+        self.lock_timeout = lock_timeout or REDIS_CONFIG["LOCK_TIMEOUT"]
+        self.lock_wait = lock_wait if lock_wait is not None else REDIS_CONFIG["LOCK_WAIT"]
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._refreshing: Set[str] = set()
+        self._background: Set[asyncio.Task] = set()
+
+        enabled = REDIS_CONFIG["L1_ENABLED"] if l1_enabled is None else l1_enabled
+        self.l1: Optional[MemoryLRU] = None
+        if enabled:
+            self.l1 = MemoryLRU(
+                max_bytes=REDIS_CONFIG["L1_MAX_BYTES"],
+                max_entries=REDIS_CONFIG["L1_MAX_ENTRIES"],
+                ttl=REDIS_CONFIG["L1_TTL"],
             )
+        self.invalidation_channel = REDIS_CONFIG["INVALIDATION_CHANNEL"]
+        self._instance_id = uuid4().hex
+        self._listener: Optional[asyncio.Task] = None
 
     @staticmethod
     def _build_url() -> str:
@@ -41,29 +113,264 @@ class RedisCache:
         sanitized = [str(part) for part in parts if part is not None]
         return ":".join([self._prefix, *sanitized])
 
+    def tag_key(self, tag: str) -> str:
+        """Key of the Redis set holding every cache key registered under `tag`."""
+        return self.get_key("tag", tag)
+
+    def _family(self, key: str) -> str:
+        """The first key segment after the prefix, e.g. "device" or "timeframe"."""
+        return key[len(self._prefix) + 1:].split(":", 1)[0]
+
+    async def _read(self, key: str, *, record: bool = True) -> Optional[Tuple[Any, bool]]:
+        """Return (value, is_stale) for a cached entry, or None on a miss."""
+        value = self.l1.get(key) if self.l1 is not None else None
+        result = "l1_hit"
+        if value is None:
+            raw = await self.redis.get(key)
+            if raw is None:
+                if record:
+                    CACHE_REQUESTS.inc(self._family(key), "miss")
+                return None
+            result = "hit"
+            value = self.codec.decode(raw)
+            if self.l1 is not None:
+                self.l1.set(key, value, estimate_size(value))
+        if record:
+            CACHE_REQUESTS.inc(self._family(key), result)
+        return _unwrap(value)
+
     async def get(self, key: str) -> Optional[Any]:
-        """Return a value from cache (decoded from JSON)."""
-        value = await self.redis.get(key)
-        return json.loads(value) if value is not None else None
+        """Return a value from cache."""
+        entry = await self._read(key)
+        return entry[0] if entry is not None else None
+
+    async def get_many(self, keys: Sequence[str]) -> List[Optional[Any]]:
+        """Return the values of `keys` in order, None for misses.
 
-    async def set(self, key: str, value: Any, *, expire: Optional[int] = None) -> None:
-        """Store a value (encoded as JSON) with optional expiration."""
+        Entries missing from L1 are fetched with one MGET per batch.
+        """
+        values: List[Optional[Any]] = [None] * len(keys)
+        missing: List[int] = []
+        for index, key in enumerate(keys):
+            value = self.l1.get(key) if self.l1 is not None else None
+            if value is None:
+                missing.append(index)
+            else:
+                CACHE_REQUESTS.inc(self._family(key), "l1_hit")
+                values[index] = _unwrap(value)[0]
+
+        for offset in range(0, len(missing), INVALIDATE_BATCH_SIZE):
+            batch = missing[offset:offset + INVALIDATE_BATCH_SIZE]
+            raws = await self.redis.mget([keys[index] for index in batch])
+            for index, raw in zip(batch, raws):
+                CACHE_REQUESTS.inc(self._family(keys[index]), "miss" if raw is None else "hit")
+                if raw is None:
+                    continue
+                value = self.codec.decode(raw)
+                if self.l1 is not None:
+                    self.l1.set(keys[index], value, estimate_size(value))
+                values[index] = _unwrap(value)[0]
+        return values
+
+    async def set(
+        self,
+        key: str,
+        value: Any,
+        *,
+        expire: Optional[int] = None,
+        tags: Optional[Iterable[str]] = None,
+    ) -> None:
+        """Store a value (encoded by the codec) with optional expiration.
+
+        The key is added to the Redis set of each tag so `invalidate_tags`
+        can remove it later without scanning the keyspace.
+        """
+        await self.set_many([(key, value, tags or ())], expire=expire)
+
+    async def set_many(
+        self,
+        entries: Iterable[Tuple[str, Any, Iterable[str]]],
+        *,
+        expire: Optional[int] = None,
+    ) -> None:
+        """Store (key, value, tags) entries in one pipelined round trip."""
         ttl = expire if expire is not None else REDIS_CONFIG["DEFAULT_TIMEOUT"]
-        await self.redis.set(key, json.dumps(value), ex=ttl)
+        # A tag set must outlive its members; stale members are harmless.
+        tag_ttl = max(ttl, REDIS_CONFIG["DEFAULT_TIMEOUT"])
+        encoded = []
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for key, value, tags in entries:
+                raw = self.codec.encode(value)
+                encoded.append((key, raw))
+                pipe.set(key, raw, ex=ttl)
+                for tag in tags:
+                    pipe.sadd(self.tag_key(tag), key)
+                    pipe.expire(self.tag_key(tag), tag_ttl)
+            if not encoded:
+                return
+            await pipe.execute()
+        if self.l1 is not None:
+            for key, raw in encoded:
+                # Keep what a reader would decode, not the caller's live objects.
+                value = self.codec.decode(raw)
+                self.l1.set(key, value, estimate_size(value))
+            await self._publish_invalidation(keys=[key for key, _ in encoded])
+
+    async def _write(
+        self,
+        key: str,
+        value: Any,
+        expire: Optional[int],
+        soft_ttl: Optional[int],
+        tags: Optional[Iterable[str]],
+    ) -> None:
+        if soft_ttl is not None:
+            value = {SWR_MARKER: time.time() + soft_ttl, "value": value}
+        await self.set(key, value, expire=expire, tags=tags)
 
     async def delete(self, key: str) -> None:
         """Remove a single cache entry."""
         await self.redis.delete(key)
+        if self.l1 is not None:
+            self.l1.delete(key)
+            await self._publish_invalidation(keys=[key])
+
+    async def invalidate_tags(self, *tags: str) -> int:
+        """Remove every entry registered under any of `tags`.
+
+        All tag sets are read together: each round trip pipelines one SSCAN
+        page per tag still being scanned, so a large tag never blocks the
+        Redis server shared with auth and rate limiting, and many small tags
+        cost a handful of round trips instead of two each. The members and
+        the tag sets are then deleted in pipelined batches. Returns the
+        number of keys removed.
+        """
+        tag_keys = [self.tag_key(tag) for tag in dict.fromkeys(tags)]
+        members: Set[str] = set()
+        cursors = {tag_key: 0 for tag_key in tag_keys}
+        while cursors:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for tag_key, cursor in cursors.items():
+                    pipe.sscan(tag_key, cursor=cursor, count=INVALIDATE_BATCH_SIZE)
+                pages = await pipe.execute()
+            next_cursors = {}
+            for tag_key, (cursor, keys) in zip(cursors, pages):
+                members.update(_as_str(key) for key in keys)
+                if int(cursor) != 0:
+                    next_cursors[tag_key] = cursor
+            cursors = next_cursors
 
-    async def invalidate_pattern(self, pattern: str) -> None:
-        """Remove keys matching the provided glob pattern."""
-        keys = await self.redis.keys(pattern)
-        if keys:
-            await self.redis.delete(*keys)
+        removed = 0
+        keys = sorted(members)
+        for offset in range(0, len(keys), INVALIDATE_BATCH_SIZE):
+            removed += await self._delete_batch(keys[offset:offset + INVALIDATE_BATCH_SIZE])
+        for offset in range(0, len(tag_keys), INVALIDATE_BATCH_SIZE):
+            await self._delete_batch(tag_keys[offset:offset + INVALIDATE_BATCH_SIZE], announce=False)
+        return removed
+
+    async def invalidate_pattern(self, pattern: str) -> int:
+        """Remove keys matching the provided glob pattern.
+
+        Prefer `invalidate_tags`; this walks the keyspace with SCAN, which
+        does not block Redis but is still proportional to its size.
+        """
+        removed = 0
+        batch: List[str] = []
+        async for key in self.redis.scan_iter(match=pattern, count=SCAN_COUNT):
+            batch.append(_as_str(key))
+            if len(batch) >= INVALIDATE_BATCH_SIZE:
+                removed += await self._delete_batch(batch, announce=False)
+                batch = []
+        if batch:
+            removed += await self._delete_batch(batch, announce=False)
+        if self.l1 is not None:
+            self.l1.delete_matching(pattern)
+            await self._publish_invalidation(pattern=pattern)
+        return removed
+
+    async def _delete_batch(self, keys: List[str], *, announce: bool = True) -> int:
+        """Delete keys in one pipelined round trip and drop them from L1."""
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for key in keys:
+                pipe.delete(key)
+            removed = sum(await pipe.execute())
+        if self.l1 is not None:
+            for key in keys:
+                self.l1.delete(key)
+            if announce:
+                await self._publish_invalidation(keys=keys)
+        return removed
 
     async def clear_all(self) -> None:
         """Clear the entire Redis database used by the cache."""
         await self.redis.flushdb()
+        if self.l1 is not None:
+            self.l1.clear()
+            await self._publish_invalidation(all=True)
+
+    async def _publish_invalidation(self, **change: Any) -> None:
+        """Tell other workers to drop their L1 copies of changed entries."""
+        message = json.dumps({"origin": self._instance_id, **change})
+        try:
+            await self.redis.publish(self.invalidation_channel, message)
+        except Exception as e:
+            LOG.warning("Cache invalidation publish failed: %s", e)
+
+    def _apply_invalidation(self, message: str) -> None:
+        """Apply an invalidation published by another worker to our L1."""
+        if self.l1 is None:
+            return
+        try:
+            change = json.loads(message)
+        except (TypeError, ValueError):
+            return
+        if change.get("origin") == self._instance_id:
+            return
+        if change.get("all"):
+            self.l1.clear()
+            return
+        for key in change.get("keys") or ():
+            self.l1.delete(key)
+        if change.get("pattern"):
+            self.l1.delete_matching(change["pattern"])
+
+    async def start(self) -> None:
+        """Start listening for L1 invalidations from other workers."""
+        if self.l1 is not None and (self._listener is None or self._listener.done()):
+            self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        """Stop the invalidation listener."""
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+    async def _listen(self) -> None:
+        while True:
+            pubsub = None
+            try:
+                pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+                await pubsub.subscribe(self.invalidation_channel)
+                # Anything written while we were not subscribed may be stale.
+                self.l1.clear()
+                async for message in pubsub.listen():
+                    if message.get("type") == "message":
+                        self._apply_invalidation(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                LOG.error("Cache invalidation subscription failed: %s", e)
+                await asyncio.sleep(RESUBSCRIBE_DELAY_SECONDS)
+            finally:
+                if pubsub is not None:
+                    try:
+                        await pubsub.aclose()
+                    except Exception:
+                        pass
 
     async def get_or_set(
         self,
@@ -71,23 +378,162 @@ class RedisCache:
         getter_func: Callable[[], Any],
         *,
         expire: Optional[int] = None,
+        soft_ttl: Optional[int] = None,
+        tags: Optional[Iterable[str]] = None,
     ) -> Any:
-        """Read-through cache helper."""
-        value = await self.get(key)
-        if value is not None:
+        """Read-through cache helper with stampede protection.
+
+        Concurrent misses for the same key in this process share a single
+        call to `getter_func`, and a short-lived Redis lock makes other
+        workers wait for that result instead of recomputing it. The result
+        is always the normalised value (see `to_cacheable`), whether it came
+        from the cache or from `getter_func`.
+
+        With `soft_ttl`, an entry is fresh for `soft_ttl` seconds and is then
+        served stale until `expire` while one background task refreshes it.
+        `tags` register the entry for `invalidate_tags`.
+        """
+        entry = await self._read(key)
+        if entry is not None:
+            value, stale = entry
+            if stale:
+                self._refresh_in_background(key, getter_func, expire, soft_ttl, tags)
             return value
 
+        return await self._single_flight(
+            key, lambda: self._load(key, getter_func, expire, soft_ttl, tags)
+        )
+
+    async def _single_flight(self, key: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """Run `loader` once per key in this process; concurrent callers share it.
+
+        If the caller running `loader` is cancelled (e.g. its client went
+        away), one of the waiters takes over instead of failing with it.
+        """
+        while True:
+            pending = self._inflight.get(key)
+            if pending is None:
+                break
+            try:
+                return await asyncio.shield(pending)
+            except _LeaderCancelled:
+                continue
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await loader()
+        except asyncio.CancelledError:
+            future.set_exception(_LeaderCancelled())
+            future.exception()
+            raise
+        except Exception as exc:
+            future.set_exception(exc)
+            future.exception()  # waiters re-raise it; don't log it as unretrieved
+            raise
+        else:
+            future.set_result(value)
+            return value
+        finally:
+            self._inflight.pop(key, None)
+
+    async def _load(
+        self,
+        key: str,
+        getter_func: Callable[[], Any],
+        expire: Optional[int],
+        soft_ttl: Optional[int],
+        tags: Optional[Iterable[str]],
+    ) -> Any:
+        """Compute and store a missing entry, coordinating with other workers."""
+        lock_key = f"{key}:lock"
+        token = uuid4().hex
+        acquired = await self._acquire_lock(lock_key, token)
+        if not acquired:
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + self.lock_wait
+            while loop.time() < deadline:
+                await asyncio.sleep(LOCK_POLL_SECONDS)
+                entry = await self._read(key, record=False)
+                if entry is not None:
+                    return entry[0]
+            # The other worker is too slow or died; compute it ourselves.
+
+        try:
+            # Return what a later hit would return, not the getter's live objects.
+            value = to_cacheable(await self._call(getter_func))
+            await self._write(key, value, expire, soft_ttl, tags)
+            return value
+        finally:
+            if acquired:
+                await self._release_lock(lock_key, token)
+
+    def _refresh_in_background(
+        self,
+        key: str,
+        getter_func: Callable[[], Any],
+        expire: Optional[int],
+        soft_ttl: Optional[int],
+        tags: Optional[Iterable[str]],
+    ) -> None:
+        if key in self._refreshing:
+            return
+        self._refreshing.add(key)
+        task = asyncio.create_task(self._refresh(key, getter_func, expire, soft_ttl, tags))
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def _refresh(
+        self,
+        key: str,
+        getter_func: Callable[[], Any],
+        expire: Optional[int],
+        soft_ttl: Optional[int],
+        tags: Optional[Iterable[str]],
+    ) -> None:
+        lock_key = f"{key}:lock"
+        token = uuid4().hex
+        try:
+            # Only one worker refreshes; the rest keep serving the stale value.
+            if not await self._acquire_lock(lock_key, token):
+                return
+            try:
+                value = await self._call(getter_func)
+                await self._write(key, value, expire, soft_ttl, tags)
+            finally:
+                await self._release_lock(lock_key, token)
+        except Exception as e:
+            LOG.warning("Background cache refresh failed for %s: %s", key, e)
+        finally:
+            self._refreshing.discard(key)
+
+    async def _acquire_lock(self, lock_key: str, token: str) -> bool:
+        try:
+            return bool(await self.redis.set(lock_key, token, nx=True, ex=self.lock_timeout))
+        except Exception:
+            # Without Redis coordination, fall back to computing locally.
+            return True
+
+    async def _release_lock(self, lock_key: str, token: str) -> None:
+        try:
+            await self.redis.eval(RELEASE_LOCK_SCRIPT, 1, lock_key, token)
+        except Exception:
+            pass
+
+    @staticmethod
+    async def _call(getter_func: Callable[[], Any]) -> Any:
         maybe_coroutine = getter_func()
         if asyncio.iscoroutine(maybe_coroutine):
-            value = await maybe_coroutine
-        else:
-            value = maybe_coroutine
+            return await maybe_coroutine
+        return maybe_coroutine
 
-        await self.set(key, value, expire=expire)
-        return value
+    def stats(self) -> Dict[str, Any]:
+        """Return in-process cache counters."""
+        return {"l1": self.l1.stats() if self.l1 is not None else None}
 
     async def close(self) -> None:
         """Close the underlying Redis connection pool."""
+        await self.stop()
         await self.redis.close()
 
-cache = RedisCache()
\ No newline at end of file
+cache = RedisCache()
@@ -0,0 +1,228 @@
+"""Serialization layer used by RedisCache.
+
+Query results are first normalised to plain JSON-compatible data (ORM rows
+become the dicts their API schema would return), then encoded with a fast
+serializer and compressed when large. Every stored value starts with a
+two-byte header naming its serializer and compression, so entries written
+with different settings stay readable.
+"""
+
+import json
+import logging
+import zlib
+from abc import ABC, abstractmethod
+from datetime import date, datetime
+from decimal import Decimal
+from enum import Enum
+from typing import Any, Dict, Optional, Union
+from uuid import UUID
+
+from pydantic import BaseModel
+
+from app.core.settings import REDIS_CONFIG
+from app.models import Alert
+from app.schemas.alerts import Alert as AlertSchema
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional dependency
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+LOG = logging.getLogger(__name__)
+
+
+def to_cacheable(value: Any) -> Any:
+    """Convert a query result into JSON-compatible data.
+
+    Alert rows are validated through the response schema, so a cached result
+    serializes exactly like a fresh one.
+    """
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if isinstance(value, dict):
+        return {str(key): to_cacheable(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple, set)):
+        return [to_cacheable(item) for item in value]
+    if isinstance(value, Alert):
+        return AlertSchema.model_validate(value).model_dump(mode="json")
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (UUID, Decimal)):
+        return str(value)
+    if isinstance(value, Enum):
+        return to_cacheable(value.value)
+    raise TypeError(f"Cannot cache value of type {type(value).__name__}")
+
+
+class Serializer(ABC):
+    """Turns JSON-compatible data into bytes and back."""
+
+    name = ""
+    header = b""
+
+    @abstractmethod
+    def dumps(self, value: Any) -> bytes:
+        """Encode JSON-compatible data."""
+
+    @abstractmethod
+    def loads(self, data: bytes) -> Any:
+        """Decode bytes written by `dumps`."""
+
+
+class JsonSerializer(Serializer):
+    name = "json"
+    header = b"j"
+
+    def dumps(self, value: Any) -> bytes:
+        return json.dumps(value, separators=(",", ":")).encode("utf-8")
+
+    def loads(self, data: bytes) -> Any:
+        return json.loads(data)
+
+
+class OrjsonSerializer(Serializer):
+    name = "orjson"
+    header = b"o"
+
+    def dumps(self, value: Any) -> bytes:
+        return orjson.dumps(value)
+
+    def loads(self, data: bytes) -> Any:
+        return orjson.loads(data)
+
+
+class MsgpackSerializer(Serializer):
+    name = "msgpack"
+    header = b"m"
+
+    def dumps(self, value: Any) -> bytes:
+        return msgpack.packb(value, use_bin_type=True)
+
+    def loads(self, data: bytes) -> Any:
+        return msgpack.unpackb(data, raw=False)
+
+
+class Compressor(ABC):
+    """Byte-level compression applied above the size threshold."""
+
+    name = ""
+    header = b""
+
+    @abstractmethod
+    def compress(self, data: bytes) -> bytes:
+        """Compress encoded bytes."""
+
+    @abstractmethod
+    def decompress(self, data: bytes) -> bytes:
+        """Reverse `compress`."""
+
+
+class NoCompression(Compressor):
+    name = "none"
+    header = b"-"
+
+    def compress(self, data: bytes) -> bytes:
+        return data
+
+    def decompress(self, data: bytes) -> bytes:
+        return data
+
+
+class ZlibCompressor(Compressor):
+    name = "zlib"
+    header = b"z"
+
+    def compress(self, data: bytes) -> bytes:
+        return zlib.compress(data, 6)
+
+    def decompress(self, data: bytes) -> bytes:
+        return zlib.decompress(data)
+
+
+class ZstdCompressor(Compressor):
+    name = "zstd"
+    header = b"s"
+
+    def __init__(self) -> None:
+        self._compressor = zstandard.ZstdCompressor(level=3)
+        self._decompressor = zstandard.ZstdDecompressor()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def decompress(self, data: bytes) -> bytes:
+        return self._decompressor.decompress(data)
+
+
+def _available_serializers() -> Dict[str, type]:
+    serializers: Dict[str, type] = {"json": JsonSerializer}
+    if orjson is not None:
+        serializers["orjson"] = OrjsonSerializer
+    if msgpack is not None:
+        serializers["msgpack"] = MsgpackSerializer
+    return serializers
+
+
+def _available_compressors() -> Dict[str, type]:
+    compressors: Dict[str, type] = {"none": NoCompression, "zlib": ZlibCompressor}
+    if zstandard is not None:
+        compressors["zstd"] = ZstdCompressor
+    return compressors
+
+
+class CacheCodec:
+    """Encodes cache values as `<serializer><compression><payload>` bytes."""
+
+    def __init__(
+        self,
+        serializer: Optional[str] = None,
+        compression: Optional[str] = None,
+        compress_min_bytes: Optional[int] = None,
+    ) -> None:
+        serializers = _available_serializers()
+        compressors = _available_compressors()
+        serializer = serializer or REDIS_CONFIG["SERIALIZER"]
+        compression = compression or REDIS_CONFIG["COMPRESSION"]
+        if serializer not in serializers:
+            LOG.warning("Cache serializer %r is not installed; using json", serializer)
+            serializer = "json"
+        if compression not in compressors:
+            LOG.warning("Cache compression %r is not installed; using zlib", compression)
+            compression = "zlib"
+
+        self.serializer: Serializer = serializers[serializer]()
+        self.compressor: Compressor = compressors[compression]()
+        self.compress_min_bytes = (
+            compress_min_bytes if compress_min_bytes is not None else REDIS_CONFIG["COMPRESS_MIN_BYTES"]
+        )
+        # Readers understand every installed format, whatever we write with.
+        self._serializers = {cls.header: cls() for cls in serializers.values()}
+        self._compressors = {cls.header: cls() for cls in compressors.values()}
+        self._passthrough = NoCompression()
+
+    def encode(self, value: Any) -> bytes:
+        data = self.serializer.dumps(to_cacheable(value))
+        compressor = self.compressor if len(data) >= self.compress_min_bytes else self._passthrough
+        return self.serializer.header + compressor.header + compressor.compress(data)
+
+    def decode(self, raw: Union[bytes, str]) -> Any:
+        if isinstance(raw, str):
+            raw = raw.encode("utf-8")
+        serializer = self._serializers.get(raw[:1])
+        compressor = self._compressors.get(raw[1:2])
+        if serializer is None or compressor is None:
+            # Written before the codec header existed: plain JSON text.
+            return json.loads(raw)
+        return serializer.loads(compressor.decompress(raw[2:]))
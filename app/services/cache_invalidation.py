@@ -0,0 +1,109 @@
+"""Tags linking cached analytics to the alerts they were computed from.
+
+Readers register cache entries under the tags returned by `alert_tags`, and
+the ingestion pipeline announces every committed batch as `AlertChange`
+events whose tags are invalidated, so entries can keep long TTLs and still
+never outlive the data they summarise.
+"""
+
+import asyncio
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Iterable, List, Optional
+
+import app.services.cache as cache_module
+from app.core.settings import REDIS_CONFIG
+from app.models import Alert
+from app.models.alert_rollup import bucket_hour, to_utc_naive
+
+LOG = logging.getLogger(__name__)
+
+# Bounded windows spanning more days than this are tagged as a whole
+# instead of per day, to keep tag sets small.
+MAX_DAY_TAGS = 31
+
+
+def _qualifier(device_id: Optional[str], alert_type: Optional[str]) -> str:
+    if device_id:
+        return f":device:{device_id}"
+    if alert_type:
+        return f":type:{alert_type}"
+    return ""
+
+
+def alert_tags(
+    device_id: Optional[str] = None,
+    alert_type: Optional[str] = None,
+    start_time: Optional[datetime] = None,
+    end_time: Optional[datetime] = None,
+) -> List[str]:
+    """Tags for an entry computed from alerts, optionally filtered.
+
+    Entries over a bounded window are tagged per UTC day, so alerts landing
+    outside the window leave them alone. Unbounded entries are tagged by
+    the device or type they filter on, or `alerts` when they read every alert.
+    """
+    qualifier = _qualifier(device_id, alert_type)
+    if start_time is not None and end_time is not None:
+        first = to_utc_naive(start_time).date()
+        last = to_utc_naive(end_time).date()
+        days = (last - first).days + 1
+        if 0 < days <= MAX_DAY_TAGS:
+            return [f"day:{first + timedelta(days=offset)}{qualifier}" for offset in range(days)]
+    return [qualifier.lstrip(":") or "alerts"]
+
+
+def hour_tags(hour: datetime, device_id: Optional[str] = None, alert_type: Optional[str] = None) -> List[str]:
+    """Tags for an entry covering exactly one naive-UTC hour bucket."""
+    return [f"hour:{hour.isoformat()}{_qualifier(device_id, alert_type)}"]
+
+
+@dataclass(frozen=True)
+class AlertChange:
+    """An "alerts changed" event: which slice of the alerts a write touched."""
+
+    device_id: str
+    alert_type: str
+    bucket_hour: datetime
+
+    @classmethod
+    def from_alert(cls, alert: Alert) -> "AlertChange":
+        return cls(alert.device_id, alert.alert_type, bucket_hour(alert.timestamp))
+
+    def tags(self) -> List[str]:
+        """Every tag an entry covering this change could be registered under."""
+        day = f"day:{self.bucket_hour.date()}"
+        hour = f"hour:{self.bucket_hour.isoformat()}"
+        return [
+            "alerts",
+            f"device:{self.device_id}",
+            f"type:{self.alert_type}",
+            day,
+            f"{day}:device:{self.device_id}",
+            f"{day}:type:{self.alert_type}",
+            hour,
+            f"{hour}:device:{self.device_id}",
+            f"{hour}:type:{self.alert_type}",
+        ]
+
+
+async def publish_alert_changes(changes: Iterable[AlertChange]) -> None:
+    """Invalidate the cached analytics affected by a set of changes.
+
+    Cache failures and timeouts are logged and swallowed, so a slow or
+    unreachable Redis cannot hold up ingestion; the alerts are already
+    stored and entries still expire by TTL.
+    """
+    tags = sorted({tag for change in set(changes) for tag in change.tags()})
+    if not tags:
+        return
+    try:
+        await asyncio.wait_for(
+            cache_module.cache.invalidate_tags(*tags),
+            REDIS_CONFIG["INVALIDATION_TIMEOUT"],
+        )
+    except asyncio.TimeoutError:
+        LOG.error("Cache invalidation for %d tags timed out", len(tags))
+    except Exception as e:
+        LOG.error("Cache invalidation for %d tags failed: %s", len(tags), e)
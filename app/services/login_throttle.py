@@ -0,0 +1,130 @@
+"""Login throttling, lockout counters and coalesced last-login writes.
+
+Failed logins are counted in Redis sliding windows updated by a Lua script,
+so a credential-stuffing wave costs Redis operations instead of one SQL
+UPDATE per attempt. Only the moment an account actually locks is written to
+the `users` table, which keeps lockouts durable across Redis restarts.
+Successful logins buffer `last_login_at` in memory and flush it in batches.
+"""
+
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Dict, Optional
+from uuid import uuid4
+
+from sqlalchemy import update
+
+from app.config.database import AsyncSessionLocal
+from app.core.settings import settings
+from app.models.user import User
+from app.services.redis_client import get_redis
+
+LOG = logging.getLogger(__name__)
+
+# Adds one event to a sliding window and returns the events still inside it.
+# KEYS[1] window zset; ARGV: now_ms, window_ms, unique member.
+SLIDING_WINDOW_SCRIPT = """
+local now = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - window)
+redis.call('ZADD', KEYS[1], now, ARGV[3])
+redis.call('PEXPIRE', KEYS[1], window)
+return redis.call('ZCARD', KEYS[1])
+"""
+
+
+class LoginThrottle:
+    """Redis sliding-window counters for failed logins and login attempts."""
+
+    def __init__(self, redis_client=None, *, prefix: Optional[str] = None) -> None:
+        self._redis = redis_client
+        self.prefix = prefix or f"{settings.cache_prefix}:login"
+        self.max_failures = settings.login_max_failures
+        self.failure_window_ms = settings.login_failure_window_seconds * 1000
+        self.lock_ms = settings.login_lock_minutes * 60 * 1000
+        self.ip_max_attempts = settings.login_ip_max_attempts
+        self.ip_window_ms = settings.login_ip_window_seconds * 1000
+
+    async def _client(self):
+        return self._redis if self._redis is not None else await get_redis()
+
+    async def _hit(self, key: str, window_ms: int) -> int:
+        redis = await self._client()
+        now_ms = int(time.time() * 1000)
+        return int(await redis.eval(SLIDING_WINDOW_SCRIPT, 1, key, now_ms, window_ms, f"{now_ms}-{uuid4().hex}"))
+
+    async def allow_attempt(self, client_ip: str) -> bool:
+        """Count a login attempt from an address; False once it is over the limit."""
+        count = await self._hit(f"{self.prefix}:ip:{client_ip}", self.ip_window_ms)
+        return count <= self.ip_max_attempts
+
+    async def is_locked(self, email: str) -> bool:
+        redis = await self._client()
+        return bool(await redis.exists(f"{self.prefix}:lock:{email}"))
+
+    async def record_failure(self, email: str) -> bool:
+        """Count a failed login; True only for the call that locks the account."""
+        count = await self._hit(f"{self.prefix}:fail:{email}", self.failure_window_ms)
+        if count < self.max_failures:
+            return False
+        redis = await self._client()
+        return bool(await redis.set(f"{self.prefix}:lock:{email}", "1", px=self.lock_ms, nx=True))
+
+    async def reset(self, email: str) -> None:
+        """Forget failed attempts after a successful login."""
+        redis = await self._client()
+        await redis.delete(f"{self.prefix}:fail:{email}")
+
+
+class LastLoginRecorder:
+    """Buffers last_login_at per user and writes them in one bulk UPDATE."""
+
+    def __init__(self, flush_interval: Optional[float] = None) -> None:
+        self.flush_interval = flush_interval or settings.last_login_flush_seconds
+        self._pending: Dict[int, datetime] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def record(self, user_id: int, when: datetime) -> None:
+        self._pending[user_id] = when
+
+    async def flush(self) -> int:
+        """Write buffered timestamps; returns the number of users updated."""
+        if not self._pending:
+            return 0
+        pending, self._pending = self._pending, {}
+        rows = [{"id": user_id, "last_login_at": when} for user_id, when in pending.items()]
+        try:
+            async with AsyncSessionLocal() as session:
+                await session.execute(update(User), rows)
+                await session.commit()
+        except Exception as e:
+            LOG.error("Failed to flush last_login_at for %d users: %s", len(rows), e)
+            for user_id, when in pending.items():
+                self._pending.setdefault(user_id, when)
+            return 0
+        return len(rows)
+
+    async def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+
+login_throttle = LoginThrottle()
+last_login_recorder = LastLoginRecorder()
@@ -0,0 +1,328 @@
+"""Background outbound mail delivery over persistent SMTP connections.
+
+Messages are appended to a Redis stream and sent by a few worker tasks, each
+holding one SMTP connection open across messages, so callers never wait for
+the SMTP handshake and queued mail survives a crash or redeploy. Workers read
+through a consumer group and acknowledge a message only once it has been
+sent; a message left unacknowledged (its worker died, or every retry failed)
+is claimed again by any worker after `mail_claim_idle_seconds`. Failed sends
+reconnect and retry with exponential backoff.
+"""
+
+import asyncio
+import logging
+import os
+import socket
+import time
+from dataclasses import dataclass
+from email.message import EmailMessage
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+import aiosmtplib
+from redis.exceptions import ResponseError
+
+from app.core.settings import settings
+from app.services.redis_client import get_redis
+
+LOG = logging.getLogger(__name__)
+
+# How long a worker blocks on the stream before checking for shutdown.
+READ_BLOCK_MS = 1000
+
+# Delay before a worker retries after Redis failed.
+REDIS_RETRY_DELAY_SECONDS = 1.0
+
+Entry = Tuple[str, Optional[Dict[str, str]]]
+
+
+class MailQueueFull(Exception):
+    """Raised when the queue already holds `mail_queue_size` messages."""
+
+
+class MailDeliveryError(Exception):
+    """Raised when a message could not be sent after every retry."""
+
+
+@dataclass
+class MailMessage:
+    """A rendered email waiting to be sent.
+
+    A message still unsent at `expires_at` (a unix timestamp) is dropped
+    instead of sent late.
+    """
+
+    to: str
+    subject: str
+    html: str
+    expires_at: Optional[float] = None
+
+    def expired(self) -> bool:
+        return self.expires_at is not None and time.time() >= self.expires_at
+
+    def to_fields(self) -> Dict[str, str]:
+        return {
+            "to": self.to,
+            "subject": self.subject,
+            "html": self.html,
+            "expires_at": "" if self.expires_at is None else repr(self.expires_at),
+        }
+
+    @classmethod
+    def from_fields(cls, fields: Dict[str, str]) -> "MailMessage":
+        expires_at = fields.get("expires_at")
+        return cls(
+            to=fields["to"],
+            subject=fields["subject"],
+            html=fields["html"],
+            expires_at=float(expires_at) if expires_at else None,
+        )
+
+
+class MailQueue:
+    """Bounded Redis-backed queue of outbound mail drained by a pool of SMTP workers."""
+
+    def __init__(
+        self,
+        redis_client=None,
+        *,
+        stream: Optional[str] = None,
+        pool_size: Optional[int] = None,
+        queue_size: Optional[int] = None,
+        max_retries: Optional[int] = None,
+        retry_backoff: Optional[float] = None,
+        claim_idle_seconds: Optional[float] = None,
+        smtp_factory: Optional[Callable[[], Any]] = None,
+    ) -> None:
+        self._redis = redis_client
+        self.stream = stream or f"{settings.cache_prefix}:mail"
+        self.group = "mailers"
+        self.pool_size = pool_size or settings.mail_pool_size
+        self.queue_size = queue_size or settings.mail_queue_size
+        self.max_retries = max_retries if max_retries is not None else settings.mail_max_retries
+        self.retry_backoff = retry_backoff if retry_backoff is not None else settings.mail_retry_backoff
+        self.claim_idle_seconds = (
+            claim_idle_seconds if claim_idle_seconds is not None else settings.mail_claim_idle_seconds
+        )
+        self._smtp_factory = smtp_factory or self._default_smtp
+        self._workers: List[asyncio.Task] = []
+        # Workers in the middle of sending; the rest are only waiting on Redis.
+        self._sending: Set[asyncio.Task] = set()
+        self._stopping: Optional[asyncio.Event] = None
+        self.queued = 0
+        self.sent = 0
+        self.failed = 0
+        self.expired = 0
+        self.retries = 0
+        self.connections_opened = 0
+
+    @staticmethod
+    def _default_smtp() -> aiosmtplib.SMTP:
+        return aiosmtplib.SMTP(
+            hostname=settings.mail_server,
+            port=settings.mail_port,
+            username=(settings.mail_username or None) if settings.use_credentials else None,
+            password=(settings.mail_password or None) if settings.use_credentials else None,
+            use_tls=settings.mail_ssl_tls,
+            start_tls=settings.mail_starttls if not settings.mail_ssl_tls else False,
+            validate_certs=settings.validate_certs,
+        )
+
+    async def _client(self):
+        return self._redis if self._redis is not None else await get_redis()
+
+    @property
+    def running(self) -> bool:
+        return bool(self._workers)
+
+    async def start(self) -> None:
+        if self.running:
+            return
+        self._stopping = asyncio.Event()
+        consumer = f"{socket.gethostname()}:{os.getpid()}"
+        self._workers = [
+            asyncio.create_task(self._work(f"{consumer}:{index}")) for index in range(self.pool_size)
+        ]
+
+    async def stop(self, timeout: Optional[float] = None) -> None:
+        """Let workers finish the message in hand for up to `timeout` seconds, then stop them.
+
+        Queued mail stays in Redis for the next worker to start.
+        """
+        if not self.running:
+            return
+        self._stopping.set()
+        for worker in self._workers:
+            if worker not in self._sending:
+                worker.cancel()
+        _, pending = await asyncio.wait(
+            self._workers, timeout=timeout if timeout is not None else settings.mail_drain_timeout
+        )
+        if pending:
+            LOG.warning("Interrupting %d mail workers at shutdown", len(pending))
+        for worker in pending:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def check_capacity(self) -> None:
+        """Raise MailQueueFull unless there is room for another message.
+
+        Call it before doing work that only makes sense if the mail can be
+        queued; `enqueue` itself does not check.
+        """
+        redis = await self._client()
+        self.queued = await redis.xlen(self.stream)
+        if self.queued >= self.queue_size:
+            raise MailQueueFull(f"{self.queued} emails are already queued")
+
+    async def enqueue(self, message: MailMessage) -> None:
+        """Append a message to the stream; it is sent once a worker picks it up."""
+        redis = await self._client()
+        await redis.xadd(self.stream, message.to_fields())
+        self.queued += 1
+
+    async def _ensure_group(self, redis: Any) -> None:
+        try:
+            await redis.xgroup_create(self.stream, self.group, id="0", mkstream=True)
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    async def _next(self, redis: Any, consumer: str) -> List[Entry]:
+        """Claim one message abandoned by another worker, or read a new one."""
+        _, claimed, *_ = await redis.xautoclaim(
+            self.stream, self.group, consumer, int(self.claim_idle_seconds * 1000), count=1
+        )
+        if claimed:
+            return claimed
+        response = await redis.xreadgroup(
+            self.group, consumer, {self.stream: ">"}, count=1, block=READ_BLOCK_MS
+        )
+        return [entry for _, entries in response or [] for entry in entries]
+
+    async def _ack(self, redis: Any, entry_id: str) -> None:
+        async with redis.pipeline(transaction=True) as pipe:
+            pipe.xack(self.stream, self.group, entry_id)
+            pipe.xdel(self.stream, entry_id)
+            await pipe.execute()
+        self.queued = max(0, self.queued - 1)
+
+    async def _work(self, consumer: str) -> None:
+        smtp = None
+        group_ready = False
+        try:
+            while not self._stopping.is_set():
+                try:
+                    redis = await self._client()
+                    if not group_ready:
+                        await self._ensure_group(redis)
+                        group_ready = True
+                    entries = await self._next(redis, consumer)
+                except Exception as e:
+                    LOG.error("Reading the mail queue failed: %s", e)
+                    group_ready = False
+                    await asyncio.sleep(REDIS_RETRY_DELAY_SECONDS)
+                    continue
+
+                task = asyncio.current_task()
+                self._sending.add(task)
+                try:
+                    for entry_id, fields in entries:
+                        smtp = await self._handle(redis, smtp, entry_id, fields)
+                finally:
+                    self._sending.discard(task)
+        finally:
+            await self._close(smtp)
+
+    async def _handle(self, redis: Any, smtp: Any, entry_id: str, fields: Optional[Dict[str, str]]) -> Any:
+        """Send one stream entry and acknowledge it; returns the live connection."""
+        # A claimed entry whose message was already deleted has no fields.
+        if fields:
+            message = MailMessage.from_fields(fields)
+            if message.expired():
+                self.expired += 1
+                LOG.warning("Dropping expired email to %s", message.to)
+            else:
+                try:
+                    smtp = await self._deliver(smtp, message)
+                except MailDeliveryError as e:
+                    # Left unacknowledged, so it is claimed and tried again later.
+                    self.failed += 1
+                    LOG.error("%s", e)
+                    return None
+                except Exception:
+                    # Anything _deliver does not expect costs this attempt, not the worker.
+                    self.failed += 1
+                    LOG.exception("Unexpected error sending email to %s", message.to)
+                    await self._close(smtp)
+                    return None
+        try:
+            await self._ack(redis, entry_id)
+        except Exception as e:
+            LOG.error("Acknowledging email %s failed: %s", entry_id, e)
+        return smtp
+
+    async def _deliver(self, smtp: Any, message: MailMessage) -> Any:
+        """Send one message, reconnecting and retrying; returns the live connection.
+
+        Raises MailDeliveryError once every attempt has failed.
+        """
+        email = _to_email(message)
+        for attempt in range(self.max_retries + 1):
+            try:
+                if smtp is None or not smtp.is_connected:
+                    smtp = self._smtp_factory()
+                    await smtp.connect()
+                    self.connections_opened += 1
+                await smtp.send_message(email)
+                self.sent += 1
+                LOG.info("Email sent to %s", message.to)
+                return smtp
+            except (aiosmtplib.SMTPException, OSError, asyncio.TimeoutError) as e:
+                await self._close(smtp)
+                smtp = None
+                if attempt == self.max_retries:
+                    raise MailDeliveryError(
+                        f"Giving up on email to {message.to} after {attempt + 1} attempts: {e}"
+                    ) from e
+                self.retries += 1
+                delay = self.retry_backoff * (2 ** attempt)
+                LOG.warning("Email to %s failed (%s); retrying in %.1fs", message.to, e, delay)
+                await asyncio.sleep(delay)
+        return smtp
+
+    @staticmethod
+    async def _close(smtp: Any) -> None:
+        if smtp is None or not smtp.is_connected:
+            return
+        try:
+            await smtp.quit()
+        except Exception:
+            try:
+                smtp.close()
+            except Exception:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        """Delivery counters; `queued` is the stream length as last seen by this worker."""
+        return {
+            "workers": len(self._workers),
+            "queued": self.queued,
+            "sent": self.sent,
+            "failed": self.failed,
+            "expired": self.expired,
+            "retries": self.retries,
+            "connections_opened": self.connections_opened,
+        }
+
+
+def _to_email(message: MailMessage) -> EmailMessage:
+    email = EmailMessage()
+    email["From"] = f"{settings.mail_from_name} <{settings.mail_from}>"
+    email["To"] = message.to
+    email["Subject"] = message.subject
+    email.set_content(message.html, subtype="html")
+    return email
+
+
+mail_queue = MailQueue()
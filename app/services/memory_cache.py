@@ -0,0 +1,103 @@
+"""Bounded in-process LRU used as the first cache tier in front of Redis."""
+
+import sys
+import time
+from collections import OrderedDict
+from fnmatch import fnmatch
+from typing import Any, Dict, Optional, Tuple
+
+
+def estimate_size(value: Any) -> int:
+    """Approximate bytes held by a decoded cache value (JSON-like data).
+
+    Sums `sys.getsizeof` over the value and everything it contains, which is
+    what the decoded object costs in memory; compressed Redis values can be
+    many times smaller.
+    """
+    size = 0
+    stack = [value]
+    while stack:
+        item = stack.pop()
+        size += sys.getsizeof(item)
+        if isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple)):
+            stack.extend(item)
+    return size
+
+
+class MemoryLRU:
+    """Size-bounded LRU of decoded cache values with a short TTL.
+
+    Entries are charged their estimated decoded size (see `estimate_size`),
+    and the least recently used ones are evicted once either `max_bytes` or
+    `max_entries` is exceeded. Values are returned as stored, so callers must
+    treat them as read-only.
+    """
+
+    def __init__(self, *, max_bytes: int, max_entries: int, ttl: float) -> None:
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, int, Any]]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return a live entry and mark it most recently used, or None."""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, _, value = entry
+        if expires_at <= time.monotonic():
+            self._remove(key)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: str, value: Any, size: int) -> None:
+        """Store a value charged at `size` bytes, evicting as needed."""
+        self._remove(key)
+        if size > self.max_bytes:
+            return
+        self._entries[key] = (time.monotonic() + self.ttl, size, value)
+        self._bytes += size
+        while self._bytes > self.max_bytes or len(self._entries) > self.max_entries:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def delete(self, key: str) -> None:
+        self._remove(key)
+
+    def delete_matching(self, pattern: str) -> None:
+        """Drop every entry whose key matches the glob pattern."""
+        for key in [key for key in self._entries if fnmatch(key, pattern)]:
+            self._remove(key)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._bytes = 0
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[1]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
@@ -1,11 +1,36 @@
 """
 Service for storing model logs and generating dashboard summaries.
 """
+from collections import Counter
 from datetime import datetime, timedelta
-from typing import Any, Dict, List, Optional
-from sqlalchemy import select, func
-from app.models.model_log import ModelLog
+from typing import Any, Dict, Iterable, List, Optional
+from sqlalchemy import and_, delete, select, func, insert, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.alert_rollup import bucket_hour, to_utc_naive
+from app.models.model_log import ModelLog, ModelLogRollup
 from app.db.session import AsyncSessionLocal
+from app.db.upsert import counter_upsert
+from app.schemas.model_log import ModelLogCreate
+
+INSERT_CHUNK_SIZE = 1000
+
+
+async def _add_to_rollups(session: AsyncSession, counts: Counter) -> None:
+    """Add per-(hour, model, level) counts to model_log_rollups.
+
+    Rows are written in primary-key order so concurrent writers lock shared
+    rollup rows in the same order and cannot deadlock each other.
+    """
+    rows = [
+        {"bucket_hour": hour, "model_name": model_name, "log_level": log_level, "log_count": count}
+        for (hour, model_name, log_level), count in sorted(counts.items())
+    ]
+    dialect_name = session.get_bind().dialect.name
+    for i in range(0, len(rows), INSERT_CHUNK_SIZE):
+        await session.execute(
+            counter_upsert(dialect_name, ModelLogRollup.__table__, rows[i:i + INSERT_CHUNK_SIZE], ["log_count"])
+        )
+
 
 class ModelLogService:
     @staticmethod
@@ -22,14 +47,71 @@ class ModelLogService:
             log_level=log_level,
             message=message,
             extra=extra,
-            timestamp=timestamp or datetime.utcnow()
+            timestamp=to_utc_naive(timestamp) if timestamp else datetime.utcnow()
         )
         async with AsyncSessionLocal() as session:
             session.add(log)
+            await _add_to_rollups(session, Counter({(bucket_hour(log.timestamp), model_name, log_level): 1}))
             await session.commit()
             await session.refresh(log)
         return log
 
+    @staticmethod
+    async def store_logs(logs: Iterable[ModelLogCreate]) -> int:
+        """Store many log entries as chunked multi-row inserts in one transaction.
+
+        Rollups are updated in the same transaction. Returns the number of rows
+        written; nothing is written if any chunk fails.
+        """
+        now = datetime.utcnow()
+        written = 0
+        counts: Counter = Counter()
+        async with AsyncSessionLocal() as session:
+            batch: List[Dict[str, Any]] = []
+            for log in logs:
+                row = log.model_dump()
+                row["timestamp"] = to_utc_naive(row["timestamp"]) if row["timestamp"] else now
+                counts[(bucket_hour(row["timestamp"]), row["model_name"], row["log_level"])] += 1
+                batch.append(row)
+                if len(batch) >= INSERT_CHUNK_SIZE:
+                    await session.execute(insert(ModelLog), batch)
+                    written += len(batch)
+                    batch = []
+            if batch:
+                await session.execute(insert(ModelLog), batch)
+                written += len(batch)
+            if counts:
+                await _add_to_rollups(session, counts)
+            await session.commit()
+        return written
+
+    @staticmethod
+    async def backfill_rollups() -> int:
+        """Rebuild model_log_rollups from the raw model_logs table.
+
+        Runs in one transaction; logs stored while it runs may be missed, so
+        run it with ingestion paused. Returns the number of rollup rows written.
+        """
+        async with AsyncSessionLocal() as session:
+            if session.get_bind().dialect.name == "sqlite":
+                hour = func.strftime("%Y-%m-%d %H:00:00", ModelLog.timestamp)
+            else:
+                hour = func.date_trunc("hour", ModelLog.timestamp)
+
+            query = select(
+                hour, ModelLog.model_name, ModelLog.log_level, func.count(ModelLog.id)
+            ).group_by(hour, ModelLog.model_name, ModelLog.log_level)
+            counts: Counter = Counter()
+            for bucket_value, model_name, log_level, count in await session.execute(query):
+                if isinstance(bucket_value, str):
+                    bucket_value = datetime.strptime(bucket_value, "%Y-%m-%d %H:00:00")
+                counts[(bucket_value, model_name, log_level)] = count
+
+            await session.execute(delete(ModelLogRollup))
+            await _add_to_rollups(session, counts)
+            await session.commit()
+            return len(counts)
+
     @staticmethod
     async def get_recent_logs(limit: int = 20) -> List[ModelLog]:
         """Get the most recent model logs."""
@@ -41,27 +123,63 @@ class ModelLogService:
 
     @staticmethod
     async def get_log_summary(since_hours: int = 24) -> Dict[str, Any]:
-        """Get a summary of logs for the dashboard (counts, error rates, etc)."""
+        """Get a summary of logs for the dashboard (counts, error rates, etc).
+
+        Whole hours come from model_log_rollups; only the partial hour at the
+        start of the window and the current hour are counted from raw logs, in
+        one grouped scan by model and level.
+        """
         since = datetime.utcnow() - timedelta(hours=since_hours)
+        first_hour = bucket_hour(since)
+        if first_hour < since:
+            first_hour += timedelta(hours=1)
+        current_hour = bucket_hour(datetime.utcnow())
+
+        counts: Counter = Counter()
         async with AsyncSessionLocal() as session:
-            total_logs = await session.scalar(
-                select(func.count(ModelLog.id)).where(ModelLog.timestamp >= since)
-            )
-            error_logs = await session.scalar(
-                select(func.count(ModelLog.id)).where(
-                    ModelLog.timestamp >= since,
-                    ModelLog.log_level == "ERROR"
+            if first_hour < current_hour:
+                rollups = await session.execute(
+                    select(
+                        ModelLogRollup.model_name,
+                        ModelLogRollup.log_level,
+                        func.sum(ModelLogRollup.log_count)
+                    ).where(
+                        ModelLogRollup.bucket_hour >= first_hour,
+                        ModelLogRollup.bucket_hour < current_hour
+                    ).group_by(ModelLogRollup.model_name, ModelLogRollup.log_level)
                 )
-            )
-            by_model = await session.execute(
+                for model_name, log_level, count in rollups:
+                    counts[(model_name, log_level)] += int(count or 0)
+                raw_window = or_(
+                    and_(ModelLog.timestamp >= since, ModelLog.timestamp < first_hour),
+                    ModelLog.timestamp >= current_hour
+                )
+            else:
+                raw_window = ModelLog.timestamp >= since
+
+            raw = await session.execute(
                 select(
                     ModelLog.model_name,
+                    ModelLog.log_level,
                     func.count(ModelLog.id)
-                ).where(ModelLog.timestamp >= since).group_by(ModelLog.model_name)
+                ).where(raw_window).group_by(ModelLog.model_name, ModelLog.log_level)
             )
-            model_counts = {row[0]: row[1] for row in by_model}
+            for model_name, log_level, count in raw:
+                counts[(model_name, log_level)] += count
+
+        model_counts: Counter = Counter()
+        level_counts: Counter = Counter()
+        model_level_counts: Dict[str, Dict[str, int]] = {}
+        for (model_name, log_level), count in counts.items():
+            if not count:
+                continue
+            model_counts[model_name] += count
+            level_counts[log_level] += count
+            model_level_counts.setdefault(model_name, {})[log_level] = count
         return {
-            "total_logs": total_logs,
-            "error_logs": error_logs,
-            "model_counts": model_counts,
+            "total_logs": sum(model_counts.values()),
+            "error_logs": level_counts.get("ERROR", 0),
+            "model_counts": dict(model_counts),
+            "level_counts": dict(level_counts),
+            "model_level_counts": model_level_counts,
         }
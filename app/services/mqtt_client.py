@@ -1,70 +1,333 @@
 """MQTT client and message handling functionality."""
 
 import json
+import logging
+import os
+import queue
 import asyncio
+import threading
+import time
+from functools import partial
+from typing import Any, Dict, List, Optional, Sequence
+
 import paho.mqtt.client as mqtt
-from app.core.settings import MQTT_CONFIG
+from app.core.logging import Sampler, payload_logging_enabled
+from app.core.metrics import ALERT_STAGE_SECONDS, ALERTS_REJECTED
+from app.core.settings import MQTT_CONFIG, settings
 from app.schemas.alerts import AlertCreate
 from concurrent.futures import ThreadPoolExecutor
-from app.services.alert_processor import process_and_save_alert
+from app.services.alert_pipeline import alert_pipeline
+
+LOG = logging.getLogger(__name__)
+
+OVERFLOW_POLICIES = ("block", "drop_oldest", "spill")
+
+# Upper bound on how many queued alerts the dispatcher moves per executor hop.
+DISPATCH_BATCH = 256
+
+# How often an idle dispatcher checks the spill file for alerts to replay.
+SPILL_REPLAY_SECONDS = 1.0
+
+# Pause before the dispatcher resumes after an unexpected error.
+DISPATCH_RESTART_DELAY = 1.0
+
+# How long stop_dispatcher waits for room in a full hand-off queue.
+STOP_TIMEOUT_SECONDS = 5.0
+
+_STOP = object()
+
+_debug_sample = Sampler(settings.log_debug_sample_every)
 
 
 class MQTTService:
-    """MQTT client service for handling alert messages."""
-    
-    def __init__(self):
+    """MQTT client service for handling alert messages.
+
+    The paho network thread validates messages and places them on a bounded
+    hand-off queue. A dispatcher task on the event loop drains that queue into
+    the alert ingest pipeline, so the number of in-flight alerts is capped by
+    the queue depth instead of growing without limit.
+    """
+
+    def __init__(
+        self,
+        *,
+        queue_size: Optional[int] = None,
+        overflow_policy: Optional[str] = None,
+        spill_path: Optional[str] = None,
+    ):
         self.client = mqtt.Client()
         if MQTT_CONFIG["USERNAME"] and MQTT_CONFIG["PASSWORD"]:
             self.client.username_pw_set(MQTT_CONFIG["USERNAME"], MQTT_CONFIG["PASSWORD"])
             # Check if host is HiveMQ to enable TLS
             if "hivemq.cloud" in MQTT_CONFIG["BROKER_HOST"]:
-                print("Enabling TLS for HiveMQ MQTT.")
+                LOG.info("Enabling TLS for HiveMQ MQTT")
                 self.client.tls_set()
-                
+
         self.client.on_connect = self._on_connect
         self.client.on_message = self._on_message
         self.loop = asyncio.get_event_loop()
         self.executor = ThreadPoolExecutor(max_workers=2)
         self.running = False
-    
+
+        self.overflow_policy = overflow_policy or MQTT_CONFIG["OVERFLOW_POLICY"]
+        if self.overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(
+                f"Unknown MQTT overflow policy {self.overflow_policy!r}; "
+                f"expected one of {', '.join(OVERFLOW_POLICIES)}"
+            )
+        self.queue_size = queue_size or MQTT_CONFIG["INGEST_QUEUE_SIZE"]
+        self.spill_path = spill_path or MQTT_CONFIG["SPILL_PATH"]
+        self._handoff: "queue.Queue[Any]" = queue.Queue(maxsize=self.queue_size)
+        self._spill_lock = threading.Lock()
+        self._dispatcher: Optional[asyncio.Task] = None
+
+        self.received = 0
+        self.invalid = 0
+        self.dropped = 0
+        self.spilled = 0
+        self.replayed = 0
+
     def _on_connect(self, client, userdata, flags, rc):
         """Callback for MQTT broker connection."""
         if rc == 0:
-            print(f"Successfully connected to MQTT Broker at {MQTT_CONFIG['BROKER_HOST']}")
+            LOG.info("Connected to MQTT broker at %s", MQTT_CONFIG["BROKER_HOST"])
             client.subscribe(MQTT_CONFIG["ALERTS_TOPIC"])
         else:
-            print(f"Failed to connect to MQTT Broker, return code {rc}")
-    
+            LOG.error("Failed to connect to MQTT broker, return code %s", rc)
+
     def _on_message(self, client, userdata, msg):
         """Callback for MQTT message reception."""
-        print(f"Received message on topic {msg.topic}")
-        
+        self.received += 1
+        if LOG.isEnabledFor(logging.DEBUG) and _debug_sample():
+            LOG.debug("Received message on topic %s (%d bytes)", msg.topic, len(msg.payload))
+
+        started = time.perf_counter()
         try:
             payload = json.loads(msg.payload.decode())
-            print(payload)
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            self.invalid += 1
+            ALERTS_REJECTED.inc("MQTT", "invalid_json")
+            LOG.warning("MQTT message on %s is not valid JSON", msg.topic)
+            return
+        decoded = time.perf_counter()
+        ALERT_STAGE_SECONDS.observe(decoded - started, "json_decode")
+        if isinstance(payload, dict) and payload_logging_enabled(payload.get("device_id"), msg.topic):
+            LOG.info("MQTT payload on %s: %s", msg.topic, payload)
+
+        try:
             alert_data = AlertCreate(**payload)
-            
-            asyncio.run_coroutine_threadsafe(process_and_save_alert(alert_data, source="MQTT"), self.loop)
-            
-        except json.JSONDecodeError:
-            print("Error: Received MQTT message is not valid JSON")
         except Exception as e:
-            print(f"Error processing MQTT message: {e}")
-    
+            self.invalid += 1
+            ALERTS_REJECTED.inc("MQTT", "invalid_alert")
+            LOG.warning("Invalid alert in MQTT message on %s: %s", msg.topic, e)
+            return
+        validated = time.perf_counter()
+        ALERT_STAGE_SECONDS.observe(validated - decoded, "validation")
+
+        self._hand_off(alert_data)
+        ALERT_STAGE_SECONDS.observe(time.perf_counter() - validated, "mqtt_handoff")
+
+    def _hand_off(self, alert_data: AlertCreate) -> None:
+        """Place a validated alert on the bounded queue, applying the overflow policy."""
+        if self.overflow_policy == "block":
+            # Stalls the paho network thread until the dispatcher catches up.
+            self._handoff.put(alert_data)
+            return
+
+        try:
+            self._handoff.put_nowait(alert_data)
+            return
+        except queue.Full:
+            pass
+
+        if self.overflow_policy == "drop_oldest":
+            try:
+                self._handoff.get_nowait()
+                self.dropped += 1
+            except queue.Empty:
+                pass
+            try:
+                self._handoff.put_nowait(alert_data)
+            except queue.Full:
+                self.dropped += 1
+        else:
+            self._spill(alert_data)
+
+    def _spill(self, alert_data: AlertCreate) -> None:
+        """Append an alert that did not fit in the queue to the spill file."""
+        try:
+            with self._spill_lock:
+                with open(self.spill_path, "a", encoding="utf-8") as spill_file:
+                    spill_file.write(alert_data.model_dump_json())
+                    spill_file.write("\n")
+            self.spilled += 1
+        except OSError as e:
+            self.dropped += 1
+            LOG.error("Error spilling MQTT alert to disk: %s", e)
+
+    @property
+    def _replay_path(self) -> str:
+        return f"{self.spill_path}.replay"
+
+    def _take_spilled(self) -> Optional[List[AlertCreate]]:
+        """Atomically claim the spill file and parse its contents; None if there is none.
+
+        The claimed file stays on disk until `_finish_replay` removes it, so
+        a replay that fails or crashes part way reads it again before a new
+        one is claimed, and nothing in it is lost or overwritten.
+        """
+        claimed_path = self._replay_path
+        with self._spill_lock:
+            if not os.path.exists(claimed_path):
+                if not os.path.exists(self.spill_path):
+                    return None
+                os.replace(self.spill_path, claimed_path)
+
+        alerts = []
+        with open(claimed_path, encoding="utf-8") as spill_file:
+            for line in spill_file:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    alerts.append(AlertCreate.model_validate_json(line))
+                except Exception as e:
+                    LOG.warning("Skipping unreadable spilled alert: %s", e)
+        return alerts
+
+    def _finish_replay(self, remaining: Sequence[AlertCreate] = ()) -> None:
+        """Remove the claimed spill file, or rewrite it with the alerts not yet replayed."""
+        if not remaining:
+            os.remove(self._replay_path)
+            return
+        partial_path = f"{self._replay_path}.tmp"
+        with open(partial_path, "w", encoding="utf-8") as spill_file:
+            for alert_data in remaining:
+                spill_file.write(alert_data.model_dump_json())
+                spill_file.write("\n")
+        os.replace(partial_path, self._replay_path)
+
+    def _drain(self) -> List[Any]:
+        """Wait briefly for one item, then take whatever else is already queued.
+
+        Returns an empty list when nothing arrived, so the dispatcher wakes
+        up regularly to replay spilled alerts even when MQTT is quiet.
+        """
+        try:
+            items = [self._handoff.get(timeout=SPILL_REPLAY_SECONDS)]
+        except queue.Empty:
+            return []
+        while len(items) < DISPATCH_BATCH and items[-1] is not _STOP:
+            try:
+                items.append(self._handoff.get_nowait())
+            except queue.Empty:
+                break
+        return items
+
+    async def _dispatch(self) -> None:
+        """Run the dispatch loop until stopped, resuming after unexpected errors.
+
+        The paho thread may be blocked on the hand-off queue, so the
+        dispatcher must never die while the service is running.
+        """
+        while True:
+            try:
+                await self._dispatch_loop()
+                return
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                LOG.exception("MQTT dispatcher failed; resuming in %.1f s", DISPATCH_RESTART_DELAY)
+                await asyncio.sleep(DISPATCH_RESTART_DELAY)
+
+    async def _dispatch_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            items = await loop.run_in_executor(self.executor, self._drain)
+            for item in items:
+                if item is _STOP:
+                    return
+                try:
+                    await alert_pipeline.enqueue(item, source="MQTT")
+                except Exception as e:
+                    self.dropped += 1
+                    LOG.error("Error handing MQTT alert to the pipeline: %s", e)
+
+            if self.overflow_policy == "spill" and self._handoff.empty():
+                await self._replay_spilled(loop)
+
+    async def _replay_spilled(self, loop: asyncio.AbstractEventLoop) -> None:
+        spilled = await loop.run_in_executor(self.executor, self._take_spilled)
+        if spilled is None:
+            return
+        for index, alert_data in enumerate(spilled):
+            try:
+                await alert_pipeline.enqueue(alert_data, source="MQTT")
+            except BaseException:
+                # Keep what has not reached the pipeline for the next replay.
+                self._finish_replay(spilled[index:])
+                raise
+            self.replayed += 1
+        await loop.run_in_executor(self.executor, self._finish_replay)
+
+    async def start_dispatcher(self) -> None:
+        """Start draining the hand-off queue on the running event loop."""
+        if self._dispatcher is not None and not self._dispatcher.done():
+            return
+        self.loop = asyncio.get_running_loop()
+        self._dispatcher = asyncio.create_task(self._dispatch())
+
+    async def stop_dispatcher(self) -> None:
+        """Forward everything still queued to the pipeline, then stop.
+
+        If the queue stays full for STOP_TIMEOUT_SECONDS the dispatcher is
+        cancelled instead, and whatever is still queued is lost.
+        """
+        if self._dispatcher is None:
+            return
+        try:
+            await self.loop.run_in_executor(
+                self.executor, partial(self._handoff.put, _STOP, timeout=STOP_TIMEOUT_SECONDS)
+            )
+        except queue.Full:
+            LOG.error(
+                "MQTT hand-off queue still full after %.0f s; dropping %d queued alerts",
+                STOP_TIMEOUT_SECONDS, self._handoff.qsize(),
+            )
+            self._dispatcher.cancel()
+        try:
+            await self._dispatcher
+        except asyncio.CancelledError:
+            pass
+        self._dispatcher = None
+
+    def ingest_stats(self) -> Dict[str, Any]:
+        """Return hand-off queue depth and overflow counters."""
+        return {
+            "queue_depth": self._handoff.qsize(),
+            "queue_capacity": self.queue_size,
+            "overflow_policy": self.overflow_policy,
+            "received": self.received,
+            "invalid": self.invalid,
+            "dropped": self.dropped,
+            "spilled": self.spilled,
+            "replayed": self.replayed,
+        }
+
     def start(self):
         """Initialize and start the MQTT client loop."""
         self.running = True
         try:
-            print("Initializing MQTT connection...")
+            LOG.info("Initializing MQTT connection")
             self.client.connect(MQTT_CONFIG["BROKER_HOST"], MQTT_CONFIG["BROKER_PORT"], 60)
             self.client.loop_forever()
         except Exception as e:
-            print(f"Critical MQTT connection failure: {e}")
-    
+            LOG.critical("MQTT connection failure: %s", e)
+
     def stop(self):
         """Disconnect the MQTT client."""
         self.running = True
-        print("Disconnecting from MQTT broker...")
+        LOG.info("Disconnecting from MQTT broker")
         self.client.disconnect()
 
-mqtt_service = MQTTService()
\ No newline at end of file
+mqtt_service = MQTTService()
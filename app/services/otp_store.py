@@ -0,0 +1,131 @@
+"""Storage backends for one-time passwords.
+
+Both backends keep at most one live code per email: issuing a code replaces
+the previous one, and a code can be consumed only once. The Redis backend
+relies on key expiry and verifies with a Lua script that checks, consumes and
+counts wrong guesses atomically; the SQL backend uses the `otps` table for
+deployments without Redis.
+"""
+
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import and_, delete, update
+
+from app.config.database import AsyncSessionLocal
+from app.core.settings import settings
+from app.models.otp import OTP
+from app.services.redis_client import get_redis
+
+# KEYS[1] code, KEYS[2] wrong-guess counter; ARGV[1] candidate, ARGV[2] max attempts.
+# Returns 1 when the code matched (and is consumed), 0 when it did not, and
+# -1 when that guess used up the last attempt (the code is discarded).
+VERIFY_OTP_SCRIPT = """
+local stored = redis.call('GET', KEYS[1])
+if not stored then
+    return 0
+end
+if stored == ARGV[1] then
+    redis.call('DEL', KEYS[1], KEYS[2])
+    return 1
+end
+local attempts = redis.call('INCR', KEYS[2])
+if attempts == 1 then
+    local ttl = redis.call('PTTL', KEYS[1])
+    if ttl > 0 then
+        redis.call('PEXPIRE', KEYS[2], ttl)
+    end
+end
+if attempts >= tonumber(ARGV[2]) then
+    redis.call('DEL', KEYS[1], KEYS[2])
+    return -1
+end
+return 0
+"""
+
+
+class OTPStore(ABC):
+    """Interface shared by OTP backends."""
+
+    @abstractmethod
+    async def issue(self, email: str, code: str, ttl_seconds: int) -> None:
+        """Store `code` as the only valid code for `email`."""
+
+    @abstractmethod
+    async def verify(self, email: str, code: str) -> bool:
+        """Consume `code` if it is the live code for `email`."""
+
+
+class SQLOTPStore(OTPStore):
+    """OTPs in the `otps` table; issuing a code deletes the email's old rows."""
+
+    async def issue(self, email: str, code: str, ttl_seconds: int) -> None:
+        async with AsyncSessionLocal() as session:
+            await session.execute(delete(OTP).where(OTP.email == email))
+            session.add(OTP(
+                email=email,
+                otp_code=code,
+                expires_at=datetime.utcnow() + timedelta(seconds=ttl_seconds),
+                is_used=False,
+            ))
+            await session.commit()
+
+    async def verify(self, email: str, code: str) -> bool:
+        async with AsyncSessionLocal() as session:
+            # One conditional UPDATE both checks and consumes the code.
+            result = await session.execute(
+                update(OTP)
+                .where(
+                    and_(
+                        OTP.email == email,
+                        OTP.otp_code == code,
+                        OTP.is_used == False,  # noqa: E712
+                        OTP.expires_at > datetime.utcnow(),
+                    )
+                )
+                .values(is_used=True)
+            )
+            await session.commit()
+            return result.rowcount > 0
+
+
+class RedisOTPStore(OTPStore):
+    """OTPs as expiring Redis keys with a per-email wrong-guess counter."""
+
+    def __init__(self, redis_client=None, *, prefix: Optional[str] = None, max_attempts: Optional[int] = None) -> None:
+        self._redis = redis_client
+        self.prefix = prefix or f"{settings.cache_prefix}:otp"
+        self.max_attempts = max_attempts or settings.otp_max_attempts
+
+    async def _client(self):
+        return self._redis if self._redis is not None else await get_redis()
+
+    async def issue(self, email: str, code: str, ttl_seconds: int) -> None:
+        redis = await self._client()
+        async with redis.pipeline(transaction=True) as pipe:
+            pipe.set(f"{self.prefix}:{email}", code, ex=ttl_seconds)
+            pipe.delete(f"{self.prefix}:attempts:{email}")
+            await pipe.execute()
+
+    async def verify(self, email: str, code: str) -> bool:
+        redis = await self._client()
+        result = await redis.eval(
+            VERIFY_OTP_SCRIPT,
+            2,
+            f"{self.prefix}:{email}",
+            f"{self.prefix}:attempts:{email}",
+            code,
+            self.max_attempts,
+        )
+        return int(result) == 1
+
+
+def create_otp_store(name: Optional[str] = None) -> OTPStore:
+    """Build the backend selected by OTP_BACKEND."""
+    name = name or settings.otp_backend
+    if name == "sql":
+        return SQLOTPStore()
+    if name == "redis":
+        return RedisOTPStore()
+    raise ValueError(f"Unknown OTP backend {name!r}; expected sql or redis")
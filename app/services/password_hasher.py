@@ -0,0 +1,132 @@
+"""Argon2 password hashing off the event loop.
+
+Hashing and verifying a password costs tens of milliseconds of CPU. Running
+that inline in a coroutine stalls every other task in the process, so the
+work goes to a small dedicated thread pool (argon2-cffi releases the GIL
+while hashing) and the number of outstanding jobs is capped so a login
+burst queues instead of piling up unbounded work.
+"""
+
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, TypeVar
+
+from passlib.hash import argon2
+
+from app.core.settings import settings
+
+T = TypeVar("T")
+
+
+class PasswordHasher:
+    """Runs argon2 hash/verify in a bounded thread pool and tracks queue time."""
+
+    def __init__(
+        self,
+        *,
+        workers: Optional[int] = None,
+        max_pending: Optional[int] = None,
+        time_cost: Optional[int] = None,
+        memory_cost: Optional[int] = None,
+        parallelism: Optional[int] = None,
+    ) -> None:
+        self.workers = workers or settings.password_hash_workers or min(4, os.cpu_count() or 1)
+        self.max_pending = max_pending or settings.password_hash_max_pending
+        # Load the backend before deriving a configured handler: passlib
+        # swaps it in lazily, and handlers derived before that keep a stub
+        # that fails once another handler has loaded the backend.
+        argon2.get_backend()
+        self.handler = argon2.using(
+            time_cost=time_cost or settings.password_hash_time_cost,
+            memory_cost=memory_cost or settings.password_hash_memory_cost,
+            parallelism=parallelism or settings.password_hash_parallelism,
+        )
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self.pending = 0
+        self.completed = 0
+        self.total_queue_ms = 0.0
+        self.max_queue_ms = 0.0
+        self.total_run_ms = 0.0
+
+    def _pool(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.workers, thread_name_prefix="password-hasher"
+            )
+        return self._executor
+
+    async def _run(self, func: Callable[..., T], *args: Any) -> T:
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_pending)
+        queued_at = time.perf_counter()
+        self.pending += 1
+        try:
+            async with self._slots:
+                timings: Dict[str, float] = {}
+
+                def job() -> T:
+                    started = time.perf_counter()
+                    timings["queue_ms"] = (started - queued_at) * 1000.0
+                    try:
+                        return func(*args)
+                    finally:
+                        timings["run_ms"] = (time.perf_counter() - started) * 1000.0
+
+                loop = asyncio.get_running_loop()
+                try:
+                    return await loop.run_in_executor(self._pool(), job)
+                finally:
+                    self._record(timings)
+        finally:
+            self.pending -= 1
+
+    def _record(self, timings: Dict[str, float]) -> None:
+        if "queue_ms" not in timings:
+            return
+        self.completed += 1
+        self.total_queue_ms += timings["queue_ms"]
+        self.max_queue_ms = max(self.max_queue_ms, timings["queue_ms"])
+        self.total_run_ms += timings.get("run_ms", 0.0)
+
+    async def hash(self, password: str) -> str:
+        """Hash a password with the configured argon2 parameters."""
+        return await self._run(self.handler.hash, password)
+
+    async def verify(self, password: str, password_hash: str) -> bool:
+        """Check a password; malformed or foreign hashes never verify."""
+        try:
+            return await self._run(self.handler.verify, password, password_hash)
+        except (ValueError, TypeError):
+            return False
+
+    def needs_rehash(self, password_hash: str) -> bool:
+        """True when a hash was made with different cost parameters."""
+        try:
+            return self.handler.needs_update(password_hash)
+        except (ValueError, TypeError):
+            return False
+
+    def stats(self) -> Dict[str, Any]:
+        """Return pool size, backlog and average/max queue wait."""
+        completed = self.completed or 1
+        return {
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "pending": self.pending,
+            "completed": self.completed,
+            "avg_queue_ms": round(self.total_queue_ms / completed, 3),
+            "max_queue_ms": round(self.max_queue_ms, 3),
+            "avg_run_ms": round(self.total_run_ms / completed, 3),
+        }
+
+    def shutdown(self) -> None:
+        """Stop the worker threads."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+password_hasher = PasswordHasher()
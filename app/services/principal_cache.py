@@ -0,0 +1,127 @@
+"""Cached bearer-token verification and principal lookup.
+
+Verified token payloads are kept in a process-local LRU, so a hot token skips
+HMAC verification. The user it names is cached as a `Principal` through the
+shared RedisCache (in-process L1 in front of Redis), so most authenticated
+requests never open a database session. Principals are tagged `user:<id>`
+and dropped on every worker when the account is locked or its password
+changes.
+"""
+
+import logging
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from sqlalchemy import select
+
+import app.services.cache as cache_module
+from app.core.settings import settings
+from app.db.session import AsyncSessionLocal
+from app.models.user import User
+from app.services.jwt_service import decode_token
+from app.services.memory_cache import MemoryLRU
+
+LOG = logging.getLogger(__name__)
+
+# Rough per-entry cost charged to the token LRU on top of the token itself.
+TOKEN_ENTRY_OVERHEAD = 256
+
+
+@dataclass(frozen=True)
+class Principal:
+    """The authenticated user as seen by request handlers (no credentials)."""
+
+    id: int
+    username: str
+    email: str
+    phone_number: Optional[str] = None
+    locked_until: Optional[datetime] = None
+
+    @classmethod
+    def from_user(cls, user: User) -> "Principal":
+        return cls(user.id, user.username, user.email, user.phone_number, user.locked_until)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Principal":
+        locked_until = data.get("locked_until")
+        if isinstance(locked_until, str):
+            data = {**data, "locked_until": datetime.fromisoformat(locked_until)}
+        return cls(**data)
+
+    def is_locked(self, now: Optional[datetime] = None) -> bool:
+        return self.locked_until is not None and self.locked_until > (now or datetime.utcnow())
+
+
+_verified_tokens = MemoryLRU(
+    max_bytes=settings.auth_token_cache_size * 1024,
+    max_entries=settings.auth_token_cache_size,
+    ttl=settings.auth_token_cache_ttl,
+)
+
+
+def verify_token(token: str) -> Optional[Dict[str, Any]]:
+    """Return the payload of a valid token, verifying each token only once."""
+    payload = _verified_tokens.get(token)
+    if payload is not None:
+        if payload.get("exp", 0) > time.time():
+            return payload
+        _verified_tokens.delete(token)
+        return None
+    payload = decode_token(token)
+    if payload is not None:
+        _verified_tokens.set(token, payload, len(token) + TOKEN_ENTRY_OVERHEAD)
+    return payload
+
+
+def forget_token(token: str) -> None:
+    """Drop a token from the verification cache."""
+    _verified_tokens.delete(token)
+
+
+def _principal_key(subject: str) -> str:
+    return cache_module.cache.get_key("principal", subject)
+
+
+async def _load_principal(subject: str) -> Optional[Principal]:
+    # Login issues tokens for the email; older tokens carry the numeric id.
+    column = User.id if subject.isdigit() else User.email
+    value = int(subject) if subject.isdigit() else subject
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(select(User).where(column == value))
+        user = result.scalar_one_or_none()
+    return Principal.from_user(user) if user is not None else None
+
+
+async def get_principal(subject: str) -> Optional[Principal]:
+    """Resolve a token subject to a Principal, from cache when possible."""
+    key = _principal_key(subject)
+    try:
+        cached = await cache_module.cache.get(key)
+    except Exception as e:
+        LOG.warning("Principal cache read failed: %s", e)
+        cached = None
+    if cached is not None:
+        return Principal.from_dict(cached)
+
+    principal = await _load_principal(subject)
+    if principal is not None:
+        try:
+            await cache_module.cache.set(
+                key,
+                asdict(principal),
+                expire=settings.auth_principal_ttl,
+                tags=[f"user:{principal.id}"],
+            )
+        except Exception as e:
+            LOG.warning("Principal cache write failed: %s", e)
+    return principal
+
+
+async def invalidate_principal(user_id: int) -> None:
+    """Forget the cached principal of a user on every worker."""
+    try:
+        await cache_module.cache.invalidate_tags(f"user:{user_id}")
+    except Exception as e:
+        LOG.error("Principal cache invalidation for user %s failed: %s", user_id, e)
@@ -0,0 +1,129 @@
+"""Hour-bucketed caching for timeframe alert queries.
+
+A "last N hours" window slides with every request, so caching whole results
+by their exact bounds almost never hits. Instead the window is split on UTC
+hour boundaries: every closed hour inside it is cached as its own entry and
+shared by all windows that cover it, while the partial edges and the still
+open current hour are read live. Closed hours only change when a late alert
+lands in them, which invalidates their hour tag.
+"""
+
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import app.services.cache as cache_module
+from app.core.settings import REDIS_CONFIG
+from app.models.alert_rollup import bucket_hour
+from app.services.alert_query import AlertQueryService, _split_on_hours
+from app.services.cache_codec import to_cacheable
+from app.services.cache_invalidation import hour_tags
+
+LOG = logging.getLogger(__name__)
+
+
+def _hour_key(hour: datetime, alert_type: Optional[str], device_id: Optional[str]) -> str:
+    return cache_module.cache.get_key("timeframe", "hour", hour.isoformat(), str(alert_type), str(device_id))
+
+
+def _contiguous_runs(hours: List[datetime]) -> List[Tuple[datetime, datetime]]:
+    """Group sorted hours into [first, last + 1h) runs of consecutive hours."""
+    runs: List[Tuple[datetime, datetime]] = []
+    for hour in hours:
+        if runs and runs[-1][1] == hour:
+            runs[-1] = (runs[-1][0], hour + timedelta(hours=1))
+        else:
+            runs.append((hour, hour + timedelta(hours=1)))
+    return runs
+
+
+async def _sealed_hours(
+    first_hour: datetime,
+    last_hour: datetime,
+    alert_type: Optional[str],
+    device_id: Optional[str],
+) -> List[Any]:
+    """Alerts in the closed hours [first_hour, last_hour), served from cache.
+
+    Missing hours are loaded with one query per run of consecutive misses,
+    split by hour and written back, including empty hours.
+    """
+    hours = []
+    hour = first_hour
+    while hour < last_hour:
+        hours.append(hour)
+        hour += timedelta(hours=1)
+    keys = [_hour_key(hour, alert_type, device_id) for hour in hours]
+    buckets = await cache_module.cache.get_many(keys)
+
+    missing = [hour for hour, bucket in zip(hours, buckets) if bucket is None]
+    if missing:
+        loaded: Dict[datetime, List[Any]] = {hour: [] for hour in missing}
+        for run_start, run_end in _contiguous_runs(missing):
+            alerts = await AlertQueryService.get_alerts_by_timeframe(
+                run_start, run_end, alert_type, device_id, upper_inclusive=False
+            )
+            for alert in alerts:
+                # bucket_hour normalises aware timestamps to naive UTC first.
+                bucket = loaded.get(bucket_hour(alert.timestamp))
+                if bucket is None:
+                    # e.g. a database session returning local rather than UTC times
+                    LOG.warning(
+                        "Alert %s at %s is outside the requested hours %s to %s; not cached",
+                        alert.id, alert.timestamp, run_start, run_end,
+                    )
+                    continue
+                bucket.append(to_cacheable(alert))
+        await cache_module.cache.set_many(
+            [
+                (_hour_key(hour, alert_type, device_id), alerts, hour_tags(hour, device_id, alert_type))
+                for hour, alerts in loaded.items()
+            ],
+            expire=REDIS_CONFIG["SEALED_BUCKET_TIMEOUT"],
+        )
+        buckets = [bucket if bucket is not None else loaded[hour] for hour, bucket in zip(hours, buckets)]
+
+    return [alert for bucket in buckets for alert in bucket]
+
+
+async def _live(
+    lower: datetime,
+    upper: datetime,
+    upper_inclusive: bool,
+    alert_type: Optional[str],
+    device_id: Optional[str],
+) -> List[Any]:
+    alerts = await AlertQueryService.get_alerts_by_timeframe(
+        lower, upper, alert_type, device_id, upper_inclusive=upper_inclusive
+    )
+    return [to_cacheable(alert) for alert in alerts]
+
+
+async def get_alerts_by_timeframe(
+    start_time: datetime,
+    end_time: datetime,
+    alert_type: Optional[str] = None,
+    device_id: Optional[str] = None,
+) -> List[Any]:
+    """Alerts in [start_time, end_time], stitched from cached hour buckets."""
+    if end_time < start_time:
+        raise ValueError("end_time must be greater than or equal to start_time")
+
+    edges, hours = _split_on_hours(start_time, end_time)
+    if hours is None:
+        return await _live(start_time, end_time, True, alert_type, device_id)
+
+    first_hour, last_hour = hours
+    # The current hour is still filling up, so it is never cached.
+    sealed_until = min(last_hour, bucket_hour(datetime.utcnow()))
+    if sealed_until <= first_hour:
+        return await _live(start_time, end_time, True, alert_type, device_id)
+
+    results: List[Any] = []
+    if len(edges) == 2:
+        lower, upper, upper_inclusive = edges[0]
+        results += await _live(lower, upper, upper_inclusive, alert_type, device_id)
+    results += await _sealed_hours(first_hour, sealed_until, alert_type, device_id)
+    head = sealed_until.replace(tzinfo=timezone.utc) if start_time.tzinfo is not None else sealed_until
+    results += await _live(head, end_time, True, alert_type, device_id)
+    return results
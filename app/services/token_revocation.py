@@ -0,0 +1,165 @@
+"""Access token revocation backed by Redis with a per-worker Bloom filter.
+
+A revoked `jti` is stored in Redis until the token would have expired anyway
+and announced on a pub/sub channel. Every worker mirrors the revoked ids in a
+Bloom filter, so checking a token that was never revoked (almost every
+request) is a few hash computations; Redis is only asked on a filter hit.
+Until the filter has been loaded from Redis once, every check goes to Redis,
+so a worker that starts while Redis is unreachable never accepts a revoked
+token.
+"""
+
+import asyncio
+import hashlib
+import logging
+import math
+import time
+from typing import Iterable, Optional
+
+from app.core.settings import settings
+from app.services.redis_client import get_redis
+
+LOG = logging.getLogger(__name__)
+
+# Delay before re-subscribing after the Redis connection drops.
+RESUBSCRIBE_DELAY_SECONDS = 1.0
+
+# How long start() waits for the initial sync before leaving it to the listener.
+INITIAL_SYNC_TIMEOUT_SECONDS = 5.0
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings using double hashing."""
+
+    def __init__(self, capacity: int, error_rate: float) -> None:
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: str) -> Iterable[int]:
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "big")
+        second = int.from_bytes(digest[8:], "big") | 1
+        return ((first + i * second) % self.size for i in range(self.hash_count))
+
+    def add(self, item: str) -> None:
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item: str) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class TokenRevocationList:
+    """Revoked token ids: Redis is the source of truth, the filter a fast front."""
+
+    def __init__(self, redis_client=None, *, prefix: Optional[str] = None) -> None:
+        self._redis = redis_client
+        self.prefix = prefix or f"{settings.cache_prefix}:revoked"
+        self.channel = settings.revocation_channel
+        self.rebuild_interval = settings.revocation_bloom_rebuild_seconds
+        self.filter = self._new_filter()
+        # False until the first successful rebuild; the filter is incomplete.
+        self.synced = False
+        self._listener: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def _new_filter() -> BloomFilter:
+        return BloomFilter(settings.revocation_bloom_capacity, settings.revocation_bloom_error_rate)
+
+    async def _client(self):
+        return self._redis if self._redis is not None else await get_redis()
+
+    def _key(self, jti: str) -> str:
+        return f"{self.prefix}:{jti}"
+
+    async def revoke(self, jti: str, expires_at: float) -> None:
+        """Revoke a token id until its expiry (a unix timestamp)."""
+        ttl = int(math.ceil(expires_at - time.time()))
+        if ttl <= 0:
+            return
+        redis = await self._client()
+        await redis.set(self._key(jti), "1", ex=ttl)
+        self.filter.add(jti)
+        await redis.publish(self.channel, jti)
+
+    async def is_revoked(self, jti: Optional[str]) -> bool:
+        if not jti or (self.synced and jti not in self.filter):
+            return False
+        try:
+            redis = await self._client()
+            return bool(await redis.exists(self._key(jti)))
+        except Exception as e:
+            # A token we cannot confirm is unrevoked is treated as revoked.
+            LOG.error("Revocation lookup failed: %s", e)
+            return True
+
+    async def rebuild(self) -> None:
+        """Rebuild the filter from Redis, shedding ids whose tokens expired."""
+        redis = await self._client()
+        rebuilt = self._new_filter()
+        offset = len(self.prefix) + 1
+        async for key in redis.scan_iter(match=f"{self.prefix}:*", count=1000):
+            if isinstance(key, bytes):
+                key = key.decode("utf-8")
+            rebuilt.add(key[offset:])
+        self.filter = rebuilt
+        self.synced = True
+
+    async def start(self) -> None:
+        """Sync the filter and follow revocations made by other workers.
+
+        Tries one rebuild before returning, so the worker normally serves
+        requests from a complete filter; if that fails, checks go to Redis
+        until the listener's rebuild succeeds.
+        """
+        if self._listener is not None and not self._listener.done():
+            return
+        try:
+            await asyncio.wait_for(self.rebuild(), INITIAL_SYNC_TIMEOUT_SECONDS)
+        except Exception as e:
+            LOG.error("Initial revocation list sync failed: %r", e)
+        self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+    async def _listen(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            pubsub = None
+            try:
+                redis = await self._client()
+                pubsub = redis.pubsub(ignore_subscribe_messages=True)
+                await pubsub.subscribe(self.channel)
+                # Subscribe before rebuilding so nothing revoked meanwhile is missed.
+                await self.rebuild()
+                next_rebuild = loop.time() + self.rebuild_interval
+                while True:
+                    message = await pubsub.get_message(timeout=1.0)
+                    if message is not None and message.get("type") == "message":
+                        data = message["data"]
+                        self.filter.add(data.decode("utf-8") if isinstance(data, bytes) else data)
+                    if loop.time() >= next_rebuild:
+                        await self.rebuild()
+                        next_rebuild = loop.time() + self.rebuild_interval
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                LOG.error("Revocation subscription failed: %s", e)
+                await asyncio.sleep(RESUBSCRIBE_DELAY_SECONDS)
+            finally:
+                if pubsub is not None:
+                    try:
+                        await pubsub.aclose()
+                    except Exception:
+                        pass
+
+
+revocation_list = TokenRevocationList()
@@ -1,54 +1,179 @@
 """WebSocket connection manager and handler functions."""
 
+import asyncio
 import json
+import logging
 from datetime import datetime
-from typing import List
+from typing import Any, Dict, Optional
 from fastapi import WebSocket
 
+from app.core.settings import settings
+from app.services.broadcast import BroadcastBackend, create_broadcast_backend
+
+LOG = logging.getLogger(__name__)
+
+SLOW_CONSUMER_POLICIES = ("disconnect", "drop_oldest")
+
+# Close code sent to clients that fall too far behind ("try again later").
+SLOW_CONSUMER_CLOSE_CODE = 1013
+
+
+class ClientChannel:
+    """Bounded outbound queue and writer task for a single connection."""
+
+    def __init__(self, websocket: WebSocket, max_queue_size: int):
+        self.websocket = websocket
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue_size)
+        self.writer: Optional[asyncio.Task] = None
+        self.dropped = 0
+
 
 class ConnectionManager:
-    """Manages active WebSocket connections for broadcasting."""
-    def __init__(self):
-        self.active_connections: List[WebSocket] = []
+    """Manages active WebSocket connections for broadcasting.
+
+    Every connection owns a bounded queue drained by its own writer task, so
+    a broadcast only enqueues and never waits on a slow client. Clients whose
+    queue passes the high-water mark are disconnected or have their oldest
+    pending messages discarded, depending on the slow consumer policy.
+
+    Broadcasts go through a backend that publishes each message once and
+    hands it to the local fan-out of every worker.
+    """
+    def __init__(
+        self,
+        *,
+        max_queue_size: Optional[int] = None,
+        high_water: Optional[int] = None,
+        slow_consumer_policy: Optional[str] = None,
+        backend: Optional[BroadcastBackend] = None,
+    ):
+        self.max_queue_size = max_queue_size or settings.ws_client_queue_size
+        self.high_water = min(high_water or settings.ws_client_high_water, self.max_queue_size)
+        self.slow_consumer_policy = slow_consumer_policy or settings.ws_slow_consumer_policy
+        if self.slow_consumer_policy not in SLOW_CONSUMER_POLICIES:
+            raise ValueError(
+                f"Unknown slow consumer policy {self.slow_consumer_policy!r}; "
+                f"expected one of {', '.join(SLOW_CONSUMER_POLICIES)}"
+            )
+        self.active_connections: Dict[WebSocket, ClientChannel] = {}
+        self.messages_dropped = 0
+        self.slow_consumers_disconnected = 0
+        self.backend = backend or create_broadcast_backend()
+        self.backend.attach(self._fan_out)
+
+    async def start(self):
+        """Start receiving broadcasts published by other workers."""
+        await self.backend.start()
+
+    async def stop(self):
+        """Stop receiving broadcasts published by other workers."""
+        await self.backend.stop()
 
     async def connect(self, websocket: WebSocket):
         """Add a new WebSocket connection."""
         await websocket.accept()
-        self.active_connections.append(websocket)
-        print(f"WebSocket connected. Total: {len(self.active_connections)}")
+        channel = ClientChannel(websocket, self.max_queue_size)
+        self.active_connections[websocket] = channel
+        channel.writer = asyncio.create_task(self._write(channel))
+        LOG.debug("WebSocket connected; %d open", len(self.active_connections))
 
     def disconnect(self, websocket: WebSocket):
         """Remove a WebSocket connection."""
-        if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
-        print(f"WebSocket disconnected. Total: {len(self.active_connections)}")
+        channel = self.active_connections.pop(websocket, None)
+        if channel is not None and channel.writer is not None:
+            if channel.writer is not asyncio.current_task():
+                channel.writer.cancel()
+        LOG.debug("WebSocket disconnected; %d open", len(self.active_connections))
 
     async def broadcast(self, message: str):
-        """Send a JSON string message to all connected clients."""
-        disconnected_connections = []
-        for connection in self.active_connections:
+        """Publish a JSON string message to the clients of every worker."""
+        await self.backend.publish(message)
+
+    async def _fan_out(self, message: str):
+        """Queue a message for every client connected to this worker."""
+        for channel in list(self.active_connections.values()):
+            self._offer(channel, message)
+
+    def _offer(self, channel: ClientChannel, message: str) -> None:
+        """Enqueue a message for one client without ever waiting on it."""
+        if channel.queue.qsize() >= self.high_water:
+            if self.slow_consumer_policy == "disconnect":
+                self._drop_slow_consumer(channel)
+                return
             try:
-                await connection.send_text(message)
+                channel.queue.get_nowait()
+                channel.dropped += 1
+                self.messages_dropped += 1
+            except asyncio.QueueEmpty:
+                pass
+        try:
+            channel.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            channel.dropped += 1
+            self.messages_dropped += 1
+
+    def _drop_slow_consumer(self, channel: ClientChannel) -> None:
+        websocket = channel.websocket
+        if websocket not in self.active_connections:
+            return
+        self.slow_consumers_disconnected += 1
+        self.messages_dropped += channel.queue.qsize()
+        LOG.warning("Disconnecting slow WebSocket consumer")
+        self.disconnect(websocket)
+        asyncio.create_task(self._close_quietly(websocket))
+
+    @staticmethod
+    async def _close_quietly(websocket: WebSocket) -> None:
+        try:
+            await websocket.close(code=SLOW_CONSUMER_CLOSE_CODE)
+        except Exception:
+            pass
+
+    async def _write(self, channel: ClientChannel) -> None:
+        """Writer task: drain one client's queue onto its socket."""
+        while True:
+            message = await channel.queue.get()
+            try:
+                await channel.websocket.send_text(message)
             except Exception as e:
-                print(f"Error broadcasting to WebSocket: {e}")
-                disconnected_connections.append(connection)
-        
-        for connection in disconnected_connections:
-            self.disconnect(connection)
+                LOG.warning("Error sending to WebSocket: %s", e)
+                self.disconnect(channel.websocket)
+                return
+
+    async def _send(self, websocket: WebSocket, message: str) -> None:
+        channel = self.active_connections.get(websocket)
+        if channel is not None:
+            self._offer(channel, message)
+        else:
+            await websocket.send_text(message)
 
     async def send_connection_message(self, websocket: WebSocket):
         """Send initial connection confirmation message."""
-        await websocket.send_text(json.dumps({
+        await self._send(websocket, json.dumps({
             "type": "system",
             "message": "Connected to OBEX Alert System"
         }))
 
     async def send_pong(self, websocket: WebSocket):
         """Send pong response to keep-alive message."""
-        await websocket.send_text(json.dumps({
+        await self._send(websocket, json.dumps({
             "type": "pong",
             "message": "Connection active",
             "timestamp": datetime.utcnow().isoformat()
         }))
 
-manager = ConnectionManager()
\ No newline at end of file
+    def stats(self) -> Dict[str, Any]:
+        """Return outbound queue depths and slow consumer counters."""
+        depths = [channel.queue.qsize() for channel in self.active_connections.values()]
+        return {
+            "active_connections": len(depths),
+            "queued_messages": sum(depths),
+            "max_queue_depth": max(depths, default=0),
+            "queue_capacity": self.max_queue_size,
+            "high_water": self.high_water,
+            "slow_consumer_policy": self.slow_consumer_policy,
+            "messages_dropped": self.messages_dropped,
+            "slow_consumers_disconnected": self.slow_consumers_disconnected,
+        }
+
+manager = ConnectionManager()
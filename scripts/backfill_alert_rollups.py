@@ -0,0 +1,21 @@
+"""Rebuild the alert_rollups table from existing alerts.
+
+The migration that creates the table fills it; run this only to rebuild
+rollups that have drifted from the raw alerts.
+
+Usage:
+    python scripts/backfill_alert_rollups.py
+"""
+import asyncio
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from app.services.alert_rollup_service import backfill_alert_rollups
+
+
+async def main():
+    written = await backfill_alert_rollups()
+    print(f"Rebuilt alert_rollups: {written} rows written.")
+
+asyncio.run(main())
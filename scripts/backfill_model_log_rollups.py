@@ -0,0 +1,21 @@
+"""Rebuild the model_log_rollups table from existing model logs.
+
+The migration that creates the table fills it; run this only to rebuild
+rollups that have drifted from the raw logs.
+
+Usage:
+    python scripts/backfill_model_log_rollups.py
+"""
+import asyncio
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from app.services.model_log_service import ModelLogService
+
+
+async def main():
+    written = await ModelLogService.backfill_rollups()
+    print(f"Rebuilt model_log_rollups: {written} rows written.")
+
+asyncio.run(main())
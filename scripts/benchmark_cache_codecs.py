@@ -0,0 +1,87 @@
+"""Compare cache codecs against plain json on alert-shaped payloads.
+
+Builds a list of alerts as the analytics endpoints cache them and reports
+encode time, decode time and stored bytes for every installed serializer and
+compression combination.
+
+Usage:
+    python scripts/benchmark_cache_codecs.py [--alerts 1000] [--repeat 20]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from app.services.cache_codec import CacheCodec, _available_compressors, _available_serializers
+
+ALERT_TYPES = (
+    "weapon_detection",
+    "unauthorized_passenger",
+    "aggression_detection",
+    "driver_fatigue",
+)
+
+
+def sample_alerts(count: int) -> list:
+    now = datetime.utcnow()
+    return [
+        {
+            "id": str(uuid.uuid4()),
+            "device_id": f"device-{random.randrange(50)}",
+            "timestamp": (now - timedelta(seconds=random.randrange(86400))).isoformat(),
+            "alert_type": random.choice(ALERT_TYPES),
+            "location_lat": 6.4 + random.random() * 0.4,
+            "location_lon": 3.2 + random.random() * 0.4,
+            "payload": {
+                "confidence": round(random.random(), 3),
+                "camera": random.choice(["front", "rear", "cabin"]),
+                "bbox": [random.randrange(640) for _ in range(4)],
+            },
+        }
+        for _ in range(count)
+    ]
+
+
+def best_of(repeat: int, func) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000.0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--alerts", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--compress-min-bytes", type=int, default=4096)
+    args = parser.parse_args()
+
+    value = sample_alerts(args.alerts)
+
+    baseline = json.dumps(value)
+    encode_ms = best_of(args.repeat, lambda: json.dumps(value))
+    decode_ms = best_of(args.repeat, lambda: json.loads(baseline))
+    print(f"{'codec':20s} {'encode ms':>10s} {'decode ms':>10s} {'bytes':>10s}")
+    print(f"{'plain json.dumps':20s} {encode_ms:10.2f} {decode_ms:10.2f} {len(baseline):10d}")
+
+    for serializer in _available_serializers():
+        for compression in _available_compressors():
+            codec = CacheCodec(serializer, compression, args.compress_min_bytes)
+            raw = codec.encode(value)
+            assert codec.decode(raw) == value
+            encode_ms = best_of(args.repeat, lambda: codec.encode(value))
+            decode_ms = best_of(args.repeat, lambda: codec.decode(raw))
+            label = f"{serializer}+{compression}"
+            print(f"{label:20s} {encode_ms:10.2f} {decode_ms:10.2f} {len(raw):10d}")
+
+
+if __name__ == "__main__":
+    main()
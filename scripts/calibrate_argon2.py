@@ -0,0 +1,67 @@
+"""Pick argon2 cost parameters for a target hashing latency on this machine.
+
+Keeps the memory cost and parallelism fixed and raises the time cost until
+the median hash time reaches the target, then prints the settings to use.
+Run it on the hardware (and under the CPU limits) the API is deployed with.
+
+Usage:
+    python scripts/calibrate_argon2.py [--target-ms 250] [--memory-cost 65536] [--parallelism 4]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from passlib.hash import argon2
+
+MAX_TIME_COST = 20
+
+
+def median_ms(handler, samples: int) -> float:
+    timings = []
+    for _ in range(samples):
+        started = time.perf_counter()
+        handler.hash("calibration-password")
+        timings.append((time.perf_counter() - started) * 1000.0)
+    return statistics.median(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--target-ms", type=float, default=250.0)
+    parser.add_argument("--memory-cost", type=int, default=65536, help="KiB")
+    parser.add_argument("--parallelism", type=int, default=4)
+    parser.add_argument("--samples", type=int, default=5)
+    args = parser.parse_args()
+
+    chosen = None
+    for time_cost in range(1, MAX_TIME_COST + 1):
+        handler = argon2.using(
+            time_cost=time_cost,
+            memory_cost=args.memory_cost,
+            parallelism=args.parallelism,
+        )
+        elapsed = median_ms(handler, args.samples)
+        print(f"time_cost={time_cost:2d} memory_cost={args.memory_cost} "
+              f"parallelism={args.parallelism}: {elapsed:8.1f} ms")
+        chosen = (time_cost, elapsed)
+        if elapsed >= args.target_ms:
+            break
+
+    if chosen is None:
+        return
+    time_cost, elapsed = chosen
+    if elapsed < args.target_ms:
+        print(f"\nTarget not reached at time_cost={MAX_TIME_COST}; raise --memory-cost instead.")
+    print(f"\n# {elapsed:.1f} ms per hash (target {args.target_ms:.0f} ms)")
+    print(f"PASSWORD_HASH_TIME_COST={time_cost}")
+    print(f"PASSWORD_HASH_MEMORY_COST={args.memory_cost}")
+    print(f"PASSWORD_HASH_PARALLELISM={args.parallelism}")
+    print("# Existing hashes are upgraded on the next successful login.")
+
+
+if __name__ == "__main__":
+    main()
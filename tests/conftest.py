@@ -3,11 +3,13 @@
 import asyncio
 import os
 import sys
-from typing import Any, AsyncGenerator, Callable, Dict, Generator, Optional
+import time
+from typing import Any, AsyncGenerator, Callable, Dict, Generator, Iterable, Optional
 
 import pytest
 import pytest_asyncio
 from fastapi.testclient import TestClient
+from redis.exceptions import ResponseError
 from sqlalchemy.exc import OperationalError
 
 ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
@@ -45,7 +47,10 @@ AsyncSessionLocal = db_session_module.AsyncSessionLocal
 from app import models as _models  # noqa: F401
 from app.main import app
 import app.services.cache as cache_module
+from app.services.cache_codec import to_cacheable
+from app.services.mail_queue import mail_queue
 from app.services.mqtt_client import mqtt_service
+from app.services.token_revocation import revocation_list
 from app.services.websocket import manager
 
 
@@ -55,6 +60,7 @@ class InMemoryAsyncCache:
 	def __init__(self, prefix: str = "test") -> None:
 		self._prefix = prefix
 		self._store: Dict[str, Any] = {}
+		self._tags: Dict[str, set] = {}
 
 	def get_key(self, *parts: Any) -> str:
 		return ":".join([self._prefix, *[str(part) for part in parts if part is not None]])
@@ -62,12 +68,36 @@ class InMemoryAsyncCache:
 	async def get(self, key: str) -> Optional[Any]:
 		return self._store.get(key)
 
-	async def set(self, key: str, value: Any, *, expire: Optional[int] = None) -> None:  # noqa: ARG002
-		self._store[key] = value
+	async def set(
+		self,
+		key: str,
+		value: Any,
+		*,
+		expire: Optional[int] = None,  # noqa: ARG002
+		tags: Optional[Iterable[str]] = None,
+	) -> None:
+		# Normalise like RedisCache so ORM results are exercised in tests.
+		self._store[key] = to_cacheable(value)
+		for tag in tags or ():
+			self._tags.setdefault(tag, set()).add(key)
+
+	async def get_many(self, keys: Iterable[str]) -> list:
+		return [self._store.get(key) for key in keys]
+
+	async def set_many(self, entries: Iterable[Any], *, expire: Optional[int] = None) -> None:
+		for key, value, tags in entries:
+			await self.set(key, value, expire=expire, tags=tags)
 
 	async def delete(self, key: str) -> None:
 		self._store.pop(key, None)
 
+	async def invalidate_tags(self, *tags: str) -> int:
+		removed = 0
+		for tag in tags:
+			for key in self._tags.pop(tag, set()):
+				removed += self._store.pop(key, None) is not None
+		return removed
+
 	async def invalidate_pattern(self, pattern: str) -> None:
 		from fnmatch import fnmatch
 
@@ -84,6 +114,8 @@ class InMemoryAsyncCache:
 		getter: Callable[[], Any],
 		*,
 		expire: Optional[int] = None,  # noqa: ARG002
+		soft_ttl: Optional[int] = None,  # noqa: ARG002
+		tags: Optional[Iterable[str]] = None,
 	) -> Any:
 		cached = await self.get(key)
 		if cached is not None:
@@ -93,13 +125,256 @@ class InMemoryAsyncCache:
 		if asyncio.iscoroutine(value):
 			value = await value
 
-		await self.set(key, value)
-		return value
+		await self.set(key, value, tags=tags)
+		return self._store[key]
+
+	async def start(self) -> None:
+		return None
+
+	async def stop(self) -> None:
+		return None
 
 	async def close(self) -> None:  # pragma: no cover - compatibility helper
 		self._store.clear()
 
 
+class FakeRedis:
+	"""Just enough of the redis.asyncio client to exercise RedisCache."""
+
+	def __init__(self) -> None:
+		self.store: Dict[str, Any] = {}
+		self.calls: Dict[str, int] = {}
+		self.published: list = []
+		self.subscribers: Dict[str, list] = {}
+		self.streams: Dict[str, dict] = {}
+
+	def _count(self, name: str) -> None:
+		self.calls[name] = self.calls.get(name, 0) + 1
+
+	async def get(self, key: str) -> Optional[Any]:
+		self._count("get")
+		return self.store.get(key)
+
+	async def mget(self, keys: Iterable[str]) -> list:
+		self._count("mget")
+		return [self.store.get(key) for key in keys]
+
+	async def set(self, key: str, value: Any, ex: Optional[int] = None, nx: bool = False) -> Optional[bool]:  # noqa: ARG002
+		self._count("set")
+		if nx and key in self.store:
+			return None
+		self.store[key] = value
+		return True
+
+	async def exists(self, *keys: str) -> int:
+		self._count("exists")
+		return sum(1 for key in keys if key in self.store)
+
+	async def delete(self, *keys: str) -> int:
+		self._count("delete")
+		return sum(1 for key in keys if self.store.pop(key, None) is not None)
+
+	async def eval(self, script: str, numkeys: int, *args: Any) -> int:  # noqa: ARG002
+		key, token = args[0], args[1]
+		if self.store.get(key) == token:
+			del self.store[key]
+			return 1
+		return 0
+
+	async def expire(self, key: str, seconds: int) -> bool:  # noqa: ARG002
+		return key in self.store
+
+	async def sadd(self, key: str, *members: str) -> int:
+		self._count("sadd")
+		current = self.store.setdefault(key, set())
+		before = len(current)
+		current.update(members)
+		return len(current) - before
+
+	async def sscan(self, key: str, cursor: int = 0, count: Optional[int] = None) -> tuple:  # noqa: ARG002
+		self._count("sscan")
+		return 0, list(self.store.get(key, ()))
+
+	async def scan_iter(self, match: str = "*", count: Optional[int] = None):  # noqa: ARG002
+		from fnmatch import fnmatch
+
+		self._count("scan")
+		for key in list(self.store):
+			if fnmatch(key, match):
+				yield key
+
+	async def keys(self, pattern: str) -> list:
+		from fnmatch import fnmatch
+
+		self._count("keys")
+		return [key for key in self.store if fnmatch(key, pattern)]
+
+	def pipeline(self, transaction: bool = True) -> "FakePipeline":  # noqa: ARG002
+		return FakePipeline(self)
+
+	async def flushdb(self) -> None:
+		self.store.clear()
+
+	async def publish(self, channel: str, message: str) -> int:
+		self.published.append((channel, message))
+		subscribers = self.subscribers.get(channel, [])
+		for subscriber in subscribers:
+			subscriber.put_nowait({"type": "message", "channel": channel, "data": message})
+		return len(subscribers)
+
+	def pubsub(self, ignore_subscribe_messages: bool = False) -> "FakePubSub":  # noqa: ARG002
+		return FakePubSub(self)
+
+	async def xadd(self, name: str, fields: Dict[str, str]) -> str:
+		self._count("xadd")
+		stream = self.streams.setdefault(name, {"seq": 0, "entries": {}, "groups": {}})
+		stream["seq"] += 1
+		entry_id = f"{stream['seq']}-0"
+		stream["entries"][entry_id] = dict(fields)
+		return entry_id
+
+	async def xlen(self, name: str) -> int:
+		return len(self.streams.get(name, {}).get("entries", {}))
+
+	async def xdel(self, name: str, *ids: str) -> int:
+		entries = self.streams.get(name, {}).get("entries", {})
+		return sum(1 for entry_id in ids if entries.pop(entry_id, None) is not None)
+
+	async def xgroup_create(self, name: str, groupname: str, id: str = "$", mkstream: bool = False) -> bool:
+		if name not in self.streams:
+			if not mkstream:
+				raise ResponseError("ERR The XGROUP subcommand requires the key to exist")
+			self.streams[name] = {"seq": 0, "entries": {}, "groups": {}}
+		stream = self.streams[name]
+		if groupname in stream["groups"]:
+			raise ResponseError("BUSYGROUP Consumer Group name already exists")
+		stream["groups"][groupname] = {"last": 0 if id == "0" else stream["seq"], "pending": {}}
+		return True
+
+	def _group(self, name: str, groupname: str) -> dict:
+		group = self.streams.get(name, {}).get("groups", {}).get(groupname)
+		if group is None:
+			raise ResponseError("NOGROUP No such key or consumer group")
+		return group
+
+	async def xreadgroup(
+		self,
+		groupname: str,
+		consumername: str,
+		streams: Dict[str, str],
+		count: Optional[int] = None,
+		block: Optional[int] = None,
+	) -> list:
+		self._count("xreadgroup")
+		deadline = time.monotonic() + (block or 0) / 1000
+		while True:
+			response = []
+			for name in streams:
+				group = self._group(name, groupname)
+				fresh = [
+					(entry_id, fields)
+					for entry_id, fields in self.streams[name]["entries"].items()
+					if int(entry_id.split("-")[0]) > group["last"]
+				][:count]
+				for entry_id, _ in fresh:
+					group["pending"][entry_id] = [consumername, time.monotonic()]
+					group["last"] = int(entry_id.split("-")[0])
+				if fresh:
+					response.append([name, fresh])
+			if response or time.monotonic() >= deadline:
+				return response
+			await asyncio.sleep(0.005)
+
+	async def xautoclaim(
+		self,
+		name: str,
+		groupname: str,
+		consumername: str,
+		min_idle_time: int,
+		start_id: str = "0-0",  # noqa: ARG002
+		count: Optional[int] = None,
+	) -> list:
+		group = self._group(name, groupname)
+		entries = self.streams[name]["entries"]
+		claimed, deleted = [], []
+		now = time.monotonic()
+		for entry_id, pending in list(group["pending"].items()):
+			if count is not None and len(claimed) >= count:
+				break
+			if (now - pending[1]) * 1000 < min_idle_time:
+				continue
+			if entry_id not in entries:
+				del group["pending"][entry_id]
+				deleted.append(entry_id)
+				continue
+			group["pending"][entry_id] = [consumername, now]
+			claimed.append((entry_id, entries[entry_id]))
+		return ["0-0", claimed, deleted]
+
+	async def xack(self, name: str, groupname: str, *ids: str) -> int:
+		pending = self._group(name, groupname)["pending"]
+		return sum(1 for entry_id in ids if pending.pop(entry_id, None) is not None)
+
+	async def close(self) -> None:
+		return None
+
+
+class FakePubSub:
+	"""Delivers FakeRedis.publish calls to subscribed channels."""
+
+	def __init__(self, redis: FakeRedis) -> None:
+		self._redis = redis
+		self._messages: asyncio.Queue = asyncio.Queue()
+		self._channels: list = []
+
+	async def subscribe(self, *channels: str) -> None:
+		for channel in channels:
+			self._redis.subscribers.setdefault(channel, []).append(self._messages)
+			self._channels.append(channel)
+
+	async def get_message(self, timeout: float = 0.0) -> Optional[dict]:
+		try:
+			return await asyncio.wait_for(self._messages.get(), timeout)
+		except asyncio.TimeoutError:
+			return None
+
+	async def listen(self):
+		while True:
+			yield await self._messages.get()
+
+	async def aclose(self) -> None:
+		for channel in self._channels:
+			self._redis.subscribers[channel].remove(self._messages)
+		self._channels.clear()
+
+
+class FakePipeline:
+	"""Queues FakeRedis commands and runs them on execute()."""
+
+	def __init__(self, redis: FakeRedis) -> None:
+		self._redis = redis
+		self._commands: list = []
+
+	async def __aenter__(self) -> "FakePipeline":
+		return self
+
+	async def __aexit__(self, *exc_info: Any) -> None:
+		self._commands.clear()
+
+	def __getattr__(self, name: str) -> Callable[..., "FakePipeline"]:
+		def queue(*args: Any, **kwargs: Any) -> "FakePipeline":
+			self._commands.append((name, args, kwargs))
+			return self
+
+		return queue
+
+	async def execute(self) -> list:
+		self._redis._count("execute")
+		results = [await getattr(self._redis, name)(*args, **kwargs) for name, args, kwargs in self._commands]
+		self._commands.clear()
+		return results
+
+
 async def _recreate_schema() -> None:
 	async with engine.begin() as conn:
 		try:
@@ -139,6 +414,13 @@ def mock_cache(monkeypatch: pytest.MonkeyPatch) -> InMemoryAsyncCache:
 	return cache
 
 
+@pytest.fixture(autouse=True)
+def synced_revocation_list(monkeypatch: pytest.MonkeyPatch) -> None:
+	"""Back the global revocation list with FakeRedis, as after a first sync."""
+	monkeypatch.setattr(revocation_list, "_redis", FakeRedis())
+	monkeypatch.setattr(revocation_list, "synced", True)
+
+
 @pytest.fixture
 def api_client(monkeypatch: pytest.MonkeyPatch) -> Generator[TestClient, None, None]:
 	"""FastAPI test client with patched MQTT and WebSocket behaviours."""
@@ -146,9 +428,14 @@ def api_client(monkeypatch: pytest.MonkeyPatch) -> Generator[TestClient, None, N
 	async def noop_broadcast(message: str) -> None:  # noqa: ARG001
 		return None
 
+	async def noop_async() -> None:
+		return None
+
 	monkeypatch.setattr(manager, "broadcast", noop_broadcast)
 	monkeypatch.setattr(mqtt_service, "start", lambda: None)
 	monkeypatch.setattr(mqtt_service, "stop", lambda: None)
+	monkeypatch.setattr(revocation_list, "start", noop_async)
+	monkeypatch.setattr(mail_queue, "_redis", FakeRedis())
 
 	asyncio.get_event_loop().run_until_complete(_recreate_schema())
 
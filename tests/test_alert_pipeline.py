@@ -0,0 +1,320 @@
+"""Tests for the write-behind alert ingestion pipeline."""
+
+import asyncio
+import json
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from app.schemas.alerts import AlertCreate
+from app.services.alert_pipeline import AlertIngestPipeline, alert_pipeline
+from app.services.alert_query import AlertQueryService
+from app.services import mqtt_client
+from app.services.mqtt_client import MQTTService
+from app.services.websocket import manager
+
+
+def _alert(device_id: str = "pipeline-device") -> AlertCreate:
+    return AlertCreate(
+        device_id=device_id,
+        timestamp=datetime.utcnow(),
+        alert_type="weapon_detection",
+        location_lat=6.5,
+        location_lon=3.3,
+        payload={"confidence": 0.9},
+    )
+
+
+@pytest.fixture
+def broadcasts(monkeypatch: pytest.MonkeyPatch) -> list:
+    messages: list = []
+
+    async def fake_broadcast(message: str) -> None:
+        messages.append(message)
+
+    monkeypatch.setattr(manager, "broadcast", fake_broadcast)
+    return messages
+
+
+@pytest.mark.asyncio
+async def test_concurrent_submits_share_one_batch(broadcasts: list) -> None:
+    pipeline = AlertIngestPipeline(max_batch_size=50, max_batch_delay_ms=50)
+    await pipeline.start()
+    try:
+        results = await asyncio.gather(
+            *(pipeline.submit(_alert(f"device-{i}"), source="HTTP") for i in range(10))
+        )
+    finally:
+        await pipeline.stop()
+
+    assert [r.device_id for r in results] == [f"device-{i}" for i in range(10)]
+    assert pipeline.batches_committed == 1
+    assert pipeline.alerts_committed == 10
+    assert len(broadcasts) == 10
+
+    now = datetime.utcnow()
+    stored = await AlertQueryService.get_alerts_by_timeframe(
+        now - timedelta(minutes=1), now + timedelta(minutes=1)
+    )
+    assert len(stored) == 10
+
+
+@pytest.mark.asyncio
+async def test_batches_split_on_size(broadcasts: list) -> None:
+    pipeline = AlertIngestPipeline(max_batch_size=4, max_batch_delay_ms=50)
+    await pipeline.start()
+    try:
+        await asyncio.gather(*(pipeline.submit(_alert(), source="HTTP") for _ in range(10)))
+    finally:
+        await pipeline.stop()
+
+    assert pipeline.batches_committed == 3
+    assert pipeline.stats()["last_commit_latency_ms"] >= 0
+
+
+@pytest.mark.asyncio
+async def test_stop_drains_enqueued_alerts(broadcasts: list) -> None:
+    pipeline = AlertIngestPipeline(max_batch_size=500, max_batch_delay_ms=1000)
+    await pipeline.start()
+    for _ in range(5):
+        await pipeline.enqueue(_alert(), source="MQTT")
+    await pipeline.stop()
+
+    assert pipeline.alerts_committed == 5
+    assert len(broadcasts) == 5
+
+
+@pytest.mark.asyncio
+async def test_failed_commit_is_retried(monkeypatch: pytest.MonkeyPatch, broadcasts: list) -> None:
+    pipeline = AlertIngestPipeline(max_batch_size=10, max_batch_delay_ms=20, retry_backoff=0.001)
+    commit = AlertIngestPipeline._commit
+    attempts: list = []
+
+    async def flaky_commit(rows):
+        attempts.append(len(rows))
+        if len(attempts) == 1:
+            raise RuntimeError("connection reset")
+        return await commit(rows)
+
+    monkeypatch.setattr(pipeline, "_commit", flaky_commit)
+    await pipeline.start()
+    try:
+        results = await asyncio.gather(*(pipeline.submit(_alert(), source="HTTP") for _ in range(3)))
+    finally:
+        await pipeline.stop()
+
+    assert attempts == [3, 3]
+    assert len(results) == 3
+    assert pipeline.batches_failed == 0
+    assert pipeline.alerts_committed == 3
+
+
+@pytest.mark.asyncio
+async def test_failing_batch_falls_back_to_single_rows(
+    monkeypatch: pytest.MonkeyPatch, broadcasts: list
+) -> None:
+    pipeline = AlertIngestPipeline(max_batch_size=10, max_batch_delay_ms=20, max_retries=1, retry_backoff=0.001)
+    commit = AlertIngestPipeline._commit
+
+    async def reject_bad_device(rows):
+        if any(row["device_id"] == "bad-device" for row in rows):
+            raise RuntimeError("constraint violation")
+        return await commit(rows)
+
+    monkeypatch.setattr(pipeline, "_commit", reject_bad_device)
+    await pipeline.start()
+    try:
+        results = await asyncio.gather(
+            pipeline.submit(_alert("good-1"), source="HTTP"),
+            pipeline.submit(_alert("bad-device"), source="HTTP"),
+            pipeline.submit(_alert("good-2"), source="HTTP"),
+            return_exceptions=True,
+        )
+    finally:
+        await pipeline.stop()
+
+    assert results[0].device_id == "good-1"
+    assert isinstance(results[1], RuntimeError)
+    assert results[2].device_id == "good-2"
+    assert pipeline.batches_failed == 1
+    assert pipeline.batches_committed == 0
+    assert pipeline.alerts_committed == 2
+    assert pipeline.alerts_failed == 1
+    assert len(broadcasts) == 2
+
+
+@pytest.mark.asyncio
+async def test_retries_stop_at_the_batch_budget(monkeypatch: pytest.MonkeyPatch, broadcasts: list) -> None:
+    pipeline = AlertIngestPipeline(
+        max_batch_size=10, max_batch_delay_ms=20, max_retries=10, retry_backoff=0.05, retry_budget=0.1
+    )
+    attempts: list = []
+
+    async def database_down(rows):
+        attempts.append(len(rows))
+        raise RuntimeError("database unavailable")
+
+    monkeypatch.setattr(pipeline, "_commit", database_down)
+    await pipeline.start()
+    try:
+        results = await asyncio.gather(
+            *(pipeline.submit(_alert(), source="HTTP") for _ in range(2)), return_exceptions=True
+        )
+    finally:
+        await pipeline.stop()
+
+    # Two batch attempts (0.05 s backoff fits the budget, 0.1 s does not), then one per alert.
+    assert attempts == [2, 2, 1, 1]
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert pipeline.batches_committed == 0
+    assert pipeline.alerts_failed == 2
+    assert broadcasts == []
+
+
+@pytest.mark.asyncio
+async def test_unexpected_flush_error_reaches_submitters(monkeypatch: pytest.MonkeyPatch) -> None:
+    async def broken_invalidation(changes):
+        raise KeyError("unexpected")
+
+    monkeypatch.setattr("app.services.alert_pipeline.publish_alert_changes", broken_invalidation)
+    pipeline = AlertIngestPipeline(max_batch_size=10, max_batch_delay_ms=20)
+    await pipeline.start()
+    try:
+        with pytest.raises(KeyError):
+            await asyncio.wait_for(pipeline.submit(_alert(), source="HTTP"), timeout=5)
+        assert pipeline.running
+    finally:
+        await pipeline.stop()
+
+
+def _mqtt_message(device_id: str) -> SimpleNamespace:
+    payload = _alert(device_id).model_dump(mode="json")
+    return SimpleNamespace(topic="obex/alerts", payload=json.dumps(payload).encode())
+
+
+def test_mqtt_drop_oldest_policy_counts_drops() -> None:
+    service = MQTTService(queue_size=2, overflow_policy="drop_oldest")
+    for i in range(5):
+        service._on_message(None, None, _mqtt_message(f"device-{i}"))
+
+    stats = service.ingest_stats()
+    assert stats["queue_depth"] == 2
+    assert stats["dropped"] == 3
+    queued = [service._handoff.get_nowait().device_id for _ in range(2)]
+    assert queued == ["device-3", "device-4"]
+
+
+def test_mqtt_invalid_payload_is_counted() -> None:
+    service = MQTTService(queue_size=2, overflow_policy="drop_oldest")
+    service._on_message(None, None, SimpleNamespace(topic="obex/alerts", payload=b"not json"))
+    assert service.ingest_stats()["invalid"] == 1
+    assert service.ingest_stats()["queue_depth"] == 0
+
+
+@pytest.mark.asyncio
+async def test_mqtt_spill_policy_replays_from_disk(tmp_path, broadcasts: list) -> None:
+    service = MQTTService(
+        queue_size=1,
+        overflow_policy="spill",
+        spill_path=str(tmp_path / "spill.jsonl"),
+    )
+    for i in range(4):
+        service._on_message(None, None, _mqtt_message(f"device-{i}"))
+    assert service.ingest_stats()["spilled"] == 3
+
+    committed_before = alert_pipeline.alerts_committed
+    await service.start_dispatcher()
+    for _ in range(100):
+        if alert_pipeline.alerts_committed - committed_before >= 4:
+            break
+        await asyncio.sleep(0.01)
+    await service.stop_dispatcher()
+
+    assert service.ingest_stats()["replayed"] == 3
+    assert alert_pipeline.alerts_committed - committed_before == 4
+    assert not (tmp_path / "spill.jsonl").exists()
+
+
+@pytest.mark.asyncio
+async def test_mqtt_dispatcher_survives_errors_and_replays_on_a_timer(
+    tmp_path, monkeypatch: pytest.MonkeyPatch, broadcasts: list
+) -> None:
+    monkeypatch.setattr(mqtt_client, "SPILL_REPLAY_SECONDS", 0.02)
+    monkeypatch.setattr(mqtt_client, "DISPATCH_RESTART_DELAY", 0.01)
+    service = MQTTService(queue_size=1, overflow_policy="spill", spill_path=str(tmp_path / "spill.jsonl"))
+    take_spilled = service._take_spilled
+    calls: list = []
+
+    def flaky_take_spilled():
+        calls.append(1)
+        if len(calls) == 1:
+            raise OSError("disk unavailable")
+        return take_spilled()
+
+    monkeypatch.setattr(service, "_take_spilled", flaky_take_spilled)
+    committed_before = alert_pipeline.alerts_committed
+    await service.start_dispatcher()
+    # Spilled while the queue is idle: no further MQTT message will arrive.
+    service._spill(_alert("late-device"))
+    for _ in range(200):
+        if service.ingest_stats()["replayed"]:
+            break
+        await asyncio.sleep(0.01)
+    await service.stop_dispatcher()
+
+    assert service.ingest_stats()["replayed"] == 1
+    assert alert_pipeline.alerts_committed - committed_before == 1
+    assert len(calls) >= 2
+
+
+@pytest.mark.asyncio
+async def test_mqtt_spill_file_is_kept_until_replayed(
+    tmp_path, monkeypatch: pytest.MonkeyPatch, broadcasts: list
+) -> None:
+    service = MQTTService(queue_size=1, overflow_policy="spill", spill_path=str(tmp_path / "spill.jsonl"))
+    for i in range(3):
+        service._spill(_alert(f"spilled-{i}"))
+    enqueue = alert_pipeline.enqueue
+    enqueued: list = []
+
+    async def failing_enqueue(alert_data, source):
+        if alert_data.device_id == "spilled-1":
+            raise RuntimeError("pipeline unavailable")
+        enqueued.append(alert_data.device_id)
+        await enqueue(alert_data, source)
+
+    monkeypatch.setattr(alert_pipeline, "enqueue", failing_enqueue)
+    loop = asyncio.get_running_loop()
+    with pytest.raises(RuntimeError):
+        await service._replay_spilled(loop)
+    assert enqueued == ["spilled-0"]
+    assert (tmp_path / "spill.jsonl.replay").exists()
+
+    monkeypatch.setattr(alert_pipeline, "enqueue", enqueue)
+    await service._replay_spilled(loop)
+    assert service.ingest_stats()["replayed"] == 3
+    assert not (tmp_path / "spill.jsonl.replay").exists()
+
+
+@pytest.mark.asyncio
+async def test_mqtt_stop_dispatcher_does_not_hang_on_full_queue(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(mqtt_client, "STOP_TIMEOUT_SECONDS", 0.05)
+    service = MQTTService(queue_size=1, overflow_policy="block")
+    gate = asyncio.Event()
+
+    async def stuck_enqueue(alert_data, source):
+        await gate.wait()
+
+    monkeypatch.setattr(alert_pipeline, "enqueue", stuck_enqueue)
+    await service.start_dispatcher()
+    service._handoff.put_nowait(_alert("device-0"))
+    for _ in range(200):
+        if service._handoff.empty():
+            break
+        await asyncio.sleep(0.01)
+    # The dispatcher is stuck on device-0 and the queue is full again.
+    service._handoff.put_nowait(_alert("device-1"))
+
+    await asyncio.wait_for(service.stop_dispatcher(), timeout=5)
+    assert service._dispatcher is None
@@ -1,5 +1,6 @@
 """Tests for alert ingestion and retrieval flows."""
 
+import json
 from datetime import datetime, timedelta
 
 import pytest
@@ -69,4 +70,79 @@ def test_invalid_alert_payload_returns_422(api_client: TestClient) -> None:
 
     invalid_payload = {"device_id": "test", "timestamp": "nope", "alert_type": "unknown"}
     response = api_client.post("/api/alerts", json=invalid_payload)
-    assert response.status_code == 422
\ No newline at end of file
+    assert response.status_code == 422
+
+def _post_alerts(client: TestClient, count: int, **overrides) -> None:
+    base = datetime.utcnow()
+    for index in range(count):
+        payload = _example_alert_payload(base - timedelta(minutes=index))
+        payload.update(overrides)
+        assert client.post("/api/alerts", json=payload).status_code == 201
+
+
+def test_list_alerts_keyset_pagination(api_client: TestClient) -> None:
+    """Pages follow X-Next-Cursor until exhausted, newest first, without overlap."""
+
+    _post_alerts(api_client, 5)
+
+    seen = []
+    cursor = None
+    pages = 0
+    while True:
+        params = {"limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        response = api_client.get("/api/alerts", params=params)
+        assert response.status_code == 200
+        seen.extend(response.json())
+        pages += 1
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+
+    assert pages == 3
+    assert len({alert["id"] for alert in seen}) == 5
+    timestamps = [alert["timestamp"] for alert in seen]
+    assert timestamps == sorted(timestamps, reverse=True)
+
+
+def test_list_alerts_projection_and_filters(api_client: TestClient) -> None:
+    """fields= trims the payload and filters narrow the result set."""
+
+    _post_alerts(api_client, 2)
+    _post_alerts(api_client, 1, device_id="other-device", alert_type="driver_fatigue")
+
+    response = api_client.get(
+        "/api/alerts",
+        params={"fields": "id,alert_type", "device_id": "other-device"},
+    )
+    assert response.status_code == 200
+    alerts = response.json()
+    assert alerts == [{"id": alerts[0]["id"], "alert_type": "driver_fatigue"}]
+
+    response = api_client.get("/api/alerts", params={"alert_type": "weapon_detection"})
+    assert len(response.json()) == 2
+
+    assert api_client.get("/api/alerts", params={"fields": "secret"}).status_code == 400
+    assert api_client.get("/api/alerts", params={"cursor": "not-a-cursor"}).status_code == 400
+
+
+def test_list_alerts_ndjson_stream(api_client: TestClient) -> None:
+    """format=ndjson streams one JSON document per line."""
+
+    _post_alerts(api_client, 3)
+
+    response = api_client.get("/api/alerts", params={"format": "ndjson", "fields": "device_id"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert lines == [{"device_id": "device-123"}] * 3
+
+
+def test_list_alerts_openapi_documents_both_formats(api_client: TestClient) -> None:
+    """The OpenAPI entry describes the JSON page, the NDJSON stream and the cursor header."""
+
+    spec = api_client.get("/openapi.json").json()
+    ok = spec["paths"]["/api/alerts"]["get"]["responses"]["200"]
+    assert set(ok["content"]) == {"application/json", "application/x-ndjson"}
+    assert "X-Next-Cursor" in ok["headers"]
@@ -1,9 +1,17 @@
 """Analytics endpoint tests."""
 
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
 
+import pytest
 from fastapi.testclient import TestClient
 
+from app.models import Alert
+from app.services import timeframe_cache
+from app.services.alert_query import AlertQueryService
+from app.services.cache_invalidation import alert_tags
+from tests.conftest import InMemoryAsyncCache
+
 
 def _create_sample_alert(client: TestClient, **overrides) -> None:
     payload = {
@@ -34,6 +42,69 @@ def test_timeframe_endpoint(api_client: TestClient) -> None:
     assert response.json()
 
 
+def test_timeframe_reuses_sealed_hour_buckets(
+    api_client: TestClient, mock_cache: InMemoryAsyncCache, monkeypatch
+) -> None:
+    now = datetime.utcnow()
+    for minutes in (170, 150, 10):
+        _create_sample_alert(api_client, timestamp=(now - timedelta(minutes=minutes)).isoformat())
+
+    sealed_queries = []
+    original = AlertQueryService.get_alerts_by_timeframe
+
+    async def tracking(start, end, alert_type=None, device_id=None, upper_inclusive=True):
+        on_the_hour = all(t == t.replace(minute=0, second=0, microsecond=0) for t in (start, end))
+        if not upper_inclusive and on_the_hour:
+            sealed_queries.append((start, end))
+        return await original(start, end, alert_type, device_id, upper_inclusive=upper_inclusive)
+
+    monkeypatch.setattr(AlertQueryService, "get_alerts_by_timeframe", tracking)
+
+    def window(shift: timedelta) -> list:
+        response = api_client.get(
+            "/api/analytics/alerts/timeframe",
+            params={
+                "start_time": (now - timedelta(hours=5) + shift).isoformat(),
+                "end_time": (now + shift).isoformat(),
+            },
+        )
+        assert response.status_code == 200
+        return response.json()
+
+    assert len(window(timedelta())) == 3
+    assert len(sealed_queries) == 1
+    assert any(":timeframe:hour:" in key for key in mock_cache._store)
+
+    # A window that slid by a second reuses every cached hour.
+    assert len(window(timedelta(seconds=1))) == 3
+    assert len(sealed_queries) == 1
+
+    # A late alert only invalidates the hour it lands in.
+    _create_sample_alert(api_client, timestamp=(now - timedelta(minutes=150)).isoformat())
+    assert len(window(timedelta(seconds=1))) == 4
+    assert len(sealed_queries) == 2
+
+
+@pytest.mark.asyncio
+async def test_sealed_hours_tolerate_unexpected_timestamps(monkeypatch) -> None:
+    first_hour = datetime(2024, 5, 1, 10)
+
+    def alert(timestamp: datetime) -> Alert:
+        return Alert(id=uuid4(), device_id="tz-device", timestamp=timestamp, alert_type="weapon_detection")
+
+    async def query(start, end, alert_type=None, device_id=None, upper_inclusive=True):
+        return [
+            alert(datetime(2024, 5, 1, 11, 30, tzinfo=timezone(timedelta(hours=1)))),  # 10:30 UTC
+            alert(datetime(2024, 5, 1, 15, 5)),  # outside the requested hours
+        ]
+
+    monkeypatch.setattr(AlertQueryService, "get_alerts_by_timeframe", query)
+    alerts = await timeframe_cache._sealed_hours(first_hour, first_hour + timedelta(hours=2), None, None)
+
+    assert len(alerts) == 1
+    assert alerts[0]["device_id"] == "tz-device"
+
+
 def test_location_endpoint(api_client: TestClient) -> None:
     _create_sample_alert(api_client)
 
@@ -77,6 +148,38 @@ def test_device_statistics_endpoint(api_client: TestClient) -> None:
     assert data["total_alerts"] == 1
 
 
+def test_new_alerts_invalidate_affected_entries(
+    api_client: TestClient, mock_cache: InMemoryAsyncCache
+) -> None:
+    _create_sample_alert(api_client)
+    stats_url = "/api/analytics/devices/analytics-device/statistics"
+    assert api_client.get(stats_url).json()["total_alerts"] == 1
+    assert sum(api_client.get("/api/analytics/alerts/counts").json().values()) == 1
+    other_key = mock_cache.get_key("device", "other-device", "stats")
+    assert api_client.get("/api/analytics/devices/other-device/statistics").status_code == 200
+    assert other_key in mock_cache._store
+
+    _create_sample_alert(api_client)
+
+    assert api_client.get(stats_url).json()["total_alerts"] == 2
+    assert sum(api_client.get("/api/analytics/alerts/counts").json().values()) == 2
+    assert other_key in mock_cache._store
+
+
+def test_alert_tags_cover_window_days() -> None:
+    start = datetime(2024, 1, 30, 22)
+    end = datetime(2024, 2, 1, 1)
+
+    assert alert_tags(start_time=start, end_time=end) == [
+        "day:2024-01-30",
+        "day:2024-01-31",
+        "day:2024-02-01",
+    ]
+    assert alert_tags("dev-1", "weapon_detection", start, start) == ["day:2024-01-30:device:dev-1"]
+    assert alert_tags(alert_type="weapon_detection") == ["type:weapon_detection"]
+    assert alert_tags(start_time=start, end_time=start + timedelta(days=90)) == ["alerts"]
+
+
 def test_error_responses(api_client: TestClient) -> None:
     response = api_client.get("/api/analytics/alerts/location")
     assert response.status_code == 422
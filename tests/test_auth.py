@@ -1,5 +1,21 @@
+import asyncio
+import time
+
+import pytest
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
 from fastapi.testclient import TestClient
 
+from app.api import deps
+from app.api.deps import get_current_user
+from app.db.session import AsyncSessionLocal
+from app.models.user import User
+from app.services import auth_service, jwt_service, principal_cache
+from app.services.login_throttle import LastLoginRecorder, LoginThrottle
+from app.services.password_hasher import PasswordHasher
+from app.services.token_revocation import BloomFilter, TokenRevocationList
+from tests.conftest import FakeRedis
+
 
 def test_signup_and_login_flow(api_client: TestClient):
     payload = {
@@ -40,3 +56,208 @@ def test_lockout_after_failed_attempts(api_client: TestClient):
     # correct password should now be rejected due to lockout
     r3 = api_client.post("/api/auth/login", json={"username": username, "password": "LockPass1"})
     assert r3.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_password_hashing_runs_off_the_event_loop():
+    hasher = PasswordHasher(workers=2, max_pending=2, time_cost=1, memory_cost=8192, parallelism=1)
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            ticks += 1
+            await asyncio.sleep(0)
+
+    task = asyncio.create_task(ticker())
+    hashes = await asyncio.gather(*(hasher.hash(f"password-{i}") for i in range(6)))
+    task.cancel()
+
+    assert ticks > 6
+    assert await hasher.verify("password-0", hashes[0])
+    assert not await hasher.verify("wrong", hashes[0])
+    assert not await hasher.verify("password-0", "not-a-hash")
+    stats = hasher.stats()
+    assert stats["completed"] == 9
+    assert stats["pending"] == 0
+    hasher.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_authenticate_upgrades_outdated_hash(monkeypatch):
+    weak = PasswordHasher(time_cost=1, memory_cost=8192, parallelism=1)
+    strong = PasswordHasher(time_cost=2, memory_cost=8192, parallelism=1)
+    monkeypatch.setattr(auth_service, "password_hasher", weak)
+    user = await auth_service.create_user("rehash", "rehash@example.com", "+2340000000", "Secret123")
+
+    monkeypatch.setattr(auth_service, "password_hasher", strong)
+    assert await auth_service.authenticate("rehash@example.com", "Secret123") is not None
+
+    async with AsyncSessionLocal() as session:
+        stored = await session.get(User, user.id)
+    assert not strong.needs_rehash(stored.password_hash)
+    assert weak.needs_rehash(stored.password_hash)
+
+
+@pytest.mark.asyncio
+async def test_current_user_is_served_from_cache_until_lockout(monkeypatch):
+    monkeypatch.setattr(auth_service, "password_hasher", PasswordHasher(time_cost=1, memory_cost=8192, parallelism=1))
+    await auth_service.create_user("cached", "cached@example.com", "+2340000001", "Secret123")
+    token = jwt_service.create_access_token(subject="cached@example.com")
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+
+    decodes, loads = [], []
+    real_decode, real_load = principal_cache.decode_token, principal_cache._load_principal
+    monkeypatch.setattr(principal_cache, "decode_token", lambda t: decodes.append(t) or real_decode(t))
+
+    async def counting_load(subject):
+        loads.append(subject)
+        return await real_load(subject)
+
+    monkeypatch.setattr(principal_cache, "_load_principal", counting_load)
+
+    first = await get_current_user(credentials)
+    second = await get_current_user(credentials)
+    assert first == second
+    assert first.email == "cached@example.com"
+    assert len(decodes) == 1
+    assert len(loads) == 1
+
+    for _ in range(auth_service.MAX_FAILED_ATTEMPTS):
+        await auth_service.authenticate("cached@example.com", "wrong")
+
+    with pytest.raises(HTTPException) as exc_info:
+        await get_current_user(credentials)
+    assert exc_info.value.detail == "Account locked"
+    assert len(loads) == 2
+
+
+class FakeThrottleRedis:
+    """Emulates the sliding-window script and lock keys used by LoginThrottle."""
+
+    def __init__(self):
+        self.windows = {}
+        self.locks = set()
+
+    async def eval(self, script, numkeys, key, now_ms, window_ms, member):
+        events = [t for t in self.windows.get(key, []) if t > now_ms - window_ms]
+        events.append(now_ms)
+        self.windows[key] = events
+        return len(events)
+
+    async def exists(self, key):
+        return int(key in self.locks)
+
+    async def set(self, key, value, px=None, nx=False):
+        if nx and key in self.locks:
+            return None
+        self.locks.add(key)
+        return True
+
+    async def delete(self, key):
+        self.windows.pop(key, None)
+
+
+@pytest.mark.asyncio
+async def test_failed_logins_only_write_sql_when_locking(monkeypatch):
+    monkeypatch.setattr(auth_service, "password_hasher", PasswordHasher(time_cost=1, memory_cost=8192, parallelism=1))
+    monkeypatch.setattr(auth_service, "login_throttle", LoginThrottle(FakeThrottleRedis(), prefix="test"))
+    recorder = LastLoginRecorder(flush_interval=60)
+    monkeypatch.setattr(auth_service, "last_login_recorder", recorder)
+    user = await auth_service.create_user("throttled", "throttled@example.com", "+2340000002", "Secret123")
+
+    async def stored_user():
+        async with AsyncSessionLocal() as session:
+            return await session.get(User, user.id)
+
+    assert await auth_service.authenticate("throttled@example.com", "Secret123") is not None
+    assert (await stored_user()).last_login_at is None
+    assert await recorder.flush() == 1
+    assert (await stored_user()).last_login_at is not None
+
+    for _ in range(auth_service.MAX_FAILED_ATTEMPTS - 1):
+        assert await auth_service.authenticate("throttled@example.com", "wrong") is None
+    stored = await stored_user()
+    assert not stored.failed_attempts
+    assert stored.locked_until is None
+
+    assert await auth_service.authenticate("throttled@example.com", "wrong") is None
+    assert (await stored_user()).locked_until is not None
+    assert await auth_service.authenticate("throttled@example.com", "Secret123") is None
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    members = [f"jti-{i}" for i in range(1000)]
+    for member in members:
+        bloom.add(member)
+
+    assert all(member in bloom for member in members)
+    false_positives = sum(f"other-{i}" in bloom for i in range(10000))
+    assert false_positives < 300
+
+
+@pytest.mark.asyncio
+async def test_revoked_token_is_rejected_on_every_worker(monkeypatch):
+    redis = FakeRedis()
+    worker_a = TokenRevocationList(redis, prefix="test:revoked")
+    worker_b = TokenRevocationList(redis, prefix="test:revoked")
+    await worker_b.rebuild()
+    monkeypatch.setattr(deps, "revocation_list", worker_b)
+    monkeypatch.setattr(auth_service, "password_hasher", PasswordHasher(time_cost=1, memory_cost=8192, parallelism=1))
+    await auth_service.create_user("revoked", "revoked@example.com", "+2340000003", "Secret123")
+    token = jwt_service.create_access_token(subject="revoked@example.com")
+    payload = jwt_service.decode_token(token)
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+
+    assert (await deps.get_current_user(credentials)).email == "revoked@example.com"
+    assert "exists" not in redis.calls  # filter miss: no Redis round trip
+
+    await worker_a.revoke(payload["jti"], payload["exp"])
+    channel, jti = redis.published[-1]
+    assert channel == worker_a.channel
+    worker_b.filter.add(jti)  # what worker_b's subscription does on delivery
+
+    with pytest.raises(HTTPException) as exc_info:
+        await deps.get_current_user(credentials)
+    assert exc_info.value.detail == "Token revoked"
+
+    fresh = TokenRevocationList(redis, prefix="test:revoked")
+    await fresh.rebuild()
+    assert await fresh.is_revoked(payload["jti"])
+
+
+@pytest.mark.asyncio
+async def test_unsynced_revocation_list_checks_redis():
+    redis = FakeRedis()
+    await TokenRevocationList(redis, prefix="test:revoked").revoke("jti-1", time.time() + 60)
+
+    unsynced = TokenRevocationList(redis, prefix="test:revoked")
+    assert not unsynced.synced
+    assert await unsynced.is_revoked("jti-1")
+    assert not await unsynced.is_revoked("jti-2")
+
+    async def unreachable(*keys):
+        raise ConnectionError("redis down")
+
+    redis.exists = unreachable
+    assert await unsynced.is_revoked("jti-2")
+
+
+def _request(peer: str, forwarded: str = ""):
+    from starlette.requests import Request
+
+    headers = [(b"x-forwarded-for", forwarded.encode())] if forwarded else []
+    return Request({"type": "http", "client": (peer, 1234), "headers": headers})
+
+
+def test_client_ip_trusts_forwarded_for_only_from_configured_proxies(monkeypatch):
+    monkeypatch.setattr(deps.settings, "trusted_proxies", "")
+    assert deps.client_ip(_request("10.0.0.5", "203.0.113.9")) == "10.0.0.5"
+
+    monkeypatch.setattr(deps.settings, "trusted_proxies", "10.0.0.0/8, 192.168.1.1")
+    assert deps.client_ip(_request("10.0.0.5", "203.0.113.9")) == "203.0.113.9"
+    # A client-supplied entry left of the real client address is ignored.
+    assert deps.client_ip(_request("10.0.0.5", "1.2.3.4, 203.0.113.9, 192.168.1.1")) == "203.0.113.9"
+    assert deps.client_ip(_request("198.51.100.7", "1.2.3.4")) == "198.51.100.7"
+    assert deps.client_ip(_request("10.0.0.5")) == "10.0.0.5"
@@ -1,10 +1,17 @@
 """Cache helper tests using the in-memory stub."""
 
+import asyncio
+import json
 from datetime import datetime
+from uuid import uuid4
 
 import pytest
 
-from tests.conftest import InMemoryAsyncCache
+from app.models import Alert
+from app.services.cache import RedisCache
+from app.services.cache_codec import CacheCodec, Compressor, Serializer
+from app.services.memory_cache import MemoryLRU, estimate_size
+from tests.conftest import FakeRedis, InMemoryAsyncCache
 
 
 @pytest.fixture
@@ -61,4 +68,262 @@ async def test_complex_payload_serialisation(cache_instance: InMemoryAsyncCache)
     }
 
     await cache_instance.set(key, value)
-    assert await cache_instance.get(key) == value
\ No newline at end of file
+    assert await cache_instance.get(key) == value
+
+@pytest.mark.asyncio
+async def test_redis_cache_single_flight_within_process() -> None:
+    cache = RedisCache(prefix="test", redis_client=FakeRedis())
+    calls = 0
+
+    async def compute() -> dict:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return {"value": calls}
+
+    key = cache.get_key("trends", 7, 24)
+    results = await asyncio.gather(*(cache.get_or_set(key, compute) for _ in range(20)))
+
+    assert calls == 1
+    assert all(result == {"value": 1} for result in results)
+
+
+@pytest.mark.asyncio
+async def test_single_flight_waiter_takes_over_from_cancelled_leader() -> None:
+    cache = RedisCache(prefix="test", redis_client=FakeRedis(), l1_enabled=False)
+    calls = 0
+
+    async def compute() -> dict:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return {"value": calls}
+
+    key = cache.get_key("trends", 7, 24)
+    leader = asyncio.create_task(cache.get_or_set(key, compute))
+    await asyncio.sleep(0.01)
+    waiters = [asyncio.create_task(cache.get_or_set(key, compute)) for _ in range(3)]
+    await asyncio.sleep(0.01)
+    leader.cancel()
+
+    results = await asyncio.gather(*waiters)
+    assert leader.cancelled()
+    assert calls == 2
+    assert results == [{"value": 2}] * 3
+
+
+@pytest.mark.asyncio
+async def test_redis_cache_lock_coordinates_workers() -> None:
+    shared = FakeRedis()
+    worker_a = RedisCache(prefix="test", redis_client=shared)
+    worker_b = RedisCache(prefix="test", redis_client=shared)
+    calls = 0
+
+    async def compute() -> int:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.1)
+        return 42
+
+    key = worker_a.get_key("counts", "all", "all")
+    results = await asyncio.gather(worker_a.get_or_set(key, compute), worker_b.get_or_set(key, compute))
+
+    assert results == [42, 42]
+    assert calls == 1
+    assert f"{key}:lock" not in shared.store
+
+
+@pytest.mark.asyncio
+async def test_redis_cache_serves_stale_while_revalidating() -> None:
+    cache = RedisCache(prefix="test", redis_client=FakeRedis())
+    key = cache.get_key("trends", 1, 1)
+    versions = iter(["v1", "v2", "v3"])
+
+    async def compute() -> str:
+        return next(versions)
+
+    assert await cache.get_or_set(key, compute, soft_ttl=0) == "v1"
+    # Stale: the old value is returned immediately and one refresh is scheduled.
+    assert await cache.get_or_set(key, compute, soft_ttl=0) == "v1"
+    assert await cache.get_or_set(key, compute, soft_ttl=0) == "v1"
+    await asyncio.sleep(0.01)
+    assert await cache.get(key) == "v2"
+
+
+@pytest.mark.asyncio
+async def test_redis_cache_serves_hot_keys_from_l1() -> None:
+    redis = FakeRedis()
+    cache = RedisCache(prefix="test", redis_client=redis, l1_enabled=True)
+    key = cache.get_key("counts", "all", "all")
+    redis.store[key] = json.dumps({"total": 3})
+
+    assert await cache.get(key) == {"total": 3}
+    assert await cache.get(key) == {"total": 3}
+    assert redis.calls["get"] == 1
+    assert cache.stats()["l1"]["hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_l1_charges_decoded_size_not_compressed_size() -> None:
+    redis = FakeRedis()
+    codec = CacheCodec(serializer="json", compression="zlib", compress_min_bytes=0)
+    cache = RedisCache(prefix="test", redis_client=redis, codec=codec, l1_enabled=True)
+    key = cache.get_key("trends", 30, 1)
+    value = [{"bucket": index, "label": "weapon_detection" * 4} for index in range(500)]
+
+    await cache.set(key, value)
+    charged = cache.stats()["l1"]["bytes"]
+    assert charged == estimate_size(value)
+    assert charged > 10 * len(redis.store[key])
+
+
+@pytest.mark.asyncio
+async def test_l1_invalidation_reaches_other_workers() -> None:
+    shared = FakeRedis()
+    writer = RedisCache(prefix="test", redis_client=shared, l1_enabled=True)
+    reader = RedisCache(prefix="test", redis_client=shared, l1_enabled=True)
+    key = writer.get_key("device", "dev-1", "stats")
+
+    await writer.set(key, {"total": 1})
+    assert await reader.get(key) == {"total": 1}
+
+    await writer.set(key, {"total": 2})
+    channel, message = shared.published[-1]
+    assert channel == writer.invalidation_channel
+    writer._apply_invalidation(message)  # a worker ignores its own messages
+    reader._apply_invalidation(message)
+
+    assert await writer.get(key) == {"total": 2}
+    assert await reader.get(key) == {"total": 2}
+
+
+def test_memory_lru_evicts_by_bytes() -> None:
+    lru = MemoryLRU(max_bytes=100, max_entries=10, ttl=60)
+    lru.set("a", "A", 40)
+    lru.set("b", "B", 40)
+    assert lru.get("a") == "A"  # "b" is now least recently used
+    lru.set("c", "C", 40)
+
+    assert lru.get("b") is None
+    assert lru.get("a") == "A"
+    assert lru.get("c") == "C"
+    assert lru.stats()["bytes"] == 80
+    assert lru.stats()["evictions"] == 1
+
+
+@pytest.mark.asyncio
+async def test_invalidate_tags_removes_registered_entries_only() -> None:
+    redis = FakeRedis()
+    cache = RedisCache(prefix="test", redis_client=redis, l1_enabled=True)
+    device_key = cache.get_key("device", "dev-1", "stats")
+    counts_key = cache.get_key("counts", "all", "all")
+    await cache.set(device_key, {"total": 1}, tags=["device:dev-1"])
+    await cache.set(counts_key, {"weapon_detection": 1}, tags=["alerts"])
+
+    assert await cache.invalidate_tags("device:dev-1") == 1
+
+    assert await cache.get(device_key) is None
+    assert await cache.get(counts_key) == {"weapon_detection": 1}
+    assert cache.tag_key("device:dev-1") not in redis.store
+    assert "keys" not in redis.calls
+
+
+@pytest.mark.asyncio
+async def test_invalidate_tags_pipelines_across_tags() -> None:
+    redis = FakeRedis()
+    cache = RedisCache(prefix="test", redis_client=redis, l1_enabled=False)
+    tags = [f"device:dev-{index}" for index in range(300)]
+    await cache.set_many(
+        (cache.get_key("device", tag, "stats"), {"total": 1}, [tag, "alerts"]) for tag in tags
+    )
+    redis.calls.clear()
+
+    assert await cache.invalidate_tags(*tags, "alerts") == 300
+
+    # One SSCAN round, one DEL batch for the keys, one for the tag sets.
+    assert redis.calls["execute"] == 3
+    assert redis.calls["sscan"] == 301
+    assert not any(key.startswith("test:") for key in redis.store)
+
+
+@pytest.mark.asyncio
+async def test_invalidate_pattern_uses_scan() -> None:
+    redis = FakeRedis()
+    cache = RedisCache(prefix="test", redis_client=redis)
+    for i in range(3):
+        await cache.set(cache.get_key("trends", i, 24), [i])
+    await cache.set(cache.get_key("counts", "all", "all"), {})
+
+    assert await cache.invalidate_pattern(cache.get_key("trends", "*")) == 3
+
+    assert redis.calls["scan"] == 1
+    assert "keys" not in redis.calls
+    assert await cache.get(cache.get_key("counts", "all", "all")) == {}
+
+
+def _orm_alert(**overrides) -> Alert:
+    fields = {
+        "id": str(uuid4()),
+        "device_id": "dev-1",
+        "timestamp": datetime(2024, 5, 1, 12, 30),
+        "alert_type": "weapon_detection",
+        "location_lat": 6.5,
+        "location_lon": 3.3,
+        "payload": {"confidence": 0.9},
+    }
+    fields.update(overrides)
+    return Alert(**fields)
+
+
+@pytest.mark.parametrize("serializer", ["json", "orjson"])
+@pytest.mark.parametrize("compression", ["none", "zlib"])
+def test_codec_round_trips_orm_results(serializer: str, compression: str) -> None:
+    codec = CacheCodec(serializer=serializer, compression=compression, compress_min_bytes=64)
+    alerts = [_orm_alert() for _ in range(20)]
+
+    raw = codec.encode({"latest_alert": alerts[0], "alerts": alerts})
+    decoded = codec.decode(raw)
+
+    assert raw[1:2] == codec.compressor.header
+    assert decoded["latest_alert"]["payload"] == {"confidence": 0.9}
+    assert decoded["latest_alert"]["timestamp"] == "2024-05-01T12:30:00"
+    assert len(decoded["alerts"]) == 20
+
+
+def test_codec_reads_entries_from_other_settings() -> None:
+    written = CacheCodec(serializer="json", compression="zlib", compress_min_bytes=0).encode([1, 2])
+
+    reader = CacheCodec(serializer="orjson", compression="none")
+    assert reader.decode(written) == [1, 2]
+    assert reader.decode('{"legacy": true}') == {"legacy": True}
+
+
+def test_codec_plugins_must_implement_both_directions() -> None:
+    class DumpsOnly(Serializer):
+        def dumps(self, value):
+            return b""
+
+    class CompressOnly(Compressor):
+        def compress(self, data):
+            return data
+
+    with pytest.raises(TypeError):
+        DumpsOnly()
+    with pytest.raises(TypeError):
+        CompressOnly()
+
+
+@pytest.mark.asyncio
+async def test_redis_cache_stores_orm_alerts() -> None:
+    cache = RedisCache(prefix="test", redis_client=FakeRedis(), l1_enabled=True)
+    key = cache.get_key("timeframe", "a", "b", "None", "None")
+
+    missed = await cache.get_or_set(key, lambda: [_orm_alert(device_id="dev-9")])
+    hit = await cache.get_or_set(key, lambda: pytest.fail("served from cache"))
+
+    assert missed == hit
+    assert list(missed[0]) == list(hit[0])
+    assert missed[0]["device_id"] == "dev-9"
+    assert missed[0]["payload"] == {"confidence": 0.9}
+    with pytest.raises(TypeError):
+        await cache.set(key, object())
@@ -0,0 +1,33 @@
+"""Tests for the logging helpers."""
+
+import json
+import logging
+
+from app.core import logging as app_logging
+
+
+def test_sampler_lets_one_in_n_through() -> None:
+    sampler = app_logging.Sampler(10)
+    assert sum(sampler() for _ in range(100)) == 10
+    assert all(app_logging.Sampler(0)() for _ in range(5))
+
+
+def test_payload_logging_is_opt_in(monkeypatch) -> None:
+    assert not app_logging.payload_logging_enabled("dev-1", "alerts/topic")
+
+    monkeypatch.setattr(app_logging, "_payload_devices", frozenset({"dev-1"}))
+    assert app_logging.payload_logging_enabled("dev-1", "alerts/topic")
+    assert not app_logging.payload_logging_enabled("dev-2", "alerts/topic")
+
+    monkeypatch.setattr(app_logging, "_payload_topics", frozenset({"*"}))
+    assert app_logging.payload_logging_enabled("dev-2", "other/topic")
+
+
+def test_json_formatter_includes_extra_fields() -> None:
+    record = logging.LogRecord("obex.test", logging.INFO, __file__, 1, "alert %s stored", ("a-1",), None)
+    record.device_id = "dev-1"
+
+    entry = json.loads(app_logging.JSONFormatter().format(record))
+    assert entry["message"] == "alert a-1 stored"
+    assert entry["level"] == "INFO"
+    assert entry["device_id"] == "dev-1"
@@ -0,0 +1,247 @@
+"""Tests for the background mail queue."""
+
+import asyncio
+import time
+
+import aiosmtplib
+import pytest
+from aiosmtpd.controller import Controller
+
+from app.services import otp_service
+from app.services.mail_queue import MailMessage, MailQueue, MailQueueFull
+from tests.conftest import FakeRedis
+
+
+class FakeSMTP:
+    """Records connections and messages; fails the first `failures` sends."""
+
+    connects = 0
+    sent: list = []
+    failures = 0
+
+    def __init__(self) -> None:
+        self.is_connected = False
+
+    async def connect(self) -> None:
+        FakeSMTP.connects += 1
+        self.is_connected = True
+
+    async def send_message(self, message) -> None:
+        if FakeSMTP.failures:
+            FakeSMTP.failures -= 1
+            self.is_connected = False
+            raise aiosmtplib.SMTPServerDisconnected("connection dropped")
+        FakeSMTP.sent.append(message)
+
+    async def quit(self) -> None:
+        self.is_connected = False
+
+    def close(self) -> None:
+        self.is_connected = False
+
+
+@pytest.fixture
+def fake_smtp():
+    FakeSMTP.connects = 0
+    FakeSMTP.sent = []
+    FakeSMTP.failures = 0
+    return FakeSMTP
+
+
+async def _settle(queue: MailQueue, handled: int) -> None:
+    """Wait until the workers have sent, failed or dropped `handled` messages."""
+    for _ in range(300):
+        if queue.sent + queue.failed + queue.expired >= handled:
+            return
+        await asyncio.sleep(0.01)
+
+
+@pytest.mark.asyncio
+async def test_workers_reuse_their_connection(fake_smtp) -> None:
+    redis = FakeRedis()
+    queue = MailQueue(redis, stream="test:mail", pool_size=1, retry_backoff=0, smtp_factory=fake_smtp)
+    await queue.start()
+    for i in range(5):
+        await queue.enqueue(MailMessage(to=f"user{i}@example.com", subject="Hi", html="<p>hi</p>"))
+    await _settle(queue, 5)
+    await queue.stop()
+
+    assert len(fake_smtp.sent) == 5
+    assert fake_smtp.connects == 1
+    assert queue.stats()["sent"] == 5
+    assert await redis.xlen("test:mail") == 0
+
+
+@pytest.mark.asyncio
+async def test_failed_send_reconnects_and_retries(fake_smtp) -> None:
+    fake_smtp.failures = 2
+    queue = MailQueue(FakeRedis(), pool_size=1, max_retries=3, retry_backoff=0, smtp_factory=fake_smtp)
+    await queue.start()
+    await queue.enqueue(MailMessage(to="retry@example.com", subject="Hi", html="<p>hi</p>"))
+    await _settle(queue, 1)
+    await queue.stop()
+
+    assert [m["To"] for m in fake_smtp.sent] == ["retry@example.com"]
+    assert fake_smtp.connects == 3
+    assert queue.stats()["retries"] == 2
+
+
+@pytest.mark.asyncio
+async def test_failed_mail_stays_queued_after_max_retries(fake_smtp) -> None:
+    fake_smtp.failures = 10
+    redis = FakeRedis()
+    queue = MailQueue(redis, stream="test:mail", pool_size=1, max_retries=1, retry_backoff=0, smtp_factory=fake_smtp)
+    await queue.start()
+    await queue.enqueue(MailMessage(to="lost@example.com", subject="Hi", html="<p>hi</p>"))
+    await _settle(queue, 1)
+    await queue.stop()
+
+    assert fake_smtp.sent == []
+    assert queue.stats()["failed"] == 1
+    assert await redis.xlen("test:mail") == 1
+
+
+@pytest.mark.asyncio
+async def test_unacknowledged_mail_is_claimed_again(fake_smtp) -> None:
+    redis = FakeRedis()
+    crashed = MailQueue(redis, stream="test:mail")
+    await crashed.enqueue(MailMessage(to="again@example.com", subject="Hi", html="<p>hi</p>"))
+    # A worker that read the message and died before sending it.
+    await redis.xgroup_create("test:mail", crashed.group, id="0", mkstream=True)
+    await redis.xreadgroup(crashed.group, "dead-worker", {"test:mail": ">"}, count=1)
+
+    queue = MailQueue(
+        redis, stream="test:mail", pool_size=1, retry_backoff=0, claim_idle_seconds=0, smtp_factory=fake_smtp
+    )
+    await queue.start()
+    await _settle(queue, 1)
+    await queue.stop()
+
+    assert [m["To"] for m in fake_smtp.sent] == ["again@example.com"]
+    assert await redis.xlen("test:mail") == 0
+
+
+@pytest.mark.asyncio
+async def test_mail_queued_without_workers_is_sent_once_they_start(fake_smtp) -> None:
+    redis = FakeRedis()
+    queue = MailQueue(redis, stream="test:mail", pool_size=1, retry_backoff=0, smtp_factory=fake_smtp)
+    await queue.enqueue(MailMessage(to="later@example.com", subject="Hi", html="<p>hi</p>"))
+    assert fake_smtp.sent == []
+
+    await queue.start()
+    await _settle(queue, 1)
+    await queue.stop()
+
+    assert [m["To"] for m in fake_smtp.sent] == ["later@example.com"]
+
+
+@pytest.mark.asyncio
+async def test_expired_mail_is_dropped(fake_smtp) -> None:
+    redis = FakeRedis()
+    queue = MailQueue(redis, stream="test:mail", pool_size=1, retry_backoff=0, smtp_factory=fake_smtp)
+    await queue.enqueue(
+        MailMessage(to="stale@example.com", subject="Hi", html="<p>hi</p>", expires_at=time.time() - 1)
+    )
+    await queue.start()
+    await _settle(queue, 1)
+    await queue.stop()
+
+    assert fake_smtp.sent == []
+    assert queue.stats()["expired"] == 1
+    assert await redis.xlen("test:mail") == 0
+
+
+@pytest.mark.asyncio
+async def test_stop_with_zero_timeout_does_not_wait(fake_smtp) -> None:
+    class SlowSMTP(fake_smtp):
+        async def send_message(self, message) -> None:
+            await asyncio.sleep(10)
+
+    redis = FakeRedis()
+    queue = MailQueue(redis, stream="test:mail", pool_size=1, smtp_factory=SlowSMTP)
+    await queue.start()
+    await queue.enqueue(MailMessage(to="slow@example.com", subject="Hi", html="<p>hi</p>"))
+    for _ in range(300):
+        if fake_smtp.connects:
+            break
+        await asyncio.sleep(0.01)
+
+    await asyncio.wait_for(queue.stop(timeout=0), 1)
+    assert not queue.running
+    # Interrupted before it was sent, so it stays queued.
+    assert await redis.xlen("test:mail") == 1
+
+
+@pytest.mark.asyncio
+async def test_unexpected_error_does_not_kill_the_worker(fake_smtp) -> None:
+    class BrokenSMTP(fake_smtp):
+        async def send_message(self, message) -> None:
+            if message["To"] == "broken@example.com":
+                raise ValueError("unexpected")
+            await super().send_message(message)
+
+    queue = MailQueue(FakeRedis(), pool_size=1, retry_backoff=0, smtp_factory=BrokenSMTP)
+    await queue.start()
+    await queue.enqueue(MailMessage(to="broken@example.com", subject="Hi", html="<p>hi</p>"))
+    await queue.enqueue(MailMessage(to="after@example.com", subject="Hi", html="<p>hi</p>"))
+    await _settle(queue, 2)
+    await queue.stop()
+
+    assert [m["To"] for m in fake_smtp.sent] == ["after@example.com"]
+    assert queue.stats()["failed"] == 1
+
+
+def test_otp_template_substitutes_only_the_code() -> None:
+    html = otp_service.OTP_EMAIL_TEMPLATE.substitute(code="424242")
+    assert "424242" in html
+    assert f"{otp_service.OTP_EXPIRY_MINUTES} minutes" in html
+
+
+@pytest.mark.asyncio
+async def test_full_queue_keeps_the_previous_otp(monkeypatch) -> None:
+    issued = []
+
+    class RecordingStore:
+        async def issue(self, email: str, code: str, ttl_seconds: int) -> None:
+            issued.append(code)
+
+    queue = MailQueue(FakeRedis(), stream="test:mail", queue_size=1)
+    await queue.enqueue(MailMessage(to="first@example.com", subject="Hi", html="<p>hi</p>"))
+    monkeypatch.setattr(otp_service, "mail_queue", queue)
+    monkeypatch.setattr(otp_service, "otp_store", RecordingStore())
+
+    with pytest.raises(MailQueueFull):
+        await otp_service.generate_otp("second@example.com")
+    assert issued == []
+
+
+@pytest.mark.asyncio
+async def test_delivers_to_local_smtp_server(unused_tcp_port: int) -> None:
+    class Handler:
+        def __init__(self) -> None:
+            self.messages = []
+
+        async def handle_DATA(self, server, session, envelope):
+            self.messages.append(envelope)
+            return "250 OK"
+
+    handler = Handler()
+    controller = Controller(handler, hostname="127.0.0.1", port=unused_tcp_port)
+    controller.start()
+    try:
+        queue = MailQueue(
+            FakeRedis(),
+            pool_size=1,
+            retry_backoff=0,
+            smtp_factory=lambda: aiosmtplib.SMTP(hostname="127.0.0.1", port=unused_tcp_port, start_tls=False),
+        )
+        await queue.start()
+        for i in range(3):
+            await queue.enqueue(MailMessage(to=f"user{i}@example.com", subject="Code", html="<p>1</p>"))
+        await _settle(queue, 3)
+        await queue.stop()
+    finally:
+        controller.stop()
+
+    assert [e.rcpt_tos for e in handler.messages] == [[f"user{i}@example.com"] for i in range(3)]
+    assert queue.stats()["connections_opened"] == 1
@@ -0,0 +1,73 @@
+"""Tests for the metrics registry and the /metrics endpoint."""
+
+from datetime import datetime
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.metrics import CACHE_REQUESTS, MetricsRegistry
+from app.services.cache import RedisCache
+from tests.conftest import FakeRedis
+
+
+def test_registry_renders_prometheus_text() -> None:
+    registry = MetricsRegistry()
+    requests = registry.counter("demo_requests", "Requests", ["route"])
+    latency = registry.histogram("demo_seconds", "Latency", buckets=(0.1, 1.0))
+    registry.gauge("demo_depth", "Depth", function=lambda: 7)
+
+    requests.inc("/a")
+    requests.inc("/a", amount=2)
+    requests.inc('/"b"')
+    for value in (0.05, 0.5, 5.0):
+        latency.observe(value)
+
+    assert registry.counter("demo_requests", "Requests", ["route"]) is requests
+    text = registry.render()
+    assert '# TYPE demo_requests counter' in text
+    assert 'demo_requests_total{route="/a"} 3.0' in text
+    assert 'demo_requests_total{route="/\\"b\\""} 1.0' in text
+    assert 'demo_seconds_bucket{le="0.1"} 1' in text
+    assert 'demo_seconds_bucket{le="1.0"} 2' in text
+    assert 'demo_seconds_bucket{le="+Inf"} 3' in text
+    assert 'demo_seconds_count 3' in text
+    assert 'demo_depth 7.0' in text
+
+    with pytest.raises(ValueError):
+        registry.gauge("demo_requests", "Requests")
+
+
+@pytest.mark.asyncio
+async def test_cache_lookups_are_counted_per_key_family() -> None:
+    cache = RedisCache(prefix="metrics", redis_client=FakeRedis(), l1_enabled=False)
+    key = cache.get_key("family-a", "1")
+    before = {result: CACHE_REQUESTS.value("family-a", result) for result in ("hit", "miss")}
+
+    assert await cache.get(key) is None
+    await cache.set(key, {"value": 1})
+    assert await cache.get(key) == {"value": 1}
+    await cache.get_many([key, cache.get_key("family-a", "2")])
+
+    assert CACHE_REQUESTS.value("family-a", "miss") - before["miss"] == 2
+    assert CACHE_REQUESTS.value("family-a", "hit") - before["hit"] == 2
+
+
+def test_metrics_endpoint_reports_ingestion(api_client: TestClient) -> None:
+    payload = {
+        "device_id": "metrics-device",
+        "timestamp": datetime.utcnow().isoformat(),
+        "alert_type": "weapon_detection",
+        "location_lat": 6.5,
+        "location_lon": 3.3,
+        "payload": {"confidence": 0.9},
+    }
+    assert api_client.post("/api/alerts", json=payload).status_code == 201
+
+    response = api_client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    text = response.text
+    assert 'obex_alerts_ingested_total{alert_type="weapon_detection",source="HTTP"}' in text
+    assert 'obex_alert_stage_seconds_count{stage="db_commit"}' in text
+    assert "obex_db_pool_checkout_seconds_count" in text
+    assert "obex_ws_connections 0.0" in text
@@ -1,8 +1,19 @@
 """
 Tests for model log ingestion and dashboard summary endpoints.
 """
-from datetime import datetime
+import gzip
+import json
+from datetime import datetime, timedelta
+
+import pytest
 from fastapi.testclient import TestClient
+from sqlalchemy import select
+
+from app.api.endpoints import model_logs
+from app.db.session import AsyncSessionLocal
+from app.models.model_log import ModelLogRollup
+from app.schemas.model_log import ModelLogCreate
+from app.services.model_log_service import ModelLogService
 
 def test_ingest_model_log(api_client: TestClient):
     payload = {
@@ -36,3 +47,89 @@ def test_get_model_log_summary(api_client: TestClient):
     assert "total_logs" in summary
     assert "error_logs" in summary
     assert "model_counts" in summary
+
+
+def test_ingest_model_log_batch_array(api_client: TestClient):
+    entries = [
+        {"model_name": "batch-model", "log_level": "INFO", "message": f"frame {i}"}
+        for i in range(3)
+    ]
+    entries.append({"model_name": "batch-model", "message": "missing level"})
+    response = api_client.post("/api/model-logs/batch", json=entries)
+    assert response.status_code == 200
+    body = response.json()
+    assert body["accepted"] == 3
+    assert body["rejected"] == 1
+    assert body["errors"][0]["index"] == 3
+    assert "log_level" in body["errors"][0]["error"]
+
+
+def test_ingest_model_log_batch_gzip_ndjson(api_client: TestClient):
+    lines = [json.dumps({"model_name": "nd-model", "log_level": "ERROR", "message": str(i)}) for i in range(5)]
+    lines.insert(2, "{not json")
+    body = gzip.compress("\n".join(lines).encode("utf-8"))
+    response = api_client.post(
+        "/api/model-logs/batch",
+        content=body,
+        headers={"Content-Type": "application/x-ndjson", "Content-Encoding": "gzip"},
+    )
+    assert response.status_code == 200
+    assert response.json()["accepted"] == 5
+    assert response.json()["rejected"] == 1
+
+    summary = api_client.get("/api/model-logs/summary?since_hours=24").json()
+    assert summary["model_counts"]["nd-model"] == 5
+
+
+def test_ingest_model_log_batch_enforces_size_limit(api_client: TestClient, monkeypatch):
+    monkeypatch.setattr(model_logs.settings, "model_log_batch_max_bytes", 1000)
+    entry = json.dumps({"model_name": "big-model", "log_level": "INFO", "message": "x" * 200})
+    body = "\n".join([entry] * 10).encode("utf-8")
+    headers = {"Content-Type": "application/x-ndjson"}
+
+    # Rejected on Content-Length before the body is read.
+    assert api_client.post("/api/model-logs/batch", content=body, headers=headers).status_code == 413
+
+    # Without Content-Length, rejected once the streamed bytes pass the limit.
+    chunks = iter([body[i:i + 100] for i in range(0, len(body), 100)])
+    assert api_client.post("/api/model-logs/batch", content=chunks, headers=headers).status_code == 413
+
+    # A small gzip body that inflates past the limit.
+    headers["Content-Encoding"] = "gzip"
+    compressed = gzip.compress(body)
+    assert len(compressed) < 1000
+    assert api_client.post("/api/model-logs/batch", content=compressed, headers=headers).status_code == 413
+    truncated = gzip.compress(entry.encode("utf-8"))[:-4]
+    assert api_client.post("/api/model-logs/batch", content=truncated, headers=headers).status_code == 400
+
+
+def test_ingest_model_log_batch_rejects_non_array(api_client: TestClient):
+    response = api_client.post("/api/model-logs/batch", json={"model_name": "x"})
+    assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_summary_combines_rollups_and_raw_edges():
+    now = datetime.utcnow()
+    logs = [
+        ModelLogCreate(model_name="rollup-model", log_level=level, message="m", timestamp=now - age)
+        for level, age in [
+            ("INFO", timedelta(hours=5)),
+            ("ERROR", timedelta(hours=5)),
+            ("ERROR", timedelta(hours=2)),
+            ("INFO", timedelta(minutes=1)),
+            ("INFO", timedelta(hours=30)),
+        ]
+    ]
+    assert await ModelLogService.store_logs(logs) == 5
+
+    summary = await ModelLogService.get_log_summary(since_hours=24)
+    assert summary["model_counts"]["rollup-model"] == 4
+    assert summary["model_level_counts"]["rollup-model"] == {"INFO": 2, "ERROR": 2}
+
+    async with AsyncSessionLocal() as session:
+        before = set(await session.execute(select(ModelLogRollup.bucket_hour, ModelLogRollup.model_name, ModelLogRollup.log_level, ModelLogRollup.log_count)))
+    await ModelLogService.backfill_rollups()
+    async with AsyncSessionLocal() as session:
+        after = set(await session.execute(select(ModelLogRollup.bucket_hour, ModelLogRollup.model_name, ModelLogRollup.log_level, ModelLogRollup.log_count)))
+    assert before == after
@@ -0,0 +1,86 @@
+"""Tests for the OTP storage backends."""
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select, update
+
+from app.db.session import AsyncSessionLocal
+from app.models.otp import OTP
+from app.services.otp_store import OTPStore, RedisOTPStore, SQLOTPStore
+from tests.conftest import FakeRedis
+
+
+class FakeOTPRedis(FakeRedis):
+    """FakeRedis that runs the verify script's logic in Python."""
+
+    async def eval(self, script, numkeys, code_key, attempts_key, candidate, max_attempts):
+        stored = self.store.get(code_key)
+        if stored is None:
+            return 0
+        if stored == candidate:
+            await self.delete(code_key, attempts_key)
+            return 1
+        self.store[attempts_key] = self.store.get(attempts_key, 0) + 1
+        if self.store[attempts_key] >= max_attempts:
+            await self.delete(code_key, attempts_key)
+            return -1
+        return 0
+
+
+@pytest.mark.asyncio
+async def test_sql_store_keeps_one_live_code_per_email() -> None:
+    store = SQLOTPStore()
+    await store.issue("otp@example.com", "111111", 600)
+    await store.issue("otp@example.com", "222222", 600)
+
+    assert not await store.verify("otp@example.com", "111111")
+    assert await store.verify("otp@example.com", "222222")
+    assert not await store.verify("otp@example.com", "222222")
+
+    async with AsyncSessionLocal() as session:
+        rows = (await session.execute(select(OTP).where(OTP.email == "otp@example.com"))).scalars().all()
+    assert len(rows) == 1
+
+
+@pytest.mark.asyncio
+async def test_sql_store_rejects_expired_codes() -> None:
+    store = SQLOTPStore()
+    await store.issue("late@example.com", "333333", 600)
+    async with AsyncSessionLocal() as session:
+        await session.execute(
+            update(OTP).where(OTP.email == "late@example.com").values(expires_at=datetime.utcnow() - timedelta(seconds=1))
+        )
+        await session.commit()
+
+    assert not await store.verify("late@example.com", "333333")
+
+
+@pytest.mark.asyncio
+async def test_redis_store_consumes_codes_and_limits_guesses() -> None:
+    redis = FakeOTPRedis()
+    store = RedisOTPStore(redis, prefix="test:otp", max_attempts=3)
+
+    await store.issue("otp@example.com", "123456", 600)
+    assert await store.verify("otp@example.com", "123456")
+    assert not await store.verify("otp@example.com", "123456")
+
+    await store.issue("otp@example.com", "654321", 600)
+    assert not await store.verify("otp@example.com", "000000")
+    assert not await store.verify("otp@example.com", "000001")
+    assert not await store.verify("otp@example.com", "000002")
+    # Out of attempts: even the right code is gone now.
+    assert not await store.verify("otp@example.com", "654321")
+
+    await store.issue("otp@example.com", "777777", 600)
+    assert "test:otp:attempts:otp@example.com" not in redis.store
+    assert await store.verify("otp@example.com", "777777")
+
+
+def test_backends_must_implement_issue_and_verify() -> None:
+    class IssueOnly(OTPStore):
+        async def issue(self, email: str, code: str, ttl_seconds: int) -> None:
+            return None
+
+    with pytest.raises(TypeError):
+        IssueOnly()
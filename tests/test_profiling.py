@@ -0,0 +1,82 @@
+"""Tests for the request sampling profiler and the profile download endpoints."""
+
+import asyncio
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api import deps, middleware
+from app.api.middleware import ProfilingMiddleware
+from app.core.profiling import ProfileStore, RequestSampler, profile_store
+
+
+def _spin(seconds: float) -> None:
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+async def _handler() -> None:
+    await asyncio.sleep(0.05)
+    _spin(0.05)
+
+
+@pytest.mark.asyncio
+async def test_sampler_records_awaiting_and_running_stacks() -> None:
+    store = ProfileStore(max_profiles=5)
+    task = asyncio.create_task(_handler())
+    await asyncio.sleep(0)
+    sampler = RequestSampler(task, store.new_profile("GET", "/demo"))
+    sampler.start()
+    await task
+    profile = sampler.stop()
+
+    assert profile.samples > 0
+    assert profile.duration_ms >= 50
+    stacks = profile.collapsed().splitlines()
+    assert any("_handler" in line and "<Future>" in line for line in stacks)
+    assert any("_handler" in line and "_spin" in line for line in stacks)
+
+
+def test_store_keeps_only_recent_profiles() -> None:
+    store = ProfileStore(max_profiles=2)
+    profiles = [store.new_profile("GET", f"/{index}") for index in range(3)]
+    for profile in profiles:
+        store.add(profile)
+
+    assert [entry["path"] for entry in store.list()] == ["/2", "/1"]
+    assert store.get(profiles[0].id) is None
+    assert store.get(profiles[2].id) is profiles[2]
+
+
+def test_middleware_profiles_requested_calls(api_client: TestClient, monkeypatch) -> None:
+    monkeypatch.setattr(middleware.settings, "admin_token", "letmein")
+    monkeypatch.setattr(deps.settings, "admin_token", "letmein")
+
+    demo = FastAPI()
+
+    @demo.get("/work")
+    async def work():
+        await asyncio.sleep(0.03)
+        return {"ok": True}
+
+    demo.add_middleware(ProfilingMiddleware)
+    with TestClient(demo) as client:
+        assert "x-profile-id" not in client.get("/work").headers
+        assert "x-profile-id" not in client.get("/work", headers={"X-Profile": "1"}).headers
+        response = client.get("/work", headers={"X-Profile": "1", "X-Admin-Token": "letmein"})
+    profile_id = response.headers["x-profile-id"]
+
+    headers = {"X-Admin-Token": "letmein"}
+    listed = api_client.get("/api/admin/profiles", headers=headers).json()
+    assert listed[0]["id"] == int(profile_id)
+    assert listed[0]["path"] == "/work"
+
+    download = api_client.get(f"/api/admin/profiles/{profile_id}", headers=headers)
+    assert download.status_code == 200
+    assert f"profile-{profile_id}.folded" in download.headers["content-disposition"]
+    assert "work (" in download.text
+    assert profile_store.get(int(profile_id)).samples > 0
+    assert api_client.get("/api/admin/profiles/999999", headers=headers).status_code == 404
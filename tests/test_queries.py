@@ -1,13 +1,18 @@
 """Tests for the alert query service."""
 
+import importlib.util
 from datetime import datetime, timedelta
+from pathlib import Path
 from uuid import uuid4
 
 import pytest
 import pytest_asyncio
 
-from app.models import Alert
+from sqlalchemy import delete, select, text
+
+from app.models import Alert, AlertRollup
 from app.services.alert_query import AlertQueryService
+from app.services.alert_rollup_service import backfill_alert_rollups
 
 
 @pytest_asyncio.fixture
@@ -138,4 +143,101 @@ async def test_get_device_statistics(seeded_alerts) -> None:
     stats = await AlertQueryService.get_device_statistics("device-0")
     assert stats["total_alerts"] == 1
     assert stats["alerts_by_type"] == {"weapon_detection": 1}
-    assert stats["last_seen"] is not None
\ No newline at end of file
+    assert stats["last_seen"] is not None
+
+async def _rollup_rows(session) -> set:
+    result = await session.execute(
+        select(
+            AlertRollup.bucket_hour,
+            AlertRollup.alert_type,
+            AlertRollup.device_id,
+            AlertRollup.alert_count,
+        )
+    )
+    return {tuple(row) for row in result if row[3]}
+
+
+@pytest_asyncio.fixture
+async def spread_alerts(db_session):
+    """Alerts spread over several hours at uneven minutes."""
+
+    base_time = datetime.utcnow().replace(minute=0, second=0, microsecond=0) - timedelta(hours=6)
+    alerts = []
+    for index in range(24):
+        alert = Alert(
+            id=str(uuid4()),
+            device_id=f"device-{index % 2}",
+            timestamp=base_time + timedelta(minutes=17 * index),
+            alert_type=("weapon_detection", "driver_fatigue")[index % 2],
+        )
+        alerts.append(alert)
+        db_session.add(alert)
+    await db_session.commit()
+    return alerts
+
+
+@pytest.mark.asyncio
+async def test_rollups_follow_inserts_and_deletes(db_session, spread_alerts) -> None:
+    """The flush hook keeps rollups in step, and a backfill reproduces them."""
+
+    maintained = await _rollup_rows(db_session)
+    assert sum(row[3] for row in maintained) == len(spread_alerts)
+
+    await db_session.delete(spread_alerts[0])
+    await db_session.commit()
+    maintained = await _rollup_rows(db_session)
+    assert sum(row[3] for row in maintained) == len(spread_alerts) - 1
+
+    await backfill_alert_rollups()
+    assert await _rollup_rows(db_session) == maintained
+
+
+@pytest.mark.asyncio
+async def test_rollups_follow_updated_alerts(db_session, spread_alerts) -> None:
+    """Moving an alert to another hour, type or device moves its count too."""
+
+    spread_alerts[0].timestamp += timedelta(hours=3)
+    spread_alerts[1].alert_type = "unauthorized_access"
+    spread_alerts[2].device_id = "device-moved"
+    await db_session.commit()
+    maintained = await _rollup_rows(db_session)
+    assert sum(row[3] for row in maintained) == len(spread_alerts)
+
+    await backfill_alert_rollups()
+    assert await _rollup_rows(db_session) == maintained
+
+
+@pytest.mark.asyncio
+async def test_rollup_migration_fills_the_table(db_session, spread_alerts) -> None:
+    """The migration's INSERT ... SELECT buckets alerts like the flush hook."""
+
+    path = Path(__file__).resolve().parents[1] / "alembic" / "versions" / "c5d6e7f8a9b0_add_alert_rollups.py"
+    spec = importlib.util.spec_from_file_location("add_alert_rollups", path)
+    migration = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(migration)
+
+    maintained = await _rollup_rows(db_session)
+    await db_session.execute(delete(AlertRollup))
+    hour = migration.HOUR_EXPRESSIONS[db_session.get_bind().dialect.name]
+    await db_session.execute(text(migration.FILL_ROLLUPS.format(hour=hour)))
+    await db_session.commit()
+    assert await _rollup_rows(db_session) == maintained
+
+
+@pytest.mark.asyncio
+async def test_counts_combine_rollups_with_partial_edges(spread_alerts) -> None:
+    """Ranges that start and end mid-hour count exactly what a raw scan would."""
+
+    start_time = spread_alerts[3].timestamp - timedelta(minutes=1)
+    end_time = spread_alerts[19].timestamp
+    expected = {}
+    for alert in spread_alerts:
+        if start_time <= alert.timestamp <= end_time:
+            expected[alert.alert_type] = expected.get(alert.alert_type, 0) + 1
+
+    counts = await AlertQueryService.get_alert_counts_by_type(start_time, end_time)
+    assert counts == expected
+
+    stats = await AlertQueryService.get_device_statistics("device-1")
+    assert stats["total_alerts"] == 12
+    assert stats["alerts_by_type"] == {"driver_fatigue": 12}
@@ -0,0 +1,43 @@
+"""Tests for SQL instrumentation and the admin query endpoint."""
+
+from fastapi.testclient import TestClient
+
+from app.api import deps
+from app.core.query_stats import QueryStats, fingerprint, parameter_shape
+
+
+def test_fingerprint_collapses_literals_and_lists() -> None:
+    assert fingerprint(
+        "SELECT * FROM alerts WHERE device_id = 'cam-1' AND id IN (?, ?, ?)\n  LIMIT 20"
+    ) == "SELECT * FROM alerts WHERE device_id = ? AND id IN (?) LIMIT ?"
+    assert fingerprint("INSERT INTO t (a, b) VALUES ($1, $2), ($3, $4)") == "INSERT INTO t (a, b) VALUES (?)"
+    assert fingerprint("SELECT x::text FROM t WHERE y = :y_1") == "SELECT x::text FROM t WHERE y = ?"
+
+
+def test_stats_rank_by_total_time_and_log_slow_queries(caplog) -> None:
+    stats = QueryStats(slow_query_ms=50)
+    for value in (1, 2, 3):
+        stats.record(f"SELECT * FROM a WHERE id = {value}", 0.01)
+    stats.record("SELECT * FROM b WHERE email = ?", 0.2, ("secret@example.com",))
+
+    top = stats.top(5)
+    assert [entry["fingerprint"] for entry in top] == ["SELECT * FROM b WHERE email = ?", "SELECT * FROM a WHERE id = ?"]
+    assert top[1]["calls"] == 3
+    assert "Slow query" in caplog.text
+    assert "params=(str)" in caplog.text
+    assert "secret@example.com" not in caplog.text
+    assert parameter_shape([{"a": 1}, {"a": 2}], executemany=True) == "2 x {a: int}"
+
+
+def test_requests_report_query_counts(api_client: TestClient, monkeypatch) -> None:
+    assert api_client.get("/api/admin/queries").status_code == 404
+    monkeypatch.setattr(deps.settings, "admin_token", "letmein")
+    assert api_client.get("/api/admin/queries", headers={"X-Admin-Token": "nope"}).status_code == 403
+    assert api_client.delete("/api/admin/queries", headers={"X-Admin-Token": "letmein"}).status_code == 204
+
+    response = api_client.get("/api/model-logs/summary")
+    assert int(response.headers["x-db-query-count"]) >= 1
+
+    response = api_client.get("/api/admin/queries", headers={"X-Admin-Token": "letmein"}, params={"limit": 5})
+    assert response.status_code == 200
+    assert any("model_log" in entry["fingerprint"] for entry in response.json()["queries"])
@@ -0,0 +1,169 @@
+"""Tests for WebSocket fan-out through the connection manager."""
+
+import asyncio
+import json
+from typing import List
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.services.broadcast import BroadcastBackend, RedisBroadcastBackend
+from app.services.websocket import ConnectionManager
+from tests.conftest import FakeRedis
+
+
+class FakeWebSocket:
+    """Minimal stand-in for a Starlette WebSocket."""
+
+    def __init__(self, delay: float = 0.0) -> None:
+        self.delay = delay
+        self.sent: List[str] = []
+        self.closed_with = None
+
+    async def accept(self) -> None:
+        return None
+
+    async def send_text(self, message: str) -> None:
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        self.sent.append(message)
+
+    async def close(self, code: int = 1000) -> None:
+        self.closed_with = code
+
+
+class HubBackend(BroadcastBackend):
+    """Shares one publish log between managers, like workers on one Redis."""
+
+    def __init__(self, hub: list) -> None:
+        super().__init__()
+        self.hub = hub
+        hub.append(self)
+        self.published: List[str] = []
+
+    async def publish(self, message: str) -> None:
+        self.published.append(message)
+        for backend in self.hub:
+            await backend._deliver_locally(message)
+
+
+async def _settle() -> None:
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+@pytest.mark.asyncio
+async def test_slow_client_does_not_stall_others() -> None:
+    manager = ConnectionManager(max_queue_size=10, high_water=5, slow_consumer_policy="disconnect")
+    fast, slow = FakeWebSocket(), FakeWebSocket(delay=60)
+    await manager.connect(fast)
+    await manager.connect(slow)
+
+    for i in range(8):
+        await manager.broadcast(f"message-{i}")
+        await _settle()
+
+    assert fast.sent == [f"message-{i}" for i in range(8)]
+    assert slow not in manager.active_connections
+    assert slow.closed_with == 1013
+    assert manager.stats()["slow_consumers_disconnected"] == 1
+
+    manager.disconnect(fast)
+
+
+@pytest.mark.asyncio
+async def test_drop_oldest_policy_keeps_client_connected() -> None:
+    manager = ConnectionManager(max_queue_size=10, high_water=3, slow_consumer_policy="drop_oldest")
+    slow = FakeWebSocket(delay=60)
+    await manager.connect(slow)
+
+    for i in range(10):
+        await manager.broadcast(f"message-{i}")
+
+    channel = manager.active_connections[slow]
+    assert channel.queue.qsize() <= 3
+    assert manager.stats()["messages_dropped"] > 0
+
+    manager.disconnect(slow)
+    assert not manager.active_connections
+
+
+@pytest.mark.asyncio
+async def test_backend_publishes_once_and_every_worker_fans_out() -> None:
+    hub: list = []
+    worker_a = ConnectionManager(backend=HubBackend(hub))
+    worker_b = ConnectionManager(backend=HubBackend(hub))
+    client_a, client_b = FakeWebSocket(), FakeWebSocket()
+    await worker_a.connect(client_a)
+    await worker_b.connect(client_b)
+
+    await worker_a.broadcast("alert")
+    await _settle()
+
+    assert worker_a.backend.published == ["alert"]
+    assert worker_b.backend.published == []
+    assert client_a.sent == ["alert"]
+    assert client_b.sent == ["alert"]
+
+    worker_a.disconnect(client_a)
+    worker_b.disconnect(client_b)
+
+
+def test_websocket_endpoint_replies_through_writer(api_client: TestClient) -> None:
+    with api_client.websocket_connect("/ws/alerts") as websocket:
+        assert json.loads(websocket.receive_text())["type"] == "system"
+        websocket.send_text("ping")
+        assert json.loads(websocket.receive_text())["type"] == "pong"
+
+
+@pytest.mark.asyncio
+async def test_redis_backend_delivers_to_every_subscribed_worker() -> None:
+    redis = FakeRedis()
+    worker_a = ConnectionManager(backend=RedisBroadcastBackend("test:ws", redis_client=redis))
+    worker_b = ConnectionManager(backend=RedisBroadcastBackend("test:ws", redis_client=redis))
+    client_a, client_b = FakeWebSocket(), FakeWebSocket()
+    await worker_a.start()
+    await worker_b.start()
+    await worker_a.connect(client_a)
+    await worker_b.connect(client_b)
+    await _settle()
+
+    await worker_a.broadcast("alert")
+    await _settle()
+
+    assert redis.published == [("test:ws", "alert")]
+    assert client_a.sent == ["alert"]
+    assert client_b.sent == ["alert"]
+
+    worker_a.disconnect(client_a)
+    worker_b.disconnect(client_b)
+    await worker_a.stop()
+    await worker_b.stop()
+    assert redis.subscribers["test:ws"] == []
+
+
+@pytest.mark.asyncio
+async def test_redis_backend_delivers_locally_when_publish_fails(monkeypatch) -> None:
+    redis = FakeRedis()
+
+    async def unreachable(channel, message):
+        raise ConnectionError("redis down")
+
+    monkeypatch.setattr(redis, "publish", unreachable)
+    delivered: List[str] = []
+    backend = RedisBroadcastBackend("test:ws", redis_client=redis)
+
+    async def deliver(message: str) -> None:
+        delivered.append(message)
+
+    backend.attach(deliver)
+    await backend.publish("alert")
+    assert delivered == ["alert"]
+
+
+def test_backends_must_implement_publish() -> None:
+    class Incomplete(BroadcastBackend):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete()